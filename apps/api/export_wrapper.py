@@ -6,6 +6,7 @@ import traceback
 # Importing models/service from pid_analysis
 from apps.pid_analysis.models import PIDDrawing
 from apps.pid_analysis.export_service import PIDReportExportService
+from apps.pid_analysis.report_artifacts import export_report_artifact
 
 
 @api_view(['GET'])
@@ -28,9 +29,9 @@ def pid_export_wrapper(request, pk):
 
     try:
         if export_format == 'pdf':
-            return svc.export_pdf(drawing)
+            return export_report_artifact(drawing, 'pdf', svc)
         elif export_format == 'excel':
-            return svc.export_excel(drawing)
+            return export_report_artifact(drawing, 'excel', svc)
         elif export_format == 'csv':
             return svc.export_csv(drawing)
         else:
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from apps.core.project_models import Project, ProjectMember, ProjectTask, ProjectMilestone
+from apps.core.storage_models import StorageActivity, UserStorageProfile, StoredFile, StorageCatalogSync, StorageUsage
 
 
 @admin.register(Project)
@@ -30,3 +31,41 @@ class ProjectMilestoneAdmin(admin.ModelAdmin):
     list_filter = ['is_completed', 'target_date']
     search_fields = ['name', 'description', 'project__name']
 
+
+@admin.register(StorageActivity)
+class StorageActivityAdmin(admin.ModelAdmin):
+    list_display = ['action', 'user', 'created_at']
+    list_filter = ['action', 'created_at']
+    search_fields = ['user__email']
+    raw_id_fields = ['user']
+
+
+@admin.register(UserStorageProfile)
+class UserStorageProfileAdmin(admin.ModelAdmin):
+    list_display = ['user', 'total_uploads', 'total_exports', 'last_activity']
+    search_fields = ['user__email']
+    raw_id_fields = ['user']
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'kind', 'user', 'file_format', 'size', 'last_modified']
+    list_filter = ['kind', 'file_format']
+    search_fields = ['s3_key', 'user__email']
+    raw_id_fields = ['user']
+
+
+@admin.register(StorageCatalogSync)
+class StorageCatalogSyncAdmin(admin.ModelAdmin):
+    list_display = ['bucket', 'prefix', 'kind', 'file_count', 'synced_at']
+    list_filter = ['kind', 'bucket']
+    search_fields = ['prefix']
+    raw_id_fields = ['user']
+
+
+@admin.register(StorageUsage)
+class StorageUsageAdmin(admin.ModelAdmin):
+    list_display = ['bucket', 'folder', 'user', 'bytes_used', 'object_count', 'updated_at', 'reconciled_at']
+    list_filter = ['bucket', 'folder']
+    search_fields = ['user__email', 'folder']
+    raw_id_fields = ['user']
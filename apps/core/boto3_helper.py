@@ -3,23 +3,111 @@ Boto3 Connection Helper
 Provides reusable boto3 clients with proper error handling
 """
 import boto3
+import hashlib
 import os
 import logging
+import threading
+from io import BytesIO
 from typing import Optional, Dict, Any
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError, NoCredentialsError, PartialCredentialsError
 from botocore.config import Config
 
 logger = logging.getLogger(__name__)
 
+MB = 1024 * 1024
+
+
+class S3ChecksumError(Exception):
+    """Raised when an uploaded object does not match the expected SHA-256"""
+
+
+class _HashingReader:
+    """
+    Read-only view of a binary stream that counts and SHA-256 hashes bytes as
+    they are read
+
+    Deliberately not seekable: s3transfer then reads the source exactly once,
+    front to back, buffering one part at a time, so every byte is hashed once.
+    """
+    
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+    
+    def read(self, amount=None):
+        data = self._fileobj.read() if amount is None or amount < 0 else self._fileobj.read(amount)
+        self._sha256.update(data)
+        self.size += len(data)
+        return data
+    
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
 
 class Boto3Helper:
     """
     Centralized boto3 connection helper with retry logic and error handling
+    
+    Acts as the S3 gateway for every wrapper in the project: one client per
+    region is created once per process and shared by all threads (boto3
+    clients are thread-safe). Each client keeps a urllib3 pool of up to
+    MAX_POOL_CONNECTIONS keep-alive connections, so requests and concurrent
+    uploads reuse open TLS connections instead of building a client (and a
+    handshake) per call.
     """
     
     # Connection pool for reusing clients
     _clients = {}
-    _resources = {}
+    _lock = threading.Lock()
+    # boto3 resources are not thread-safe - cached per thread
+    _local = threading.local()
+    
+    MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_S3_MAX_POOL_CONNECTIONS', '50'))
+    
+    # Multipart uploads: objects above the threshold go up in parts,
+    # MAX_UPLOAD_CONCURRENCY parts at a time (bounded by the connection pool)
+    MULTIPART_THRESHOLD = int(os.environ.get('AWS_S3_MULTIPART_THRESHOLD_MB', '8')) * MB
+    MULTIPART_CHUNKSIZE = int(os.environ.get('AWS_S3_MULTIPART_CHUNKSIZE_MB', '8')) * MB
+    MAX_UPLOAD_CONCURRENCY = int(os.environ.get('AWS_S3_MAX_UPLOAD_CONCURRENCY', '8'))
+    
+    @staticmethod
+    def _resolve_region(region: Optional[str], bucket_specific: bool = False) -> str:
+        if region:
+            return region
+        if bucket_specific:
+            return os.environ.get('PFD_S3_REGION', 'ap-south-1')
+        return os.environ.get('AWS_S3_REGION_NAME', 'us-east-1')
+    
+    @classmethod
+    def _client_config(cls, region: str, **overrides) -> Config:
+        options = {
+            'region_name': region,
+            'retries': {
+                'max_attempts': 3,
+                'mode': 'adaptive'
+            },
+            'connect_timeout': 10,
+            'read_timeout': 30,
+            'max_pool_connections': cls.MAX_POOL_CONNECTIONS,
+            'tcp_keepalive': True,
+        }
+        options.update(overrides)
+        return Config(**options)
+    
+    @staticmethod
+    def _session() -> boto3.session.Session:
+        """
+        Session with explicit environment credentials when both are set,
+        otherwise boto3's default chain (IAM role, ~/.aws/credentials)
+        """
+        access_key = os.environ.get('AWS_ACCESS_KEY_ID')
+        secret_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
+        if access_key and secret_key:
+            return boto3.session.Session(aws_access_key_id=access_key, aws_secret_access_key=secret_key)
+        return boto3.session.Session()
     
     @classmethod
     def get_s3_client(
@@ -29,66 +117,45 @@ class Boto3Helper:
         **kwargs
     ) -> boto3.client:
         """
-        Get or create S3 client with proper configuration
+        Get or create the shared S3 client for a region
         
         Args:
             region: AWS region (defaults to AWS_S3_REGION_NAME or us-east-1)
-            bucket_specific: If True, uses PFD bucket credentials
-            **kwargs: Additional boto3 client parameters
+            bucket_specific: If True and no region given, uses the PFD bucket region
+            **kwargs: Additional boto3 client parameters ('config' may be a
+                dict of botocore Config overrides); such clients are not shared
             
         Returns:
             Configured boto3 S3 client
         """
-        # Determine region
-        if not region:
-            if bucket_specific:
-                region = os.environ.get('PFD_S3_REGION', 'ap-south-1')
-            else:
-                region = os.environ.get('AWS_S3_REGION_NAME', 'us-east-1')
+        region = cls._resolve_region(region, bucket_specific)
         
-        # Check if client already exists
-        cache_key = f"s3_{region}_{bucket_specific}"
-        if cache_key in cls._clients:
-            return cls._clients[cache_key]
+        # Customised clients are built on demand; the default one is shared
+        if kwargs:
+            config = cls._client_config(region, **kwargs.pop('config', {}))
+            return cls._session().client('s3', region_name=region, config=config, **kwargs)
         
-        # Get credentials
-        access_key = os.environ.get('AWS_ACCESS_KEY_ID')
-        secret_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
-        
-        if not access_key or not secret_key:
-            raise NoCredentialsError()
-        
-        # Configure client with retry logic
-        config = Config(
-            region_name=region,
-            retries={
-                'max_attempts': 3,
-                'mode': 'adaptive'
-            },
-            connect_timeout=10,
-            read_timeout=30,
-            **kwargs.pop('config', {})
-        )
+        cache_key = f"s3_{region}"
+        client = cls._clients.get(cache_key)
+        if client is not None:
+            return client
         
-        try:
-            client = boto3.client(
-                's3',
-                region_name=region,
-                aws_access_key_id=access_key,
-                aws_secret_access_key=secret_key,
-                config=config,
-                **kwargs
-            )
+        with cls._lock:
+            # Another thread may have created it while we waited
+            client = cls._clients.get(cache_key)
+            if client is not None:
+                return client
+            try:
+                client = cls._session().client('s3', region_name=region, config=cls._client_config(region))
+            except Exception as e:
+                logger.error(f"Failed to create S3 client: {e}")
+                raise
             
             # Cache the client
             cls._clients[cache_key] = client
-            
-            logger.info(f"S3 client created successfully for region: {region}")
-            return client
-            
-        except Exception as e:
-            logger.error(f"Failed to create S3 client: {e}")
-            raise
+        
+        logger.info(f"S3 client created successfully for region: {region} (pool size {cls.MAX_POOL_CONNECTIONS})")
+        return client
     
     @classmethod
     def get_s3_resource(
@@ -104,38 +171,101 @@ class Boto3Helper:
             **kwargs: Additional boto3 resource parameters
             
         Returns:
-            Configured boto3 S3 resource
+            Configured boto3 S3 resource (one per thread and region)
         """
-        if not region:
-            region = os.environ.get('AWS_S3_REGION_NAME', 'us-east-1')
+        region = cls._resolve_region(region)
         
-        cache_key = f"s3_resource_{region}"
-        if cache_key in cls._resources:
-            return cls._resources[cache_key]
+        if kwargs:
+            return cls._session().resource('s3', region_name=region, **kwargs)
         
-        access_key = os.environ.get('AWS_ACCESS_KEY_ID')
-        secret_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
+        resources = getattr(cls._local, 'resources', None)
+        if resources is None:
+            resources = cls._local.resources = {}
         
-        if not access_key or not secret_key:
-            raise NoCredentialsError()
+        cache_key = f"s3_resource_{region}"
+        if cache_key in resources:
+            return resources[cache_key]
         
         try:
-            resource = boto3.resource(
-                's3',
-                region_name=region,
-                aws_access_key_id=access_key,
-                aws_secret_access_key=secret_key,
-                **kwargs
-            )
-            
-            cls._resources[cache_key] = resource
-            
-            logger.info(f"S3 resource created successfully for region: {region}")
-            return resource
-            
+            resource = cls._session().resource('s3', region_name=region, config=cls._client_config(region))
         except Exception as e:
             logger.error(f"Failed to create S3 resource: {e}")
             raise
+        
+        resources[cache_key] = resource
+        logger.info(f"S3 resource created successfully for region: {region}")
+        return resource
+    
+    @classmethod
+    def get_transfer_config(cls) -> TransferConfig:
+        """Multipart settings for managed uploads"""
+        return TransferConfig(
+            multipart_threshold=cls.MULTIPART_THRESHOLD,
+            multipart_chunksize=cls.MULTIPART_CHUNKSIZE,
+            max_concurrency=max(1, min(cls.MAX_UPLOAD_CONCURRENCY, cls.MAX_POOL_CONNECTIONS)),
+            use_threads=True,
+        )
+    
+    @classmethod
+    def upload_stream(
+        cls,
+        source,
+        bucket: str,
+        key: str,
+        s3_client=None,
+        extra_args: Optional[Dict[str, Any]] = None,
+        expected_sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Stream an upload to S3, computing its size and SHA-256 on the way
+        
+        Large sources go up as concurrent multipart parts; only the parts in
+        flight are held in memory. S3 verifies each part against a SHA-256
+        checksum sent with it.
+        
+        Args:
+            source: bytes, a binary file-like object or a Django UploadedFile
+                (a TemporaryUploadedFile is read straight from its file on disk)
+            bucket: Target bucket
+            key: Target key
+            s3_client: Client to use (defaults to the shared client)
+            extra_args: ExtraArgs for upload_fileobj (ContentType, Metadata, ...)
+            expected_sha256: Hex digest the content must match; on mismatch
+                the object is deleted and S3ChecksumError raised
+            
+        Returns:
+            Dict with 'size' and 'sha256' (hex) of the uploaded content
+        """
+        s3_client = s3_client or cls.get_s3_client()
+        extra_args = {'ChecksumAlgorithm': 'SHA256', **(extra_args or {})}
+        
+        opened = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            fileobj = BytesIO(source)
+        elif hasattr(source, 'temporary_file_path'):
+            fileobj = opened = open(source.temporary_file_path(), 'rb')
+        else:
+            fileobj = source
+            if hasattr(fileobj, 'seek'):
+                fileobj.seek(0)
+        
+        reader = _HashingReader(fileobj)
+        try:
+            s3_client.upload_fileobj(reader, bucket, key, ExtraArgs=extra_args, Config=cls.get_transfer_config())
+        finally:
+            if opened is not None:
+                opened.close()
+            elif fileobj is source and hasattr(fileobj, 'seek'):
+                fileobj.seek(0)
+        
+        if expected_sha256 and expected_sha256.lower() != reader.sha256:
+            try:
+                s3_client.delete_object(Bucket=bucket, Key=key)
+            except Exception as e:
+                logger.error(f"Failed to remove corrupt upload {key}: {e}")
+            raise S3ChecksumError(f"SHA-256 mismatch for {key}: expected {expected_sha256}, got {reader.sha256}")
+        
+        return {'size': reader.size, 'sha256': reader.sha256}
     
     @classmethod
     def test_bucket_access(cls, bucket_name: str, region: Optional[str] = None) -> Dict[str, Any]:
@@ -277,8 +407,9 @@ class Boto3Helper:
     @classmethod
     def clear_cache(cls):
         """Clear cached clients and resources"""
-        cls._clients.clear()
-        cls._resources.clear()
+        with cls._lock:
+            cls._clients.clear()
+        cls._local.resources = {}
         logger.info("Boto3 connection cache cleared")
     
     @classmethod
@@ -303,7 +434,11 @@ class Boto3Helper:
                 os.environ.get('AWS_SECRET_ACCESS_KEY')
             ),
             'cached_clients': len(cls._clients),
-            'cached_resources': len(cls._resources)
+            'cached_resources': len(getattr(cls._local, 'resources', None) or {}),
+            'max_pool_connections': cls.MAX_POOL_CONNECTIONS,
+            'multipart_threshold_mb': cls.MULTIPART_THRESHOLD // MB,
+            'multipart_chunksize_mb': cls.MULTIPART_CHUNKSIZE // MB,
+            'max_upload_concurrency': cls.MAX_UPLOAD_CONCURRENCY
         }
 
 
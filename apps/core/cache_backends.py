@@ -0,0 +1,67 @@
+"""
+Cache Backends
+DatabaseCache whose set_many writes all entries in one transaction instead of
+Django's per-key loop (a count, a select and an insert/update per key).
+"""
+import base64
+import pickle
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.db import DatabaseCache
+from django.db import DatabaseError, connections, router, transaction
+from django.utils.timezone import now as tz_now
+
+BULK_BATCH_SIZE = 500
+
+
+class BulkDatabaseCache(DatabaseCache):
+    """Database cache for batch writers (e.g. the CRS comment cleaning cache)"""
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        """Store many entries with one cull check, one delete and one bulk insert per batch"""
+        if not data:
+            return []
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            expires = datetime.max
+        else:
+            expires = datetime.fromtimestamp(timeout, tz=timezone.utc if settings.USE_TZ else None)
+        expires = expires.replace(microsecond=0)
+
+        rows = {}
+        for key, value in data.items():
+            key = self.make_and_validate_key(key, version=version)
+            rows[key] = base64.b64encode(pickle.dumps(value, self.pickle_protocol)).decode('latin1')
+
+        db = router.db_for_write(self.cache_model_class)
+        connection = connections[db]
+        quote_name = connection.ops.quote_name
+        table = quote_name(self._table)
+        expires = connection.ops.adapt_datetimefield_value(expires)
+        keys = list(rows)
+
+        try:
+            with transaction.atomic(using=db), connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM %s" % table)
+                num = cursor.fetchone()[0]
+                if num + len(rows) > self._max_entries:
+                    self._cull(db, cursor, tz_now().replace(microsecond=0), num + len(rows))
+
+                for start in range(0, len(keys), BULK_BATCH_SIZE):
+                    batch = keys[start:start + BULK_BATCH_SIZE]
+                    cursor.execute(
+                        "DELETE FROM %s WHERE %s IN (%s)"
+                        % (table, quote_name('cache_key'), ', '.join(['%s'] * len(batch))),
+                        batch,
+                    )
+                    cursor.executemany(
+                        "INSERT INTO %s (%s, %s, %s) VALUES (%%s, %%s, %%s)"
+                        % (table, quote_name('cache_key'), quote_name('value'), quote_name('expires')),
+                        [(key, rows[key], expires) for key in batch],
+                    )
+        except DatabaseError:
+            # Like DatabaseCache.set: a concurrent writer won, the entries are only a cache
+            return keys
+        return []
@@ -0,0 +1,95 @@
+"""
+Content-addressed cache for LLM analysis results.
+Results are keyed by SHA-256 of the input file, the model name and a hash
+of the prompt template, and stored in the 'llm_results' cache (Redis or DB).
+"""
+import hashlib
+import logging
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = 'llm_results'
+_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_obj) -> str:
+    """
+    SHA-256 of a file's bytes, read in chunks
+
+    Accepts a local path or a file-like object (Django FieldFile/UploadedFile);
+    file objects are rewound so callers can read them again.
+    """
+    hasher = hashlib.sha256()
+    if isinstance(file_obj, str):
+        with open(file_obj, 'rb') as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(_CHUNK_SIZE), b''):
+        hasher.update(chunk)
+    file_obj.seek(0)
+    return hasher.hexdigest()
+
+
+def hash_text(*parts: Any) -> str:
+    """SHA-256 over the string form of each part (prompt templates, settings)"""
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(str(part).encode('utf-8'))
+        hasher.update(b'\x00')
+    return hasher.hexdigest()
+
+
+class LLMResultCache:
+    """
+    Cache of LLM results for one use case (namespace)
+
+    Never raises: a cache outage only means the LLM is called again.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'LLM_RESULT_CACHE_ENABLED', True)
+
+    @property
+    def timeout(self) -> int:
+        return getattr(settings, 'LLM_RESULT_CACHE_TTL', 60 * 60 * 24 * 30)
+
+    def make_key(self, file_hash: str, model: str, prompt_hash: str) -> str:
+        # Fixed-length key fits every backend (DatabaseCache keys are limited to 255 chars)
+        return f"{self.namespace}:{hash_text(file_hash, model, prompt_hash)}"
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        try:
+            value = caches[CACHE_ALIAS].get(key)
+        except Exception as e:
+            logger.warning(f"LLM result cache read failed ({self.namespace}): {e}")
+            return None
+        if value is not None:
+            logger.info(f"LLM result cache hit ({self.namespace}): {key}")
+        return value
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        try:
+            caches[CACHE_ALIAS].set(key, value, timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"LLM result cache write failed ({self.namespace}): {e}")
+
+    def delete(self, key: str):
+        try:
+            caches[CACHE_ALIAS].delete(key)
+        except Exception as e:
+            logger.warning(f"LLM result cache delete failed ({self.namespace}): {e}")
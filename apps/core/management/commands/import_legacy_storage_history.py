@@ -0,0 +1,72 @@
+"""
+Django management command to import S3 activity logs and profile counters
+written before user storage history moved to the database
+"""
+import json
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from apps.core.storage_models import StorageActivity
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Import users/{id}/history/**/activity_*.json and profile.json from S3 into the database (idempotent)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', type=str, help='Only import this user')
+
+    def handle(self, *args, **options):
+        from apps.crs_documents.helpers.user_storage import UserStorageManager, parse_timestamp
+
+        users = User.objects.all()
+        if options.get('email'):
+            users = users.filter(email=options['email'])
+
+        total = 0
+        for user in users.iterator():
+            storage = UserStorageManager(user=user)
+            if not storage.s3_service:
+                self.stdout.write(self.style.ERROR('✗ S3 not available'))
+                return
+
+            # Seeds the counters from profile.json if the user has no profile row yet
+            storage._get_profile()
+
+            existing = set(
+                StorageActivity.objects.filter(user=user).values_list('created_at', 'action')
+            )
+            entries = []
+            paginator = storage.s3_service.s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=storage.bucket_name, Prefix=f"{storage.history_path}/"):
+                for obj in page.get('Contents', []):
+                    if not obj['Key'].endswith('.json'):
+                        continue
+                    try:
+                        body = storage.s3_service.s3_client.get_object(Bucket=storage.bucket_name, Key=obj['Key'])['Body']
+                        activities = json.loads(body.read().decode('utf-8'))
+                    except Exception as e:
+                        self.stdout.write(self.style.WARNING(f'  Skipping {obj["Key"]}: {e}'))
+                        continue
+
+                    for activity in activities:
+                        created_at = parse_timestamp(activity.get('timestamp'))
+                        action = activity.get('action', '')
+                        if not created_at or (created_at, action) in existing:
+                            continue
+                        existing.add((created_at, action))
+                        entries.append(StorageActivity(
+                            user=user,
+                            action=action,
+                            details=activity.get('details') or {},
+                            created_at=created_at,
+                        ))
+
+            StorageActivity.objects.bulk_create(entries, batch_size=500)
+            total += len(entries)
+            if entries:
+                self.stdout.write(f'  {user.email}: {len(entries)} activities')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Imported {total} activities'))
@@ -0,0 +1,78 @@
+"""
+Django management command to reconcile the S3 file catalog (StoredFile) with
+the buckets. Run periodically (cron) to pick up objects written or deleted
+outside the application.
+"""
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from apps.core.storage_catalog import reconcile_prefix
+from apps.core.storage_models import StoredFile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Reconcile the file catalog with S3 (user uploads/exports and PFD/P&ID folders)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', type=str, help='Only reconcile this user')
+        parser.add_argument('--skip-users', action='store_true', help='Skip users/{id}/uploads and exports')
+        parser.add_argument('--skip-pfd', action='store_true', help='Skip the PFD_to_PID folders')
+
+    def handle(self, *args, **options):
+        totals = {'added': 0, 'updated': 0, 'removed': 0, 'total': 0}
+
+        if not options['skip_users']:
+            self._reconcile_users(options.get('email'), totals)
+
+        if not options['skip_pfd'] and not options.get('email'):
+            self._reconcile_pfd(totals)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Catalog has {totals['total']} files "
+            f"(+{totals['added']} added, {totals['updated']} updated, -{totals['removed']} removed)"
+        ))
+
+    def _add(self, totals, result, label):
+        for key in totals:
+            totals[key] += result[key]
+        if result['added'] or result['updated'] or result['removed']:
+            self.stdout.write(
+                f"  {label}: +{result['added']} ~{result['updated']} -{result['removed']} ({result['total']} files)"
+            )
+
+    def _reconcile_users(self, email, totals):
+        from apps.crs_documents.helpers.user_storage import UserStorageManager
+
+        users = User.objects.all()
+        if email:
+            users = users.filter(email=email)
+
+        for user in users.iterator():
+            storage = UserStorageManager(user=user)
+            if not storage.s3_service:
+                self.stdout.write(self.style.ERROR('✗ S3 not available'))
+                return
+
+            for kind, path in ((StoredFile.KIND_UPLOAD, storage.uploads_path), (StoredFile.KIND_EXPORT, storage.exports_path)):
+                try:
+                    result = reconcile_prefix(
+                        storage.s3_service.s3_client, storage.bucket_name, f"{path}/", kind, user_id=user.pk
+                    )
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f'  Skipping {path}/: {e}'))
+                    continue
+                self._add(totals, result, f"{user.email} {kind}s")
+
+    def _reconcile_pfd(self, totals):
+        from apps.pfd.services.s3_pfd_manager import get_s3_pfd_manager
+
+        manager = get_s3_pfd_manager()
+        for kind, folder in ((StoredFile.KIND_PFD, manager.pfd_folder), (StoredFile.KIND_PID, manager.pid_folder)):
+            try:
+                result = reconcile_prefix(manager.s3_client, manager.bucket_name, f"{folder}/", kind)
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'  Skipping {folder}/: {e}'))
+                continue
+            self._add(totals, result, folder)
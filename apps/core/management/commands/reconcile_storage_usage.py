@@ -0,0 +1,49 @@
+"""
+Django management command to rebuild the storage usage ledger (StorageUsage)
+from the S3 buckets. Run periodically (cron) to correct drift from objects
+written or deleted outside the application.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.core.boto3_helper import Boto3Helper
+from apps.core.storage_usage import reconcile_bucket
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user/per-folder storage usage from the S3 buckets (default, PFD and organization buckets)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bucket', type=str, help='Only reconcile this bucket')
+        parser.add_argument('--region', type=str, help='Region of --bucket')
+
+    def handle(self, *args, **options):
+        if options.get('bucket'):
+            buckets = {options['bucket']: options.get('region')}
+        else:
+            buckets = self._known_buckets()
+
+        for bucket, region in buckets.items():
+            try:
+                result = reconcile_bucket(Boto3Helper.get_s3_client(region=region), bucket)
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'  Skipping {bucket}: {e}'))
+                continue
+            self.stdout.write(
+                f"  {bucket}: {result['total_count']} objects, "
+                f"{round(result['total_size_bytes'] / (1024 * 1024), 2)} MB in {result['rows']} ledger rows"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Reconciled {len(buckets)} bucket(s)'))
+
+    def _known_buckets(self):
+        """bucket -> region for every bucket the application writes to"""
+        from apps.core.s3_service import S3Service
+        from apps.pfd.services.s3_pfd_manager import get_s3_pfd_manager
+        from apps.rbac.models import Organization
+
+        s3 = S3Service()
+        pfd = get_s3_pfd_manager()
+        buckets = {s3.bucket_name: s3.region, pfd.bucket_name: pfd.region}
+        for bucket, region in Organization.objects.exclude(s3_bucket_name='').values_list('s3_bucket_name', 's3_region'):
+            buckets.setdefault(bucket, region)
+        return buckets
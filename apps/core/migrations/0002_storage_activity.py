@@ -0,0 +1,50 @@
+# Generated by Django 5.0 on 2026-10-16 19:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('users', '0003_userhistorystats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStorageProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='storage_profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_uploads', models.IntegerField(default=0)),
+                ('total_exports', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_activity', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'User Storage Profile',
+                'verbose_name_plural': 'User Storage Profiles',
+                'db_table': 'user_storage_profiles',
+            },
+        ),
+        migrations.CreateModel(
+            name='StorageActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(max_length=32)),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='storage_activities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Storage Activity',
+                'verbose_name_plural': 'Storage Activities',
+                'db_table': 'storage_activities',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='storage_act_user_recent_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.0 on 2026-10-16 19:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_storage_activity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageCatalogSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=255)),
+                ('prefix', models.CharField(max_length=1024)),
+                ('kind', models.CharField(choices=[('upload', 'User Upload'), ('export', 'User Export'), ('pfd', 'PFD File'), ('pid', 'P&ID File')], max_length=16)),
+                ('file_count', models.IntegerField(default=0)),
+                ('synced_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='storage_catalog_syncs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Storage Catalog Sync',
+                'verbose_name_plural': 'Storage Catalog Syncs',
+                'db_table': 'storage_catalog_syncs',
+            },
+        ),
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('upload', 'User Upload'), ('export', 'User Export'), ('pfd', 'PFD File'), ('pid', 'P&ID File')], max_length=16)),
+                ('bucket', models.CharField(max_length=255)),
+                ('s3_key', models.CharField(max_length=1024)),
+                ('filename', models.CharField(max_length=512)),
+                ('file_format', models.CharField(blank=True, help_text='Lower-case extension without the dot', max_length=16)),
+                ('size', models.BigIntegerField(default=0)),
+                ('last_modified', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stored_files', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Stored File',
+                'verbose_name_plural': 'Stored Files',
+                'db_table': 'storage_files',
+                'ordering': ['-last_modified', '-id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='storagecatalogsync',
+            constraint=models.UniqueConstraint(fields=('bucket', 'prefix'), name='storage_sync_unique_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='storedfile',
+            index=models.Index(fields=['user', 'kind', '-last_modified', '-id'], name='storage_file_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storedfile',
+            index=models.Index(fields=['user', 'kind', 'file_format', '-last_modified'], name='storage_file_user_format_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storedfile',
+            index=models.Index(fields=['bucket', 'kind', '-last_modified', '-id'], name='storage_file_bucket_recent_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='storedfile',
+            constraint=models.UniqueConstraint(fields=('bucket', 's3_key'), name='storage_file_unique_key'),
+        ),
+    ]
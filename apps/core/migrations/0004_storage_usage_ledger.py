@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-16 19:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_stored_file_catalog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=255)),
+                ('folder', models.CharField(blank=True, help_text="Folder type, e.g. 'uploads' or 'media/pid_drawings'", max_length=255)),
+                ('bytes_used', models.BigIntegerField(default=0)),
+                ('object_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='storage_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Storage Usage',
+                'verbose_name_plural': 'Storage Usage',
+                'db_table': 'storage_usage',
+                'indexes': [models.Index(fields=['bucket', 'folder', 'user'], name='storage_usage_scope_idx')],
+            },
+        ),
+    ]
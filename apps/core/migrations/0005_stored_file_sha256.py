@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-16 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_storage_usage_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedfile',
+            name='sha256',
+            field=models.CharField(blank=True, help_text='Hex SHA-256 computed while uploading (blank if unknown)', max_length=64),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_scopes(apps, schema_editor):
+    """Fold rows written twice for the same scope into one before the constraints are added"""
+    StorageUsage = apps.get_model('core', 'StorageUsage')
+    duplicates = (
+        StorageUsage.objects.values('bucket', 'folder', 'user')
+        .annotate(rows=Count('id'), keep=Min('id'), size=Sum('bytes_used'), count=Sum('object_count'))
+        .filter(rows__gt=1)
+    )
+    for scope in duplicates:
+        rows = StorageUsage.objects.filter(bucket=scope['bucket'], folder=scope['folder'], user=scope['user'])
+        rows.exclude(pk=scope['keep']).delete()
+        rows.update(bytes_used=scope['size'], object_count=scope['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_stored_file_sha256'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_scopes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='storageusage',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('bucket', 'folder', 'user'), name='storage_usage_user_scope_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='storageusage',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('bucket', 'folder'), name='storage_usage_shared_scope_uniq'),
+        ),
+    ]
@@ -47,3 +47,9 @@ class BaseModel(TimeStampedModel, SoftDeleteModel):
     """
     class Meta:
         abstract = True
+
+
+# Concrete models kept in their own modules
+from apps.core.storage_models import (  # noqa: E402,F401
+    StorageActivity, UserStorageProfile, StoredFile, StorageCatalogSync, StorageUsage
+)
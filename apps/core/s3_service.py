@@ -2,15 +2,18 @@
 AWS S3 Service
 Comprehensive S3 operations for media and static files management
 """
-import boto3
 import os
 import uuid
 import mimetypes
+from contextlib import nullcontext
 from datetime import datetime
 from django.conf import settings
 from botocore.exceptions import ClientError
 import logging
 
+from apps.core import storage_usage
+from apps.core.boto3_helper import Boto3Helper, S3ChecksumError
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,25 +42,18 @@ class S3Service:
     }
     
     def __init__(self):
-        """Initialize S3 client with credentials from environment"""
+        """Initialize with the shared, pooled S3 client for the bucket region"""
         self.bucket_name = os.environ.get('AWS_STORAGE_BUCKET_NAME', 'user-management-rejlers')
         self.region = os.environ.get('AWS_S3_REGION_NAME', 'us-east-1')
         
-        self.s3_client = boto3.client(
-            's3',
-            region_name=self.region,
-            aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY')
-        )
-        
-        self.s3_resource = boto3.resource(
-            's3',
-            region_name=self.region,
-            aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY')
-        )
+        self.s3_client = Boto3Helper.get_s3_client(region=self.region)
         
-        logger.info(f"[S3Service] Initialized with bucket: {self.bucket_name}, region: {self.region}")
+        logger.debug(f"[S3Service] Initialized with bucket: {self.bucket_name}, region: {self.region}")
+    
+    @property
+    def s3_resource(self):
+        """S3 resource for the current thread (resources are not thread-safe)"""
+        return Boto3Helper.get_s3_resource(region=self.region)
     
     def _get_folder(self, folder_type: str) -> str:
         """Get the S3 folder path for a given type"""
@@ -71,24 +67,30 @@ class S3Service:
         return f"{name}_{timestamp}_{unique_id}{ext}"
     
     def upload_file(self, file_obj, folder_type: str, filename: str = None, 
-                    content_type: str = None, metadata: dict = None) -> dict:
+                    content_type: str = None, metadata: dict = None,
+                    expected_sha256: str = None) -> dict:
         """
         Upload a file to S3
         
+        The file is streamed (multipart with concurrent parts when large) and
+        its size and SHA-256 are computed in the same pass.
+        
         Args:
-            file_obj: File-like object or path to file
+            file_obj: File-like object, Django UploadedFile or path to file
             folder_type: Type of folder (pid_drawings, crs_documents, etc.)
             filename: Optional custom filename
             content_type: Optional MIME type
             metadata: Optional metadata dictionary
+            expected_sha256: Optional hex SHA-256 the content must match
             
         Returns:
-            dict with upload details (key, url, size, etc.)
+            dict with upload details (key, url, size, sha256, etc.)
         """
         try:
             folder = self._get_folder(folder_type)
             
             # Generate unique filename if not provided
+            custom_name = bool(filename)
             if not filename:
                 if hasattr(file_obj, 'name'):
                     filename = self._generate_unique_filename(file_obj.name)
@@ -97,6 +99,9 @@ class S3Service:
             
             s3_key = f"{folder}{filename}"
             
+            # A caller-chosen name may replace an existing object
+            previous_size = storage_usage.object_size(self.s3_client, self.bucket_name, s3_key) if custom_name else None
+            
             # Detect content type
             if not content_type:
                 content_type, _ = mimetypes.guess_type(filename)
@@ -110,28 +115,20 @@ class S3Service:
             if metadata:
                 extra_args['Metadata'] = metadata
             
-            # Upload file
-            if hasattr(file_obj, 'read'):
-                # File-like object
-                file_obj.seek(0)
-                self.s3_client.upload_fileobj(
-                    file_obj, 
-                    self.bucket_name, 
+            # Upload file (file-like object or path to file)
+            source = nullcontext(file_obj) if hasattr(file_obj, 'read') else open(file_obj, 'rb')
+            with source as fileobj:
+                uploaded = Boto3Helper.upload_stream(
+                    fileobj,
+                    self.bucket_name,
                     s3_key,
-                    ExtraArgs=extra_args
+                    s3_client=self.s3_client,
+                    extra_args=extra_args,
+                    expected_sha256=expected_sha256
                 )
-                file_obj.seek(0)
-                file_size = len(file_obj.read())
-                file_obj.seek(0)
-            else:
-                # File path
-                self.s3_client.upload_file(
-                    file_obj, 
-                    self.bucket_name, 
-                    s3_key,
-                    ExtraArgs=extra_args
-                )
-                file_size = os.path.getsize(file_obj)
+            file_size = uploaded['size']
+            
+            storage_usage.record_upload(self.bucket_name, s3_key, file_size, previous_size)
             
             logger.info(f"[S3Service] Uploaded: {s3_key} ({file_size} bytes)")
             
@@ -141,13 +138,14 @@ class S3Service:
                 'bucket': self.bucket_name,
                 'region': self.region,
                 'size': file_size,
+                'sha256': uploaded['sha256'],
                 'content_type': content_type,
                 'url': self.get_presigned_url(s3_key),
                 's3_url': f"s3://{self.bucket_name}/{s3_key}",
                 'https_url': f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{s3_key}"
             }
             
-        except ClientError as e:
+        except (ClientError, S3ChecksumError) as e:
             logger.error(f"[S3Service] Upload failed: {str(e)}")
             return {
                 'success': False,
@@ -182,7 +180,8 @@ class S3Service:
                     'key': s3_key,
                     'body': response['Body'],
                     'content_type': response.get('ContentType'),
-                    'size': response.get('ContentLength')
+                    'size': response.get('ContentLength'),
+                    'etag': response.get('ETag')
                 }
                 
         except ClientError as e:
@@ -195,7 +194,9 @@ class S3Service:
     def delete_file(self, s3_key: str) -> dict:
         """Delete a file from S3"""
         try:
+            size = storage_usage.object_size(self.s3_client, self.bucket_name, s3_key)
             self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
+            storage_usage.record_delete(self.bucket_name, s3_key, size)
             logger.info(f"[S3Service] Deleted: {s3_key}")
             return {
                 'success': True,
@@ -214,10 +215,14 @@ class S3Service:
             folder = self._get_folder(folder_type)
             bucket = self.s3_resource.Bucket(self.bucket_name)
             
-            deleted_count = 0
-            for obj in bucket.objects.filter(Prefix=folder):
-                obj.delete()
-                deleted_count += 1
+            deleted = []
+            try:
+                for obj in bucket.objects.filter(Prefix=folder):
+                    obj.delete()
+                    deleted.append((obj.key, obj.size))
+            finally:
+                storage_usage.record_deletes(self.bucket_name, deleted)
+            deleted_count = len(deleted)
             
             logger.info(f"[S3Service] Deleted {deleted_count} files from {folder}")
             return {
@@ -375,12 +380,16 @@ class S3Service:
     def copy_file(self, source_key: str, dest_key: str) -> dict:
         """Copy a file within S3"""
         try:
+            size = storage_usage.object_size(self.s3_client, self.bucket_name, source_key)
+            previous_size = storage_usage.object_size(self.s3_client, self.bucket_name, dest_key)
             copy_source = {'Bucket': self.bucket_name, 'Key': source_key}
             self.s3_client.copy_object(
                 CopySource=copy_source,
                 Bucket=self.bucket_name,
                 Key=dest_key
             )
+            if size is not None:
+                storage_usage.record_upload(self.bucket_name, dest_key, size, previous_size)
             logger.info(f"[S3Service] Copied: {source_key} to {dest_key}")
             return {
                 'success': True,
@@ -395,7 +404,7 @@ class S3Service:
             }
     
     def move_file(self, source_key: str, dest_key: str) -> dict:
-        """Move a file within S3 (copy then delete)"""
+        """Move a file within S3 (copy then delete; usage moves with it)"""
         copy_result = self.copy_file(source_key, dest_key)
         if copy_result['success']:
             delete_result = self.delete_file(source_key)
@@ -408,24 +417,36 @@ class S3Service:
         return copy_result
     
     def get_bucket_size(self) -> dict:
-        """Get total size of all objects in bucket"""
+        """
+        Get total size of all objects in bucket
+        
+        Read from the storage usage ledger (built from a full listing only the
+        first time; kept current by uploads/deletes and the
+        reconcile_storage_usage command).
+        """
         try:
-            total_size = 0
-            total_count = 0
-            
-            paginator = self.s3_client.get_paginator('list_objects_v2')
-            for page in paginator.paginate(Bucket=self.bucket_name):
-                for obj in page.get('Contents', []):
-                    total_size += obj['Size']
-                    total_count += 1
-            
+            storage_usage.ensure_reconciled(self.s3_client, self.bucket_name)
+            usage = storage_usage.bucket_usage(self.bucket_name)
             return {
                 'success': True,
-                'total_size_bytes': total_size,
-                'total_size_mb': round(total_size / (1024 * 1024), 2),
-                'total_count': total_count
+                **usage
             }
-        except ClientError as e:
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def get_folder_size(self, folder_type: str) -> dict:
+        """Get total size of a folder type (from the storage usage ledger)"""
+        try:
+            folder = self._get_folder(folder_type).rstrip('/')
+            return {
+                'success': True,
+                'folder': folder,
+                **storage_usage.bucket_usage(self.bucket_name, folder=folder)
+            }
+        except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
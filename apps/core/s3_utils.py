@@ -3,12 +3,13 @@ AWS S3 Utilities
 Secure S3 operations using boto3 with best practices
 """
 import logging
-import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 from django.conf import settings
 from typing import Optional, BinaryIO
 import mimetypes
 
+from apps.core.boto3_helper import Boto3Helper
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,14 +35,11 @@ class S3Client:
         3. AWS credentials file (~/.aws/credentials)
         """
         try:
-            self.s3_client = boto3.client(
-                's3',
-                region_name=settings.AWS_S3_REGION_NAME,
-                # Credentials are auto-detected from environment/IAM role
-                # NEVER hardcode credentials here
-            )
+            # Shared pooled client - credentials are auto-detected from
+            # environment/IAM role. NEVER hardcode credentials here
+            self.s3_client = Boto3Helper.get_s3_client(region=settings.AWS_S3_REGION_NAME)
             self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
-            logger.info(f"S3 client initialized for region: {settings.AWS_S3_REGION_NAME}")
+            logger.debug(f"S3 client initialized for region: {settings.AWS_S3_REGION_NAME}")
         except NoCredentialsError:
             logger.error("AWS credentials not found. Set environment variables or use IAM role.")
             raise
@@ -92,6 +92,7 @@ class S3FileUploadView(APIView):
         - file: The file to upload
         - folder_type: Target folder (pid_drawings, crs_documents, etc.)
         - filename: Optional custom filename
+        - sha256: Optional hex SHA-256 of the file, verified after upload
         """
         try:
             s3 = get_s3_service()
@@ -116,7 +117,8 @@ class S3FileUploadView(APIView):
                 file_obj=file_obj,
                 folder_type=folder_type,
                 filename=filename,
-                metadata=metadata
+                metadata=metadata,
+                expected_sha256=request.data.get('sha256') or None
             )
             
             if result['success']:
@@ -0,0 +1,19 @@
+"""
+Core Signals
+"""
+from django.conf import settings
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from apps.core.storage_usage import release_user
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def release_storage_usage(sender, instance, **kwargs):
+    """
+    Move a deleted user's storage usage onto the shared ledger rows
+
+    SET_NULL alone would leave a second NULL-user row per scope, which the
+    unique scope constraint rejects.
+    """
+    release_user(instance.pk)
@@ -0,0 +1,252 @@
+"""
+S3 File Catalog
+Database index of S3 objects (apps.core.storage_models.StoredFile) so file
+history is filtered, ordered and paginated in SQL instead of listing S3
+prefixes on every request.
+
+Rows are written next to every put/delete and reconciled with the bucket by
+``python manage.py reconcile_storage_catalog``. A prefix that has never been
+reconciled is synced once, on its first listing.
+"""
+import base64
+import binascii
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.storage_models import StoredFile, StorageCatalogSync
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+BATCH_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def file_format_for(filename: str) -> str:
+    """Lower-case extension without the dot ('' if none)"""
+    return os.path.splitext(filename)[1][1:].lower()[:16]
+
+
+def record_file(
+    bucket: str,
+    s3_key: str,
+    kind: str,
+    size: int,
+    user_id: Optional[int] = None,
+    last_modified: Optional[datetime] = None,
+    sha256: str = ''
+) -> Optional[StoredFile]:
+    """
+    Add or refresh the catalog row of an object that was just written
+
+    Errors are logged, not raised - the object is already in S3 and the next
+    reconcile picks it up.
+    """
+    filename = s3_key.split('/')[-1]
+    try:
+        stored_file, _ = StoredFile.objects.update_or_create(
+            bucket=bucket,
+            s3_key=s3_key,
+            defaults={
+                'user_id': user_id,
+                'kind': kind,
+                'filename': filename,
+                'file_format': file_format_for(filename),
+                'size': size,
+                'sha256': sha256,
+                'last_modified': last_modified or timezone.now(),
+            }
+        )
+        return stored_file
+    except Exception as e:
+        logger.error(f"Failed to catalog {s3_key}: {e}")
+        return None
+
+
+def forget_file(bucket: str, s3_key: str) -> int:
+    """Remove the catalog row of a deleted object"""
+    try:
+        deleted, _ = StoredFile.objects.filter(bucket=bucket, s3_key=s3_key).delete()
+        return deleted
+    except Exception as e:
+        logger.error(f"Failed to remove {s3_key} from catalog: {e}")
+        return 0
+
+
+def file_dict(stored_file: StoredFile) -> Dict:
+    """API representation of a catalog row"""
+    return {
+        's3_key': stored_file.s3_key,
+        'filename': stored_file.filename,
+        'format': stored_file.file_format or 'unknown',
+        'size': stored_file.size,
+        'sha256': stored_file.sha256 or None,
+        'last_modified': stored_file.last_modified.isoformat(),
+    }
+
+
+def encode_cursor(stored_file: StoredFile) -> str:
+    """Opaque cursor pointing just after ``stored_file`` in newest-first order"""
+    raw = f"{stored_file.last_modified.isoformat()}|{stored_file.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, pk = raw.rsplit('|', 1)
+        last_modified = datetime.fromisoformat(timestamp)
+        pk = int(pk)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+    if timezone.is_naive(last_modified):
+        last_modified = timezone.make_aware(last_modified)
+    return last_modified, pk
+
+
+def filter_files(
+    queryset,
+    file_format: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Apply the optional history filters
+
+    Args:
+        queryset: StoredFile queryset
+        file_format: Extension, e.g. 'xlsx' or '.pdf'
+        since: Only files modified at or after this time
+        until: Only files modified before this time
+    """
+    if file_format:
+        queryset = queryset.filter(file_format=file_format.lower().lstrip('.'))
+    if since:
+        queryset = queryset.filter(last_modified__gte=since)
+    if until:
+        queryset = queryset.filter(last_modified__lt=until)
+    return queryset
+
+
+def paginate_files(queryset, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict:
+    """
+    One newest-first page of a StoredFile queryset (keyset pagination)
+
+    Args:
+        queryset: Filtered StoredFile queryset
+        limit: Page size (capped at MAX_PAGE_SIZE)
+        cursor: ``next_cursor`` of the previous page
+
+    Returns:
+        Dict with 'files' (StoredFile rows) and 'next_cursor' (None on the last page)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    queryset = queryset.order_by('-last_modified', '-id')
+    if cursor:
+        last_modified, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(last_modified__lt=last_modified) | Q(last_modified=last_modified, id__lt=pk)
+        )
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {'files': rows[:limit], 'next_cursor': next_cursor}
+
+
+def reconcile_prefix(s3_client, bucket: str, prefix: str, kind: str, user_id: Optional[int] = None) -> Dict[str, int]:
+    """
+    Bring the catalog of one S3 prefix in line with the bucket
+
+    Pages through list_objects_v2, inserts missing rows, refreshes changed
+    ones and drops rows whose object no longer exists.
+
+    Returns:
+        Dict with added/updated/removed/total counts
+    """
+    existing = {
+        s3_key: (pk, size, last_modified)
+        for pk, s3_key, size, last_modified in StoredFile.objects.filter(
+            bucket=bucket, s3_key__startswith=prefix
+        ).values_list('pk', 's3_key', 'size', 'last_modified').iterator(chunk_size=2000)
+    }
+
+    to_create = []
+    to_update = []
+    seen = set()
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if key.endswith('/'):
+                continue  # Folder marker
+            seen.add(key)
+
+            current = existing.get(key)
+            if current is None:
+                filename = key.split('/')[-1]
+                to_create.append(StoredFile(
+                    user_id=user_id,
+                    kind=kind,
+                    bucket=bucket,
+                    s3_key=key,
+                    filename=filename,
+                    file_format=file_format_for(filename),
+                    size=obj['Size'],
+                    last_modified=obj['LastModified'],
+                ))
+            elif current[1] != obj['Size'] or obj['LastModified'] > current[2]:
+                # Replaced since it was recorded (rows written after an upload carry
+                # the completion time, which is never older than S3's LastModified),
+                # so the recorded hash no longer applies
+                to_update.append(StoredFile(pk=current[0], size=obj['Size'], sha256='', last_modified=obj['LastModified']))
+
+    stale = [pk for key, (pk, _, _) in existing.items() if key not in seen]
+
+    with transaction.atomic():
+        # ignore_conflicts: a concurrent upload may have cataloged the key meanwhile
+        StoredFile.objects.bulk_create(to_create, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        StoredFile.objects.bulk_update(to_update, ['size', 'sha256', 'last_modified'], batch_size=BATCH_SIZE)
+        for start in range(0, len(stale), BATCH_SIZE):
+            StoredFile.objects.filter(pk__in=stale[start:start + BATCH_SIZE]).delete()
+        StorageCatalogSync.objects.update_or_create(
+            bucket=bucket,
+            prefix=prefix,
+            defaults={
+                'kind': kind,
+                'user_id': user_id,
+                'file_count': len(seen),
+                'synced_at': timezone.now(),
+            }
+        )
+
+    return {'added': len(to_create), 'updated': len(to_update), 'removed': len(stale), 'total': len(seen)}
+
+
+def ensure_cataloged(s3_client, bucket: str, prefix: str, kind: str, user_id: Optional[int] = None):
+    """Reconcile a prefix once if it has never been cataloged (files written before the catalog existed)"""
+    if StorageCatalogSync.objects.filter(bucket=bucket, prefix=prefix).exists():
+        return
+    try:
+        result = reconcile_prefix(s3_client, bucket, prefix, kind, user_id=user_id)
+        logger.info(f"Cataloged {result['total']} files under {bucket}/{prefix}")
+    except Exception as e:
+        logger.error(f"Failed to catalog {bucket}/{prefix}: {e}")
@@ -0,0 +1,190 @@
+"""
+User Storage Models
+Database side of the per-user S3 storage (see apps.crs_documents.helpers.user_storage)
+"""
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+
+
+class StorageActivity(models.Model):
+    """
+    Append-only log of user storage events (upload, export, download, delete, share)
+
+    One INSERT per event - replaces the per-day activity_*.json objects that
+    were downloaded, extended and re-uploaded for every event.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='storage_activities'
+    )
+    action = models.CharField(max_length=32)
+    details = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'storage_activities'
+        verbose_name = 'Storage Activity'
+        verbose_name_plural = 'Storage Activities'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='storage_act_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.action} by user {self.user_id} at {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class UserStorageProfile(models.Model):
+    """Per-user storage counters, incremented atomically with F() updates"""
+    COUNTERS = ('total_uploads', 'total_exports')
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='storage_profile'
+    )
+    total_uploads = models.IntegerField(default=0)
+    total_exports = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_activity = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'user_storage_profiles'
+        verbose_name = 'User Storage Profile'
+        verbose_name_plural = 'User Storage Profiles'
+
+    def __str__(self):
+        return f"Storage profile of user {self.user_id}"
+
+
+class StoredFile(models.Model):
+    """
+    Catalog of files kept in S3, one row per object
+
+    Written on upload/export and removed on delete, and reconciled with the
+    bucket by the reconcile_storage_catalog command. History listings page
+    through this table (newest first) instead of listing S3 prefixes.
+    """
+    KIND_UPLOAD = 'upload'
+    KIND_EXPORT = 'export'
+    KIND_PFD = 'pfd'
+    KIND_PID = 'pid'
+    KIND_CHOICES = [
+        (KIND_UPLOAD, 'User Upload'),
+        (KIND_EXPORT, 'User Export'),
+        (KIND_PFD, 'PFD File'),
+        (KIND_PID, 'P&ID File'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='stored_files'
+    )
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    bucket = models.CharField(max_length=255)
+    s3_key = models.CharField(max_length=1024)
+    filename = models.CharField(max_length=512)
+    file_format = models.CharField(max_length=16, blank=True, help_text='Lower-case extension without the dot')
+    size = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, help_text='Hex SHA-256 computed while uploading (blank if unknown)')
+    last_modified = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'storage_files'
+        verbose_name = 'Stored File'
+        verbose_name_plural = 'Stored Files'
+        ordering = ['-last_modified', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 's3_key'], name='storage_file_unique_key'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'kind', '-last_modified', '-id'], name='storage_file_user_recent_idx'),
+            models.Index(fields=['user', 'kind', 'file_format', '-last_modified'], name='storage_file_user_format_idx'),
+            models.Index(fields=['bucket', 'kind', '-last_modified', '-id'], name='storage_file_bucket_recent_idx'),
+        ]
+
+    def __str__(self):
+        return self.s3_key
+
+
+class StorageCatalogSync(models.Model):
+    """Last time an S3 prefix was reconciled into StoredFile"""
+    bucket = models.CharField(max_length=255)
+    prefix = models.CharField(max_length=1024)
+    kind = models.CharField(max_length=16, choices=StoredFile.KIND_CHOICES)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='storage_catalog_syncs'
+    )
+    file_count = models.IntegerField(default=0)
+    synced_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'storage_catalog_syncs'
+        verbose_name = 'Storage Catalog Sync'
+        verbose_name_plural = 'Storage Catalog Syncs'
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'prefix'], name='storage_sync_unique_prefix'),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket}/{self.prefix} ({self.file_count} files)"
+
+
+class StorageUsage(models.Model):
+    """
+    Storage usage ledger: bytes and object count per bucket, folder type and user
+
+    Adjusted by the S3 service layer on every upload/delete/move and rebuilt
+    from the bucket by the reconcile_storage_usage command. Size and quota
+    queries sum these rows instead of listing S3.
+    """
+    bucket = models.CharField(max_length=255)
+    folder = models.CharField(max_length=255, blank=True, help_text="Folder type, e.g. 'uploads' or 'media/pid_drawings'")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='storage_usage'
+    )
+    bytes_used = models.BigIntegerField(default=0)
+    object_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'storage_usage'
+        verbose_name = 'Storage Usage'
+        verbose_name_plural = 'Storage Usage'
+        indexes = [
+            models.Index(fields=['bucket', 'folder', 'user'], name='storage_usage_scope_idx'),
+        ]
+        # One row per scope, rows without a user included. Two partial constraints
+        # rather than nulls_distinct=False, which Django skips on SQLite and PostgreSQL < 15
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bucket', 'folder', 'user'],
+                condition=models.Q(user__isnull=False),
+                name='storage_usage_user_scope_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['bucket', 'folder'],
+                condition=models.Q(user__isnull=True),
+                name='storage_usage_shared_scope_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket}/{self.folder} user {self.user_id}: {self.bytes_used} bytes"
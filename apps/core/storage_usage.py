@@ -0,0 +1,256 @@
+"""
+S3 Storage Usage Ledger
+Keeps bytes/object counts per bucket, folder type and user in the database
+(apps.core.storage_models.StorageUsage) so bucket size, user quota and
+organization usage are answered with a SUM over a handful of rows instead of
+listing every object in S3.
+
+The service layer adjusts the ledger on upload, delete and move;
+``python manage.py reconcile_storage_usage`` rebuilds it from the buckets
+to correct drift from writes made outside the application.
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from apps.core.storage_models import StorageUsage, StoredFile
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def classify_key(s3_key: str) -> Tuple[str, Optional[int]]:
+    """
+    Ledger scope (folder type, user id) of an object key
+
+    users/{id}/{folder}/... belongs to that user; any other key is counted
+    against its top two directory levels (e.g. 'media/pid_drawings',
+    'PFD_to_PID/PFD').
+    """
+    parts = s3_key.split('/')
+    directories = parts[:-1]
+    if len(directories) >= 2 and directories[0] == 'users':
+        user_id = int(directories[1]) if directories[1].isdigit() else None
+        folder = directories[2] if len(directories) > 2 else ''
+        return folder, user_id
+    return '/'.join(directories[:2]), None
+
+
+def _existing_user_id(user_id: Optional[int]) -> Optional[int]:
+    """user_id if that user exists (keys may outlive their user)"""
+    if user_id and get_user_model().objects.filter(pk=user_id).exists():
+        return user_id
+    return None
+
+
+def _apply(bucket: str, folder: str, user_id: Optional[int], size_delta: int, count_delta: int):
+    """
+    Atomically add deltas to one ledger row, creating it if needed
+
+    Keys of deleted users are counted on the scope's shared (NULL user) row.
+    The unique scope constraints make a concurrent first write fail instead of
+    adding a second row; the loser then updates the winner's row.
+    """
+    user_id = _existing_user_id(user_id)
+    rows = StorageUsage.objects.filter(bucket=bucket, folder=folder, user_id=user_id)
+    changes = {
+        'bytes_used': F('bytes_used') + size_delta,
+        'object_count': F('object_count') + count_delta,
+        'updated_at': timezone.now(),
+    }
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            StorageUsage.objects.create(
+                bucket=bucket,
+                folder=folder,
+                user_id=user_id,
+                bytes_used=size_delta,
+                object_count=count_delta,
+            )
+    except IntegrityError:
+        rows.update(**changes)
+
+
+def release_user(user_id: int):
+    """Move a user's ledger rows onto the shared rows of the same scopes (before the user is deleted)"""
+    with transaction.atomic():
+        for row in StorageUsage.objects.select_for_update().filter(user_id=user_id):
+            row.delete()
+            _apply(row.bucket, row.folder, None, row.bytes_used, row.object_count)
+
+
+def record_usage(bucket: str, s3_key: str, size_delta: int, count_delta: int):
+    """
+    Adjust the ledger for one object
+
+    Errors are logged, not raised - the S3 operation already happened and the
+    next reconcile corrects the ledger.
+    """
+    if s3_key.endswith('/'):
+        return  # Folder marker
+    folder, user_id = classify_key(s3_key)
+    try:
+        _apply(bucket, folder, user_id, size_delta, count_delta)
+    except Exception as e:
+        logger.error(f"Failed to record storage usage for {s3_key}: {e}")
+
+
+def record_upload(bucket: str, s3_key: str, size: int, previous_size: Optional[int] = None):
+    """Account a written object; previous_size is the size of the object it replaced, if any"""
+    if previous_size is None:
+        record_usage(bucket, s3_key, size, 1)
+    else:
+        record_usage(bucket, s3_key, size - previous_size, 0)
+
+
+def record_delete(bucket: str, s3_key: str, size: Optional[int]):
+    """Account a deleted object (size None: the object did not exist)"""
+    if size is not None:
+        record_usage(bucket, s3_key, -size, -1)
+
+
+def record_deletes(bucket: str, objects: Iterable[Tuple[str, int]]):
+    """Account many deleted (key, size) objects with one update per ledger row"""
+    totals = defaultdict(lambda: [0, 0])
+    for s3_key, size in objects:
+        if s3_key.endswith('/'):
+            continue
+        scope = classify_key(s3_key)
+        totals[scope][0] -= size
+        totals[scope][1] -= 1
+    for (folder, user_id), (size_delta, count_delta) in totals.items():
+        try:
+            _apply(bucket, folder, user_id, size_delta, count_delta)
+        except Exception as e:
+            logger.error(f"Failed to record storage usage for {bucket}/{folder}: {e}")
+
+
+def object_size(s3_client, bucket: str, s3_key: str) -> Optional[int]:
+    """
+    Size of an existing object, None if it does not exist
+
+    Read from the file catalog when the object is cataloged, otherwise from
+    a HEAD request.
+    """
+    size = StoredFile.objects.filter(bucket=bucket, s3_key=s3_key).values_list('size', flat=True).first()
+    if size is not None:
+        return size
+    try:
+        return s3_client.head_object(Bucket=bucket, Key=s3_key)['ContentLength']
+    except Exception:
+        return None
+
+
+def _summarize(rows) -> Dict:
+    totals = rows.aggregate(total_size=Sum('bytes_used'), total_count=Sum('object_count'))
+    total_size = totals['total_size'] or 0
+    return {
+        'total_size_bytes': total_size,
+        'total_size_mb': round(total_size / (1024 * 1024), 2),
+        'total_count': totals['total_count'] or 0,
+    }
+
+
+def _by_folder(rows) -> Dict[str, Dict]:
+    return {
+        row['folder']: {'size_bytes': row['size'] or 0, 'count': row['count'] or 0}
+        for row in rows.values('folder').annotate(size=Sum('bytes_used'), count=Sum('object_count'))
+    }
+
+
+def bucket_usage(bucket: str, folder: Optional[str] = None) -> Dict:
+    """Total size and object count of a bucket (optionally one folder type)"""
+    rows = StorageUsage.objects.filter(bucket=bucket)
+    if folder is not None:
+        rows = rows.filter(folder=folder)
+    return _summarize(rows)
+
+
+def user_usage(user_id: int, bucket: Optional[str] = None) -> Dict:
+    """Total size and object count of a user's files, with a per-folder breakdown"""
+    rows = StorageUsage.objects.filter(user_id=user_id)
+    if bucket:
+        rows = rows.filter(bucket=bucket)
+    usage = _summarize(rows)
+    usage['folders'] = _by_folder(rows)
+    return usage
+
+
+def organization_usage(organization) -> Dict:
+    """Total size and object count of the files of an organization's users"""
+    rows = StorageUsage.objects.filter(user__rbac_profile__organization=organization)
+    usage = _summarize(rows)
+    usage['folders'] = _by_folder(rows)
+    return usage
+
+
+def reconcile_bucket(s3_client, bucket: str) -> Dict[str, int]:
+    """
+    Rebuild the ledger of a bucket from a full listing
+
+    This is the only place that lists the whole bucket; run it from the
+    scheduled job, not from requests. Changes made while the listing is in
+    progress are corrected by the next run.
+
+    Returns:
+        Dict with total_size_bytes, total_count and rows
+    """
+    totals = defaultdict(lambda: [0, 0])
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket):
+        for obj in page.get('Contents', []):
+            if obj['Key'].endswith('/'):
+                continue
+            scope = classify_key(obj['Key'])
+            totals[scope][0] += obj['Size']
+            totals[scope][1] += 1
+
+    user_ids = {user_id for _, user_id in totals if user_id}
+    existing_users = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+
+    merged = defaultdict(lambda: [0, 0])
+    for (folder, user_id), (size, count) in totals.items():
+        scope = (folder, user_id if user_id in existing_users else None)
+        merged[scope][0] += size
+        merged[scope][1] += count
+
+    now = timezone.now()
+    with transaction.atomic():
+        StorageUsage.objects.filter(bucket=bucket).delete()
+        StorageUsage.objects.bulk_create([
+            StorageUsage(
+                bucket=bucket,
+                folder=folder,
+                user_id=user_id,
+                bytes_used=size,
+                object_count=count,
+                updated_at=now,
+                reconciled_at=now,
+            )
+            for (folder, user_id), (size, count) in merged.items()
+        ], batch_size=BATCH_SIZE)
+
+    return {
+        'total_size_bytes': sum(size for size, _ in merged.values()),
+        'total_count': sum(count for _, count in merged.values()),
+        'rows': len(merged),
+    }
+
+
+def ensure_reconciled(s3_client, bucket: str):
+    """Build the ledger of a bucket once if it has never been reconciled"""
+    if StorageUsage.objects.filter(bucket=bucket, reconciled_at__isnull=False).exists():
+        return
+    try:
+        result = reconcile_bucket(s3_client, bucket)
+        logger.info(f"Built storage usage ledger for {bucket}: {result['total_count']} objects")
+    except Exception as e:
+        logger.error(f"Failed to build storage usage ledger for {bucket}: {e}")
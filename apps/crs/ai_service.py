@@ -11,6 +11,8 @@ from django.db.models import Q, Count, Avg
 from django.utils import timezone
 import logging
 
+from .comment_matching import PreparedText, score_prepared, find_candidate_pairs
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,59 +29,37 @@ class CRSRevisionAIService:
         Uses Levenshtein distance ratio (can be replaced with embeddings)
         Returns: similarity score 0-100
         """
-        if not text1 or not text2:
-            return 0.0
-        
-        # Normalize texts
-        text1 = text1.lower().strip()
-        text2 = text2.lower().strip()
-        
-        if text1 == text2:
-            return 100.0
-        
-        # Simple word-based similarity (can be enhanced with NLP)
-        words1 = set(text1.split())
-        words2 = set(text2.split())
-        
-        if not words1 or not words2:
-            return 0.0
-        
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        jaccard_similarity = len(intersection) / len(union) if union else 0.0
-        
-        # Check for substring matches (one comment might be expansion of another)
-        if text1 in text2 or text2 in text1:
-            jaccard_similarity = max(jaccard_similarity, 0.7)
-        
-        return round(jaccard_similarity * 100, 2)
+        return score_prepared(PreparedText(text1), PreparedText(text2))
     
     @staticmethod
     def detect_comment_links(source_comments, target_comments, threshold: float = 60.0) -> List[Dict]:
         """
         Detect potential links between comments from different revisions
         Returns list of potential links with similarity scores
+        
+        Only pairs from the inverted-index candidate generator are scored;
+        the result is the same as scoring every source x target pair
         """
+        source_comments = list(source_comments)
+        target_comments = list(target_comments)
+        sources = [PreparedText(c.comment_text) for c in source_comments]
+        targets = [PreparedText(c.comment_text) for c in target_comments]
+        
         links = []
         
-        for source_comment in source_comments:
-            for target_comment in target_comments:
-                similarity = CRSRevisionAIService.calculate_text_similarity(
-                    source_comment.comment_text,
-                    target_comment.comment_text
-                )
+        for s, t in find_candidate_pairs(sources, targets, threshold):
+            similarity = score_prepared(sources[s], targets[t])
+            
+            if similarity >= threshold:
+                link_type = 'identical' if similarity > 95 else 'modified' if similarity > 80 else 'related'
                 
-                if similarity >= threshold:
-                    link_type = 'identical' if similarity > 95 else 'modified' if similarity > 80 else 'related'
-                    
-                    links.append({
-                        'source_comment_id': source_comment.id,
-                        'target_comment_id': target_comment.id,
-                        'similarity_score': similarity,
-                        'link_type': link_type,
-                        'ai_confidence': similarity,
-                    })
+                links.append({
+                    'source_comment_id': source_comments[s].id,
+                    'target_comment_id': target_comments[t].id,
+                    'similarity_score': similarity,
+                    'link_type': link_type,
+                    'ai_confidence': similarity,
+                })
         
         return sorted(links, key=lambda x: x['similarity_score'], reverse=True)
     
@@ -0,0 +1,152 @@
+"""
+Candidate generation for CRS comment linking
+Finds the comment pairs that can reach a similarity threshold without
+scoring every source x target pair.
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+
+class PreparedText:
+    """Comment text normalised once: lowercase/stripped text and its word set"""
+    __slots__ = ('raw', 'text', 'words')
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self.text = raw.lower().strip() if raw else ''
+        self.words = frozenset(self.text.split())
+
+
+def score_prepared(a: PreparedText, b: PreparedText) -> float:
+    """Same score as CRSRevisionAIService.calculate_text_similarity, on prepared texts"""
+    if not a.raw or not b.raw:
+        return 0.0
+    if a.text == b.text:
+        return 100.0
+    if not a.words or not b.words:
+        return 0.0
+
+    intersection = len(a.words & b.words)
+    jaccard_similarity = intersection / (len(a.words) + len(b.words) - intersection)
+
+    # Check for substring matches (one comment might be expansion of another)
+    if a.text in b.text or b.text in a.text:
+        jaccard_similarity = max(jaccard_similarity, 0.7)
+
+    return round(jaccard_similarity * 100, 2)
+
+
+class CommentCandidateIndex:
+    """
+    Inverted index over target comments (word -> target positions)
+
+    Candidates for a source comment are the union of:
+    - targets with identical normalised text
+    - Jaccard candidates from a prefix filter: words are ordered rarest first
+      and a pair reaching Jaccard t must share a word within the first
+      |x| - ceil(t * |x|) + 1 words of both texts
+    - substring candidates (worth 70 points) when the threshold allows them
+
+    Every pair that can score >= threshold is returned, so results match the
+    full nested loop exactly.
+    """
+
+    SUBSTRING_SCORE = 70.0
+
+    def __init__(self, targets: List[PreparedText], threshold: float):
+        self.targets = targets
+        # Scores are rounded to 2 decimals; leave room so 59.996 -> 60.0 still qualifies
+        self.min_jaccard = max(0.0, (threshold - 0.005) / 100)
+        self.check_substrings = threshold <= self.SUBSTRING_SCORE
+
+        self.document_frequency: Dict[str, int] = defaultdict(int)
+        for target in targets:
+            for word in target.words:
+                self.document_frequency[word] += 1
+
+        self.by_text: Dict[str, List[int]] = defaultdict(list)
+        self.prefix_index: Dict[str, List[int]] = defaultdict(list)
+        self.word_index: Dict[str, List[int]] = defaultdict(list)
+        self.interior_index: Dict[str, List[int]] = defaultdict(list)
+        self.short_targets: List[int] = []
+
+        for position, target in enumerate(targets):
+            if not target.raw:
+                continue
+            self.by_text[target.text].append(position)
+            for word in self._prefix(target.words):
+                self.prefix_index[word].append(position)
+            if self.check_substrings:
+                for word in target.words:
+                    self.word_index[word].append(position)
+                tokens = target.text.split()
+                if len(tokens) < 3:
+                    self.short_targets.append(position)
+                else:
+                    # A target inside a source shares its interior words whole;
+                    # filing it under its rarest one keeps each target in one list
+                    self.interior_index[self._ordered(set(tokens[1:-1]))[0]].append(position)
+
+    def _ordered(self, words) -> List[str]:
+        # Rarest first (unseen words are rarest); ties broken by the word itself
+        return sorted(words, key=lambda w: (self.document_frequency.get(w, 0), w))
+
+    def _prefix(self, words) -> List[str]:
+        ordered = self._ordered(words)
+        size = len(ordered) - math.ceil(self.min_jaccard * len(ordered)) + 1
+        return ordered[:max(size, 0)]
+
+    def candidates(self, source: PreparedText) -> Set[int]:
+        if not source.raw:
+            return set()
+
+        found = set(self.by_text.get(source.text, ()))
+
+        for word in self._prefix(source.words):
+            found.update(self.prefix_index.get(word, ()))
+
+        if self.check_substrings and source.text:
+            tokens = source.text.split()
+            if len(tokens) >= 3:
+                # A source inside a target shares its interior words whole
+                interior = self._ordered(set(tokens[1:-1]))
+                found.update(
+                    t for t in self.word_index.get(interior[0], ())
+                    if source.text in self.targets[t].text
+                )
+            else:
+                # Short sources may sit inside a target across word boundaries
+                found.update(
+                    t for t, target in enumerate(self.targets)
+                    if target.raw and source.text in target.text
+                )
+            # Short targets inside this source
+            found.update(
+                t for t in self.short_targets
+                if self.targets[t].text and self.targets[t].text in source.text
+            )
+            # Longer targets inside this source
+            for word in source.words:
+                found.update(
+                    t for t in self.interior_index.get(word, ())
+                    if self.targets[t].text in source.text
+                )
+
+        return found
+
+
+def find_candidate_pairs(sources: List[PreparedText], targets: List[PreparedText],
+                         threshold: float) -> List[Tuple[int, int]]:
+    """All (source position, target position) pairs that may score >= threshold"""
+    if threshold <= 0:
+        # Every pair qualifies
+        return [(s, t) for s in range(len(sources)) for t in range(len(targets))]
+
+    index = CommentCandidateIndex(targets, threshold)
+    pairs = []
+    for s, source in enumerate(sources):
+        for t in sorted(index.candidates(source)):
+            pairs.append((s, t))
+    return pairs
@@ -5,6 +5,10 @@ Handles OAuth2 authentication and data export to Google Sheets
 
 import os
 import json
+import time
+import random
+import hashlib
+import threading
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
@@ -18,6 +22,90 @@ try:
 except ImportError:
     GOOGLE_AVAILABLE = False
 
+# Columns A..M of the CRS sheet
+SHEET_COLUMNS = 13
+EMPTY_ROW = [''] * SHEET_COLUMNS
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def _build_row(idx: int, item: Dict) -> List:
+    """One CRS sheet row (columns A..M) for a comment"""
+    return [
+        idx,  # A: S NO.
+        item.get('page', ''),  # B: PAGE NUMBER
+        item.get('clause', ''),  # C: CLAUSE NO
+        item.get('text', ''),  # D: COMPANY COMMENTS
+        '',  # E: Empty
+        '',  # F: Empty
+        '',  # G: Empty
+        item.get('contractor_response', ''),  # H: CONTRACTOR RESPONSE
+        '',  # I: Empty
+        '',  # J: Empty
+        '',  # K: Empty
+        '',  # L: Empty
+        item.get('company_response', ''),  # M: COMPANY Response
+    ]
+
+
+def row_hash(row: List) -> str:
+    """Stable fingerprint of a sheet row, stored in the export snapshot"""
+    return hashlib.sha1(json.dumps(row, default=str).encode('utf-8')).hexdigest()
+
+
+def changed_row_runs(row_hashes: List[str], previous_hashes: Optional[List[str]]) -> List[Tuple[int, int]]:
+    """
+    Contiguous (start, stop) index runs that differ from the previous export
+    
+    Rows beyond the new end that existed previously are included so they are
+    cleared. With no previous snapshot everything is a change.
+    """
+    previous_hashes = previous_hashes or []
+    total = max(len(row_hashes), len(previous_hashes))
+    runs = []
+    start = None
+    for i in range(total):
+        changed = (
+            i >= len(row_hashes) or i >= len(previous_hashes)
+            or row_hashes[i] != previous_hashes[i]
+        )
+        if changed and start is None:
+            start = i
+        elif not changed and start is not None:
+            runs.append((start, i))
+            start = None
+    if start is not None:
+        runs.append((start, total))
+    return runs
+
+
+class _WritePacer:
+    """Spaces Sheets write requests to stay under the per-minute quota (process-wide)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+    
+    def wait(self, requests_per_minute: int):
+        if requests_per_minute <= 0:
+            return
+        interval = 60.0 / requests_per_minute
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+_write_pacer = _WritePacer()
+
 
 class GoogleSheetsService:
     """
@@ -190,72 +278,74 @@ class GoogleSheetsService:
         
         return False
     
+    # Rows per values.batchUpdate request, and write quota pacing / retry policy
+    BATCH_ROWS = 500
+    WRITE_REQUESTS_PER_MINUTE = 60
+    MAX_RETRIES = 5
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 64.0
+    RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+    
     def export_to_sheet(
         self,
         spreadsheet_id: str,
         data: List[Dict],
-        start_row: int = 9
+        start_row: int = 9,
+        previous_row_hashes: Optional[List[str]] = None
     ) -> Tuple[bool, Optional[Dict]]:
         """
         Export CRS data to Google Sheets
         
+        With previous_row_hashes (the "row_hashes" of the last export to this
+        sheet) only rows that changed since then are written, and rows that
+        no longer exist are cleared. Without it every row is written.
+        Writes go through values.batchUpdate in chunks of BATCH_ROWS rows,
+        paced to the write quota and retried with exponential backoff.
+        
         Args:
             spreadsheet_id: Google Sheet ID
             data: List of comment dictionaries
             start_row: Starting row number (default: 9)
+            previous_row_hashes: Row snapshot of the previous export, or None
         
         Returns:
-            Tuple of (success: bool, result: dict)
+            Tuple of (success: bool, result: dict); result["row_hashes"] is
+            the snapshot to pass as previous_row_hashes next time
         """
         if not self.service:
             if not self.authenticate():
                 return False, {"error": "Authentication failed"}
         
         try:
-            sheet = self.service.spreadsheets()
-            
             # Prepare values for Sheet
             # Columns: S NO. | PAGE NUMBER | CLAUSE NO | COMPANY COMMENTS | (empty) | (empty) | (empty) | CONTRACTOR RESPONSE | (empty) | (empty) | (empty) | (empty) | COMPANY Response
-            values = []
-            for idx, item in enumerate(data, start=1):
-                row = [
-                    idx,  # A: S NO.
-                    item.get('page', ''),  # B: PAGE NUMBER
-                    item.get('clause', ''),  # C: CLAUSE NO
-                    item.get('text', ''),  # D: COMPANY COMMENTS
-                    '',  # E: Empty
-                    '',  # F: Empty
-                    '',  # G: Empty
-                    item.get('contractor_response', ''),  # H: CONTRACTOR RESPONSE
-                    '',  # I: Empty
-                    '',  # J: Empty
-                    '',  # K: Empty
-                    '',  # L: Empty
-                    item.get('company_response', ''),  # M: COMPANY Response
-                ]
-                values.append(row)
+            values = [_build_row(idx, item) for idx, item in enumerate(data, start=1)]
+            row_hashes = [row_hash(row) for row in values]
             
-            range_name = f'A{start_row}:M{start_row + len(values) - 1}'
+            incremental = previous_row_hashes is not None
+            runs = changed_row_runs(row_hashes, previous_row_hashes)
             
-            body = {
-                'values': values
-            }
+            value_ranges = []
+            for run_start, run_stop in runs:
+                rows = [values[i] if i < len(values) else EMPTY_ROW for i in range(run_start, run_stop)]
+                value_ranges.append((start_row + run_start, rows))
             
-            result = sheet.values().update(
-                spreadsheetId=spreadsheet_id,
-                range=range_name,
-                valueInputOption='RAW',
-                body=body
-            ).execute()
+            updated_cells = self._batch_write(spreadsheet_id, value_ranges)
+            changed_rows = sum(len(rows) for _, rows in value_ranges)
+            range_name = f'A{start_row}:M{start_row + len(values) - 1}'
             
-            print(f"✅ Successfully exported {len(values)} rows to Google Sheets")
-            print(f"   Updated {result.get('updatedCells')} cells")
+            print(f"✅ Successfully exported {len(values)} rows to Google Sheets "
+                  f"({'incremental' if incremental else 'full'}: {changed_rows} rows written)")
+            print(f"   Updated {updated_cells} cells")
             
             return True, {
                 "updated_rows": len(values),
-                "updated_cells": result.get('updatedCells'),
+                "updated_cells": updated_cells,
+                "changed_rows": changed_rows,
+                "mode": "incremental" if incremental else "full",
                 "range": range_name,
-                "spreadsheet_id": spreadsheet_id
+                "spreadsheet_id": spreadsheet_id,
+                "row_hashes": row_hashes,
             }
         
         except HttpError as error:
@@ -265,6 +355,70 @@ class GoogleSheetsService:
             print(f"❌ Export error: {e}")
             return False, {"error": str(e)}
     
+    def _batch_write(self, spreadsheet_id: str, value_ranges: List[Tuple[int, List[List]]]) -> int:
+        """
+        Write (first_row, rows) ranges with values.batchUpdate, BATCH_ROWS rows per request
+        
+        Returns:
+            Total updated cells reported by the API
+        """
+        batch_rows = _setting('GOOGLE_SHEETS_BATCH_ROWS', self.BATCH_ROWS)
+        
+        # Split long runs so no single range exceeds a request
+        pieces = []
+        for first_row, rows in value_ranges:
+            for offset in range(0, len(rows), batch_rows):
+                pieces.append((first_row + offset, rows[offset:offset + batch_rows]))
+        
+        updated_cells = 0
+        batch, batch_size = [], 0
+        for first_row, rows in pieces:
+            if batch and batch_size + len(rows) > batch_rows:
+                updated_cells += self._send_batch(spreadsheet_id, batch)
+                batch, batch_size = [], 0
+            batch.append({
+                'range': f'A{first_row}:M{first_row + len(rows) - 1}',
+                'values': rows,
+            })
+            batch_size += len(rows)
+        if batch:
+            updated_cells += self._send_batch(spreadsheet_id, batch)
+        return updated_cells
+    
+    def _send_batch(self, spreadsheet_id: str, data: List[Dict]) -> int:
+        """One values.batchUpdate call, paced and retried on quota/server errors"""
+        body = {'valueInputOption': 'RAW', 'data': data}
+        max_retries = _setting('GOOGLE_SHEETS_MAX_RETRIES', self.MAX_RETRIES)
+        
+        for attempt in range(max_retries + 1):
+            _write_pacer.wait(_setting('GOOGLE_SHEETS_WRITE_REQUESTS_PER_MINUTE', self.WRITE_REQUESTS_PER_MINUTE))
+            try:
+                result = self.service.spreadsheets().values().batchUpdate(
+                    spreadsheetId=spreadsheet_id,
+                    body=body
+                ).execute()
+                return result.get('totalUpdatedCells', 0)
+            except HttpError as error:
+                status_code = getattr(error.resp, 'status', None)
+                if status_code not in self.RETRYABLE_STATUSES or attempt >= max_retries:
+                    raise
+                delay = self._retry_delay(error, attempt)
+                print(f"⚠️ Google Sheets returned {status_code}, retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 1}/{max_retries})")
+                time.sleep(delay)
+        return 0
+    
+    def _retry_delay(self, error, attempt: int) -> float:
+        """Retry-After if the API sent one, else exponential backoff with jitter"""
+        retry_after = None
+        try:
+            retry_after = float(error.resp.get('retry-after'))
+        except (AttributeError, TypeError, ValueError):
+            pass
+        if retry_after is not None:
+            return min(retry_after, self.RETRY_MAX_DELAY)
+        return min(self.RETRY_BASE_DELAY * (2 ** attempt), self.RETRY_MAX_DELAY) + random.uniform(0, 1)
+    
     def get_sheet_info(self, spreadsheet_id: str) -> Tuple[bool, Optional[Dict]]:
         """
         Get information about a Google Sheet
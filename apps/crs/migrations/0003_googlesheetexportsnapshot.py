@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-16 18:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crs', '0002_crsrevision_crsrevisionchain_crsrevisionactivity_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoogleSheetExportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('spreadsheet_id', models.CharField(max_length=200)),
+                ('start_row', models.IntegerField(default=9)),
+                ('row_hashes', models.JSONField(default=list, help_text='SHA-1 per exported row, in sheet order')),
+                ('exported_at', models.DateTimeField(auto_now=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sheet_export_snapshots', to='crs.crsdocument')),
+            ],
+            options={
+                'verbose_name': 'Google Sheet Export Snapshot',
+                'verbose_name_plural': 'Google Sheet Export Snapshots',
+                'db_table': 'crs_google_sheet_export_snapshots',
+                'unique_together': {('document', 'spreadsheet_id', 'start_row')},
+            },
+        ),
+    ]
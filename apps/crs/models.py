@@ -201,3 +201,22 @@ class GoogleSheetConfig(models.Model):
     
     def __str__(self):
         return f"{self.name} - {'Active' if self.is_active else 'Inactive'}"
+
+
+class GoogleSheetExportSnapshot(models.Model):
+    """Row fingerprints of the last export of a document to a sheet, for incremental re-exports"""
+    
+    document = models.ForeignKey(CRSDocument, on_delete=models.CASCADE, related_name='sheet_export_snapshots')
+    spreadsheet_id = models.CharField(max_length=200)
+    start_row = models.IntegerField(default=9)
+    row_hashes = models.JSONField(default=list, help_text='SHA-1 per exported row, in sheet order')
+    exported_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'crs_google_sheet_export_snapshots'
+        unique_together = ['document', 'spreadsheet_id', 'start_row']
+        verbose_name = 'Google Sheet Export Snapshot'
+        verbose_name_plural = 'Google Sheet Export Snapshots'
+    
+    def __str__(self):
+        return f"{self.document.document_name} -> {self.spreadsheet_id} ({len(self.row_hashes)} rows)"
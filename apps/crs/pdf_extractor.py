@@ -3,12 +3,13 @@ PDF Comment Extraction Service for CRS
 Extracts red text comments and yellow box callouts from PDF documents
 """
 
-import fitz
 import os
 import re
 from typing import List, Dict, Tuple, Optional
 from datetime import datetime
 
+from apps.crs_documents.helpers.annotation_scanner import iter_page_scans, get_page_count
+
 
 class PDFCommentExtractor:
     """
@@ -16,6 +17,9 @@ class PDFCommentExtractor:
     Detects red comments, yellow boxes, and annotations
     """
     
+    NON_SHAPE_ANNOTATION_TYPES = frozenset(['Text', 'FreeText', 'Highlight', 'Note', 'Comment', 'Callout', 'Link', 'Widget'])
+    COMMENT_ANNOTATION_TYPES = frozenset(['Text', 'FreeText', 'Highlight', 'Note', 'Comment', 'Callout'])
+    
     def __init__(self, debug_mode: bool = False):
         self.debug_mode = debug_mode
         self.RED_THRESHOLD = 0.7
@@ -225,202 +229,33 @@ class PDFCommentExtractor:
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
         pdf_path = os.path.abspath(pdf_path)
-        doc = fitz.open(pdf_path)
         comments = []
         seen_texts = set()
         
         print(f"📄 Processing PDF: {pdf_path}")
-        print(f"📑 Total pages: {len(doc)}")
+        print(f"📑 Total pages: {get_page_count(pdf_path)}")
         print("🔍 Extracting comments...")
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
+        for page_scan in iter_page_scans(pdf_path):
+            page_num = page_scan.page_index
             page_count = 0
+            if page_scan.error and self.debug_mode:
+                print(f"  ⚠️ Error processing page {page_num + 1}: {page_scan.error}")
             
             # Process annotations
-            try:
-                annots = page.annots()
-                if annots:
-                    for annot in annots:
-                        try:
-                            info = annot.info
-                            content = info.get("content", "").strip()
-                            title = info.get("title", "").strip()
-                            subject = info.get("subject", "").strip()
-                            
-                            # Combine annotation text
-                            parts = []
-                            if title and title.strip():
-                                parts.append(title.strip())
-                            if subject and subject.strip():
-                                parts.append(subject.strip())
-                            if content and content.strip():
-                                parts.append(content.strip())
-                            
-                            combined_text = " ".join(parts).strip()
-                            
-                            # Get annotation type
-                            annot_type = annot.type[1] if hasattr(annot.type, '__getitem__') else str(annot.type)
-                            is_shape_annotation = annot_type not in ['Text', 'FreeText', 'Highlight', 'Note', 'Comment', 'Callout', 'Link', 'Widget']
-                            
-                            if combined_text or is_shape_annotation:
-                                colors = annot.colors
-                                is_red_annot = False
-                                is_yellow_box = False
-                                rgb = (0, 0, 0)
-                                comment_type = "unknown"
-                                
-                                # Check colors
-                                if colors:
-                                    # Check fill color
-                                    fill = colors.get("fill")
-                                    if fill and isinstance(fill, (list, tuple)) and len(fill) >= 3:
-                                        r, g, b = fill[0], fill[1], fill[2]
-                                        if r > 1.0 or g > 1.0 or b > 1.0:
-                                            r, g, b = r/255.0, g/255.0, b/255.0
-                                        rgb = (r, g, b)
-                                        
-                                        if self.is_yellow_color(rgb):
-                                            is_yellow_box = True
-                                            comment_type = "yellow_box"
-                                        elif self.is_red_color(rgb):
-                                            is_red_annot = True
-                                            comment_type = "red_comment"
-                                    
-                                    # Check stroke color if not found
-                                    if not is_yellow_box and not is_red_annot:
-                                        stroke = colors.get("stroke")
-                                        if stroke and isinstance(stroke, (list, tuple)) and len(stroke) >= 3:
-                                            r, g, b = stroke[0], stroke[1], stroke[2]
-                                            if r > 1.0 or g > 1.0 or b > 1.0:
-                                                r, g, b = r/255.0, g/255.0, b/255.0
-                                            rgb = (r, g, b)
-                                            
-                                            if self.is_yellow_color(rgb):
-                                                is_yellow_box = True
-                                                comment_type = "yellow_box"
-                                            elif self.is_red_color(rgb):
-                                                is_red_annot = True
-                                                comment_type = "red_comment"
-                                
-                                is_comment_type = annot_type in ['Text', 'FreeText', 'Highlight', 'Note', 'Comment', 'Callout']
-                                
-                                # Store if relevant
-                                if is_yellow_box or is_red_annot or (is_comment_type and combined_text) or is_shape_annotation:
-                                    if is_yellow_box:
-                                        comment_type = "yellow_box"
-                                    elif is_red_annot:
-                                        comment_type = "red_comment"
-                                    elif is_shape_annotation:
-                                        comment_type = "shape"
-                                    elif is_comment_type:
-                                        comment_type = "annotation"
-                                    
-                                    display_text = combined_text
-                                    if is_shape_annotation and not display_text:
-                                        display_text = f"[{annot_type}]"
-                                    
-                                    if display_text or is_shape_annotation:
-                                        bbox = list(annot.rect) if hasattr(annot, 'rect') else [0, 0, 0, 0]
-                                        bbox_str = f"{int(bbox[0])}_{int(bbox[1])}_{int(bbox[2])}_{int(bbox[3])}" if len(bbox) >= 4 else "0_0_0_0"
-                                        text_key = f"{page_num}_{comment_type}_{bbox_str}_{display_text[:50] if display_text else annot_type}"
-                                        
-                                        if text_key not in seen_texts:
-                                            seen_texts.add(text_key)
-                                            comments.append({
-                                                "text": display_text if display_text else f"[{annot_type}]",
-                                                "page": page_num + 1,
-                                                "bbox": bbox,
-                                                "color": rgb if rgb != (0,0,0) else (1.0, 1.0, 0.0) if is_yellow_box else (1.0, 0.0, 0.0),
-                                                "type": comment_type,
-                                                "source": "annotation"
-                                            })
-                                            page_count += 1
-                                            type_label = "🟡 Yellow box" if is_yellow_box else "🔴 Red comment" if is_red_annot else f"📌 {annot_type.lower()}" if is_shape_annotation else "💬 Annotation"
-                                            if self.debug_mode:
-                                                print(f"  {type_label} on page {page_num + 1}: {display_text[:80] if display_text else f'[{annot_type}]'}...")
-                        except Exception as e:
-                            if self.debug_mode:
-                                print(f"  ⚠️ Annotation error: {e}")
-            except Exception as e:
-                if self.debug_mode:
-                    print(f"  ⚠️ Error processing annotations on page {page_num + 1}: {e}")
-            
-            # Process red text spans
-            try:
-                text_dict = page.get_text("rawdict")
-                
-                for block in text_dict.get("blocks", []):
-                    if "lines" in block:
-                        for line in block["lines"]:
-                            for span in line.get("spans", []):
-                                text = span.get("text", "").strip()
-                                if not text or len(text) < 5:
-                                    continue
-                                
-                                color = span.get("color", 0)
-                                
-                                # Parse color
-                                if isinstance(color, int) and color > 0:
-                                    r = ((color >> 16) & 0xFF) / 255.0
-                                    g = ((color >> 8) & 0xFF) / 255.0
-                                    b = (color & 0xFF) / 255.0
-                                elif isinstance(color, (list, tuple)) and len(color) >= 3:
-                                    r, g, b = color[0], color[1], color[2]
-                                    if r > 1.0 or g > 1.0 or b > 1.0:
-                                        r, g, b = r/255.0, g/255.0, b/255.0
-                                else:
-                                    r, g, b = 0, 0, 0
-                                
-                                if self.is_red_color((r, g, b)):
-                                    text_lower = text.lower()
-                                    
-                                    # Skip document structure elements
-                                    skip_if = [
-                                        'adnoc', 'document no', 'contractor', 'project', 'package',
-                                        'process design', 'introduction', 'purpose', 'terminology',
-                                        'references', 'description', 'philosophy', 'data', 'software',
-                                        'appendix', 'table of contents', 'revision control'
-                                    ]
-                                    
-                                    is_document_content = any(skip in text_lower for skip in skip_if)
-                                    
-                                    # Check if looks like a comment
-                                    looks_like_comment = (
-                                        len(text.split()) <= 25 and
-                                        (text.endswith('.') or text.endswith('?') or 
-                                         any(word in text_lower for word in ['shall', 'must', 'should', 'required', 
-                                                                             'include', 'consider', 'update', 'provide', 
-                                                                             'ensure', 'note', 'comment', 'review']))
-                                    )
-                                    
-                                    if not is_document_content and looks_like_comment:
-                                        bbox = span.get("bbox", [0, 0, 0, 0])
-                                        bbox_str = f"{int(bbox[0])}_{int(bbox[1])}_{int(bbox[2])}_{int(bbox[3])}" if len(bbox) >= 4 else "0_0_0_0"
-                                        text_key = f"{page_num}_red_span_{bbox_str}_{text[:50]}"
-                                        
-                                        if text_key not in seen_texts:
-                                            seen_texts.add(text_key)
-                                            comments.append({
-                                                "text": text,
-                                                "page": page_num + 1,
-                                                "bbox": bbox,
-                                                "color": (r, g, b),
-                                                "type": "red_comment",
-                                                "source": "text_span"
-                                            })
-                                            page_count += 1
-                                            if self.debug_mode:
-                                                print(f"  🔴 Red text on page {page_num + 1}: {text[:80]}...")
-            except Exception as e:
-                if self.debug_mode:
-                    print(f"  ⚠️ Error processing text spans on page {page_num + 1}: {e}")
+            for annot in page_scan.annotations:
+                try:
+                    comment = self._annotation_to_comment(annot, page_num, seen_texts)
+                    if comment:
+                        comments.append(comment)
+                        page_count += 1
+                except Exception as e:
+                    if self.debug_mode:
+                        print(f"  ⚠️ Annotation error: {e}")
             
             if page_count > 0:
                 print(f"  ✅ Page {page_num + 1}: Found {page_count} comment(s)")
         
-        doc.close()
-        
         print(f"\n📊 Extraction Summary:")
         print(f"  Total comments: {len(comments)}")
         print(f"  🔴 Red comments: {sum(1 for c in comments if c['type'] == 'red_comment')}")
@@ -429,6 +264,78 @@ class PDFCommentExtractor:
         
         return comments
     
+    def _annotation_to_comment(self, annot, page_num: int, seen_texts: set) -> Optional[Dict]:
+        """Comment dict for a scanned annotation, or None if not relevant/already seen"""
+        content = annot.content.strip()
+        title = annot.title.strip()
+        subject = annot.subject.strip()
+        
+        # Combine annotation text
+        combined_text = " ".join(part for part in (title, subject, content) if part).strip()
+        
+        # Get annotation type
+        annot_type = annot.annot_type
+        is_shape_annotation = annot_type not in self.NON_SHAPE_ANNOTATION_TYPES
+        
+        if not (combined_text or is_shape_annotation):
+            return None
+        
+        is_red_annot = False
+        is_yellow_box = False
+        rgb = (0, 0, 0)
+        
+        # Check fill color, then stroke color if not found
+        for color in (annot.fill, annot.stroke):
+            if color is None:
+                continue
+            rgb = color
+            if self.is_yellow_color(rgb):
+                is_yellow_box = True
+                break
+            if self.is_red_color(rgb):
+                is_red_annot = True
+                break
+        
+        is_comment_type = annot_type in self.COMMENT_ANNOTATION_TYPES
+        
+        # Store if relevant
+        if not (is_yellow_box or is_red_annot or (is_comment_type and combined_text) or is_shape_annotation):
+            return None
+        
+        if is_yellow_box:
+            comment_type = "yellow_box"
+        elif is_red_annot:
+            comment_type = "red_comment"
+        elif is_shape_annotation:
+            comment_type = "shape"
+        else:
+            comment_type = "annotation"
+        
+        display_text = combined_text
+        if is_shape_annotation and not display_text:
+            display_text = f"[{annot_type}]"
+        
+        bbox = list(annot.rect)
+        bbox_str = f"{int(bbox[0])}_{int(bbox[1])}_{int(bbox[2])}_{int(bbox[3])}" if len(bbox) >= 4 else "0_0_0_0"
+        text_key = f"{page_num}_{comment_type}_{bbox_str}_{display_text[:50] if display_text else annot_type}"
+        
+        if text_key in seen_texts:
+            return None
+        seen_texts.add(text_key)
+        
+        if self.debug_mode:
+            type_label = "🟡 Yellow box" if is_yellow_box else "🔴 Red comment" if is_red_annot else f"📌 {annot_type.lower()}" if is_shape_annotation else "💬 Annotation"
+            print(f"  {type_label} on page {page_num + 1}: {display_text[:80] if display_text else f'[{annot_type}]'}...")
+        
+        return {
+            "text": display_text if display_text else f"[{annot_type}]",
+            "page": page_num + 1,
+            "bbox": bbox,
+            "color": rgb if rgb != (0,0,0) else (1.0, 1.0, 0.0) if is_yellow_box else (1.0, 0.0, 0.0),
+            "type": comment_type,
+            "source": "annotation"
+        }
+    
     def process_extracted_comments(self, comments: List[Dict]) -> List[Dict]:
         """
         Process and clean extracted comments
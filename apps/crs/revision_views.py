@@ -350,8 +350,8 @@ class CRSRevisionChainViewSet(viewsets.ModelViewSet):
         )
         
         # Create comment links
-        for link_data in potential_links:
-            CRSCommentLink.objects.create(
+        CRSCommentLink.objects.bulk_create([
+            CRSCommentLink(
                 source_revision=parent_revision,
                 target_revision=child_revision,
                 source_comment_id=link_data['source_comment_id'],
@@ -362,6 +362,8 @@ class CRSRevisionChainViewSet(viewsets.ModelViewSet):
                 ai_confidence=link_data['ai_confidence'],
                 created_by=user
             )
+            for link_data in potential_links
+        ], batch_size=500)
         
         # Update carryover count
         child_revision.total_carryover_comments = len(potential_links)
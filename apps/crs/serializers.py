@@ -155,3 +155,4 @@ class GoogleSheetExportSerializer(serializers.Serializer):
     sheet_id = serializers.CharField(max_length=200, required=False, allow_blank=True)
     start_row = serializers.IntegerField(default=9, min_value=1)
     auto_export = serializers.BooleanField(default=True)
+    full_sync = serializers.BooleanField(default=False, help_text='Rewrite every row instead of only rows changed since the last export')
@@ -0,0 +1,242 @@
+"""
+Tests for the CRS Google Sheets export (run against a local fake Sheets API)
+"""
+import re
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.crs import google_sheets_service as gss
+from apps.crs.google_sheets_service import (
+    EMPTY_ROW, GoogleSheetsService, _build_row, changed_row_runs, row_hash
+)
+
+if gss.GOOGLE_AVAILABLE:
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+
+class FakeSheetsAPI:
+    """
+    In-memory stand-in for service.spreadsheets().values().batchUpdate()
+
+    Keeps the written cells per row and records every request. Statuses in
+    `failures` are raised, in order, before requests start succeeding.
+    """
+
+    def __init__(self, failures=None, retry_after=None):
+        self.rows = {}
+        self.requests = []
+        self.failures = list(failures or [])
+        self.retry_after = retry_after
+
+    # service.spreadsheets().values() chain
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.requests.append(body)
+        return _FakeRequest(self, body)
+
+    def _execute(self, body):
+        if self.failures:
+            status = self.failures.pop(0)
+            headers = {'status': status}
+            if self.retry_after is not None:
+                headers['retry-after'] = str(self.retry_after)
+            raise HttpError(httplib2.Response(headers), b'{"error": "fake"}')
+
+        cells = 0
+        for value_range in body['data']:
+            first, last = map(int, re.match(r'A(\d+):M(\d+)$', value_range['range']).groups())
+            assert last - first + 1 == len(value_range['values'])
+            for offset, row in enumerate(value_range['values']):
+                self.rows[first + offset] = list(row)
+                cells += len(row)
+        return {'totalUpdatedCells': cells}
+
+    def sheet_rows(self, start_row=9):
+        """Non-empty rows from start_row on, in order"""
+        return [
+            self.rows[n] for n in sorted(self.rows)
+            if n >= start_row and self.rows[n] != EMPTY_ROW
+        ]
+
+
+class _FakeRequest:
+    def __init__(self, api, body):
+        self.api = api
+        self.body = body
+
+    def execute(self):
+        return self.api._execute(self.body)
+
+
+def comments(count, suffix=''):
+    return [{'page': n, 'clause': f'{n}.1', 'text': f'Comment {n}{suffix}'} for n in range(1, count + 1)]
+
+
+class ChangedRowRunsTests(SimpleTestCase):
+
+    def test_no_previous_snapshot_changes_everything(self):
+        self.assertEqual(changed_row_runs(['a', 'b', 'c'], None), [(0, 3)])
+
+    def test_identical_snapshot_has_no_runs(self):
+        self.assertEqual(changed_row_runs(['a', 'b', 'c'], ['a', 'b', 'c']), [])
+
+    def test_changed_rows_are_grouped_into_runs(self):
+        self.assertEqual(
+            changed_row_runs(['a', 'X', 'Y', 'd', 'Z'], ['a', 'b', 'c', 'd', 'e']),
+            [(1, 3), (4, 5)]
+        )
+
+    def test_removed_rows_are_included_for_clearing(self):
+        self.assertEqual(changed_row_runs(['a', 'b'], ['a', 'b', 'c', 'd']), [(2, 4)])
+
+    def test_appended_rows_are_a_change(self):
+        self.assertEqual(changed_row_runs(['a', 'b', 'c'], ['a']), [(1, 3)])
+
+
+@skipUnless(gss.GOOGLE_AVAILABLE, 'Google API client libraries not installed')
+class ExportToSheetTests(SimpleTestCase):
+
+    def setUp(self):
+        self.api = FakeSheetsAPI()
+        self.service = GoogleSheetsService()
+        self.service.service = self.api
+        # No quota pacing or backoff waits in tests
+        self.pacer = mock.patch.object(gss, '_write_pacer').start()
+        self.sleep = mock.patch.object(gss.time, 'sleep').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_full_export_writes_every_row(self):
+        success, result = self.service.export_to_sheet('sheet', comments(3))
+
+        self.assertTrue(success)
+        self.assertEqual(result['mode'], 'full')
+        self.assertEqual(result['changed_rows'], 3)
+        self.assertEqual(result['range'], 'A9:M11')
+        self.assertEqual(self.api.sheet_rows(), [_build_row(n, item) for n, item in enumerate(comments(3), start=1)])
+        self.assertEqual(result['row_hashes'], [row_hash(row) for row in self.api.sheet_rows()])
+
+    def test_incremental_export_writes_only_changed_rows(self):
+        _, first = self.service.export_to_sheet('sheet', comments(5))
+        data = comments(5)
+        data[1]['text'] = 'Edited'
+        data[3]['contractor_response'] = 'Agreed'
+        self.api.requests.clear()
+
+        success, result = self.service.export_to_sheet('sheet', data, previous_row_hashes=first['row_hashes'])
+
+        self.assertTrue(success)
+        self.assertEqual(result['mode'], 'incremental')
+        self.assertEqual(result['changed_rows'], 2)
+        self.assertEqual(len(self.api.requests), 1)
+        self.assertEqual([r['range'] for r in self.api.requests[0]['data']], ['A10:M10', 'A12:M12'])
+        self.assertEqual(self.api.sheet_rows(), [_build_row(n, item) for n, item in enumerate(data, start=1)])
+
+    def test_unchanged_export_sends_nothing(self):
+        _, first = self.service.export_to_sheet('sheet', comments(4))
+        self.api.requests.clear()
+
+        success, result = self.service.export_to_sheet('sheet', comments(4), previous_row_hashes=first['row_hashes'])
+
+        self.assertTrue(success)
+        self.assertEqual(result['changed_rows'], 0)
+        self.assertEqual(self.api.requests, [])
+
+    def test_trailing_rows_of_a_shorter_export_are_cleared(self):
+        _, first = self.service.export_to_sheet('sheet', comments(6))
+
+        success, result = self.service.export_to_sheet('sheet', comments(4), previous_row_hashes=first['row_hashes'])
+
+        self.assertTrue(success)
+        self.assertEqual(self.api.rows[13], EMPTY_ROW)
+        self.assertEqual(self.api.rows[14], EMPTY_ROW)
+        self.assertEqual(len(self.api.sheet_rows()), 4)
+        self.assertEqual(len(result['row_hashes']), 4)
+
+    @override_settings(GOOGLE_SHEETS_BATCH_ROWS=10)
+    def test_writes_are_chunked_by_batch_rows(self):
+        success, result = self.service.export_to_sheet('sheet', comments(25))
+
+        self.assertTrue(success)
+        self.assertEqual([sum(len(r['values']) for r in body['data']) for body in self.api.requests], [10, 10, 5])
+        self.assertEqual(
+            [r['range'] for body in self.api.requests for r in body['data']],
+            ['A9:M18', 'A19:M28', 'A29:M33']
+        )
+        self.assertEqual(result['updated_cells'], 25 * 13)
+        self.assertEqual(self.pacer.wait.call_count, 3)
+
+    @override_settings(GOOGLE_SHEETS_BATCH_ROWS=10)
+    def test_separate_runs_share_a_request_up_to_batch_rows(self):
+        _, first = self.service.export_to_sheet('sheet', comments(30))
+        data = comments(30)
+        for index in (0, 1, 10, 20, 29):
+            data[index]['text'] = 'Edited'
+        self.api.requests.clear()
+
+        self.service.export_to_sheet('sheet', data, previous_row_hashes=first['row_hashes'])
+
+        self.assertEqual(len(self.api.requests), 1)
+        self.assertEqual(
+            [r['range'] for r in self.api.requests[0]['data']],
+            ['A9:M10', 'A19:M19', 'A29:M29', 'A38:M38']
+        )
+
+    def test_429_is_retried_after_retry_after(self):
+        self.api.failures = [429, 429]
+        self.api.retry_after = 7
+
+        success, result = self.service.export_to_sheet('sheet', comments(2))
+
+        self.assertTrue(success)
+        self.assertEqual(len(self.api.requests), 3)
+        self.assertEqual(self.sleep.call_args_list, [mock.call(7.0), mock.call(7.0)])
+        self.assertEqual(self.pacer.wait.call_count, 3)
+        self.assertEqual(len(self.api.sheet_rows()), 2)
+
+    def test_503_without_retry_after_backs_off_exponentially(self):
+        self.api.failures = [503, 503, 503]
+
+        success, _ = self.service.export_to_sheet('sheet', comments(2))
+
+        self.assertTrue(success)
+        delays = [call.args[0] for call in self.sleep.call_args_list]
+        self.assertEqual(len(delays), 3)
+        for attempt, delay in enumerate(delays):
+            base = GoogleSheetsService.RETRY_BASE_DELAY * 2 ** attempt
+            self.assertGreaterEqual(delay, base)
+            self.assertLessEqual(delay, base + 1)
+
+    def test_retry_after_is_capped(self):
+        self.api.failures = [429]
+        self.api.retry_after = 3600
+
+        self.service.export_to_sheet('sheet', comments(1))
+
+        self.sleep.assert_called_once_with(GoogleSheetsService.RETRY_MAX_DELAY)
+
+    @override_settings(GOOGLE_SHEETS_MAX_RETRIES=2)
+    def test_gives_up_after_max_retries(self):
+        self.api.failures = [503, 503, 503]
+
+        success, result = self.service.export_to_sheet('sheet', comments(2))
+
+        self.assertFalse(success)
+        self.assertIn('error', result)
+        self.assertEqual(len(self.api.requests), 3)
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_client_errors_are_not_retried(self):
+        self.api.failures = [400]
+
+        success, _ = self.service.export_to_sheet('sheet', comments(2))
+
+        self.assertFalse(success)
+        self.assertEqual(len(self.api.requests), 1)
+        self.sleep.assert_not_called()
@@ -4,7 +4,8 @@ from .views import (
     CRSDocumentViewSet,
     CRSCommentViewSet,
     CRSActivityViewSet,
-    GoogleSheetConfigViewSet
+    GoogleSheetConfigViewSet,
+    comment_cleaning_cache_stats
 )
 from .revision_views import (
     CRSRevisionChainViewSet,
@@ -46,7 +47,9 @@ router.register(r'ai-insights', CRSAIInsightViewSet, basename='crs-ai-insight')
 router.register(r'revision-activities', CRSRevisionActivityViewSet, basename='crs-revision-activity')
 
 # Start with history endpoints (must come before router.urls to avoid conflicts)
-urlpatterns = []
+urlpatterns = [
+    path('admin/cleaning-cache/stats/', comment_cleaning_cache_stats, name='crs-cleaning-cache-stats'),
+]
 
 # Add history endpoints if available
 if HISTORY_AVAILABLE:
@@ -1,7 +1,7 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db import transaction
@@ -12,7 +12,7 @@ from io import BytesIO
 import json
 import os
 
-from .models import CRSDocument, CRSComment, CRSActivity, GoogleSheetConfig
+from .models import CRSDocument, CRSComment, CRSActivity, GoogleSheetConfig, GoogleSheetExportSnapshot
 from .serializers import (
     CRSDocumentSerializer,
     CRSDocumentDetailSerializer,
@@ -30,7 +30,7 @@ from .google_sheets_service import GoogleSheetsService
 try:
     from apps.crs_documents.helpers.comment_extractor import extract_reviewer_comments, get_comment_statistics
     from apps.crs_documents.helpers.template_populator import populate_crs_template
-    from apps.crs_documents.helpers.template_manager import get_crs_template, get_template_info
+    from apps.crs_documents.helpers.template_manager import get_cached_template, get_template_info
     HELPERS_AVAILABLE = True
 except ImportError:
     HELPERS_AVAILABLE = False
@@ -270,15 +270,28 @@ class CRSDocumentViewSet(viewsets.ModelViewSet):
                     'company_response': comment.company_response or ''
                 })
             
-            # Export to sheet
+            # Export to sheet - only rows changed since the last export unless full_sync
             start_row = serializer.validated_data.get('start_row', 9)
+            snapshot = GoogleSheetExportSnapshot.objects.filter(
+                document=document, spreadsheet_id=sheet_id, start_row=start_row
+            ).first()
+            previous_row_hashes = None
+            if snapshot and not serializer.validated_data.get('full_sync'):
+                previous_row_hashes = snapshot.row_hashes
+            
             success, result = gs_service.export_to_sheet(
                 spreadsheet_id=sheet_id,
                 data=export_data,
-                start_row=start_row
+                start_row=start_row,
+                previous_row_hashes=previous_row_hashes
             )
             
             if success:
+                GoogleSheetExportSnapshot.objects.update_or_create(
+                    document=document, spreadsheet_id=sheet_id, start_row=start_row,
+                    defaults={'row_hashes': result.pop('row_hashes')}
+                )
+                
                 # Update document
                 document.google_sheet_id = sheet_id
                 document.google_sheet_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}"
@@ -296,7 +309,12 @@ class CRSDocumentViewSet(viewsets.ModelViewSet):
                     action='exported',
                     description=f'Exported {len(export_data)} comments to Google Sheets',
                     performed_by=request.user,
-                    new_value={'sheet_id': sheet_id, 'rows_exported': len(export_data)}
+                    new_value={
+                        'sheet_id': sheet_id,
+                        'rows_exported': len(export_data),
+                        'rows_written': result.get('changed_rows'),
+                        'mode': result.get('mode'),
+                    }
                 )
                 
                 return Response({
@@ -449,18 +467,14 @@ class CRSDocumentViewSet(viewsets.ModelViewSet):
             
             # Process based on file type
             if is_pdf:
-                # Extract comments from PDF
-                pdf_buffer = BytesIO(uploaded_file.read())
-                
                 # Save uploaded file to user's S3 folder for history tracking
+                # (streamed from the upload itself, no extra copy in memory)
                 upload_s3_result = None
                 if USER_STORAGE_AVAILABLE:
                     try:
                         user_storage = get_user_storage(request.user)
-                        # Reset buffer position for reading
-                        pdf_buffer.seek(0)
                         upload_s3_result = user_storage.save_upload(
-                            file_content=pdf_buffer.read(),
+                            file_content=uploaded_file,
                             original_filename=uploaded_file.name,
                             metadata={
                                 'project_name': metadata.get('project_name', ''),
@@ -468,14 +482,16 @@ class CRSDocumentViewSet(viewsets.ModelViewSet):
                                 'department': metadata.get('department', ''),
                             }
                         )
-                        # Reset buffer again after save
-                        pdf_buffer.seek(0)
                     except Exception as storage_error:
                         # Log but don't fail - storage is supplementary
                         import logging
                         logging.getLogger(__name__).warning(f"User storage save failed: {storage_error}")
                 
-                comments = extract_reviewer_comments(pdf_buffer)
+                # Extract comments from PDF, read from the upload itself (its temporary
+                # file when Django spooled it to disk) rather than a copy in memory.
+                # Packages of CRS_PARALLEL_MIN_PAGES+ pages are scanned by CRS_EXTRACTION_WORKERS
+                # processes, CRS_PAGE_TIMEOUT seconds per page; comments stay in page order
+                comments = extract_reviewer_comments(uploaded_file)
                 
                 if not comments:
                     return Response({
@@ -524,9 +540,8 @@ class CRSDocumentViewSet(viewsets.ModelViewSet):
                 # DOWNLOAD MODE: Generate file in requested format
                 # Load CRS template using smart template manager
                 try:
-                    template_buffer = get_crs_template()
-                    # CRITICAL: Ensure buffer is at the start
-                    template_buffer.seek(0)
+                    cached_template = get_cached_template()
+                    template_buffer = BytesIO(cached_template.content)
                 except FileNotFoundError as e:
                     return Response({
                         'error': 'CRS template not available',
@@ -821,7 +836,8 @@ class CRSDocumentViewSet(viewsets.ModelViewSet):
                     output_buffer = populate_crs_template(
                         template_buffer,
                         comments,
-                        metadata
+                        metadata,
+                        column_mapping=cached_template.column_mapping
                     )
                 
                     # CRITICAL: Ensure buffer is at the beginning before reading
@@ -1128,3 +1144,21 @@ class GoogleSheetConfigViewSet(viewsets.ModelViewSet):
                 "success": False,
                 "message": f"Error testing connection: {str(e)}"
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def comment_cleaning_cache_stats(request):
+    """
+    Hit rates of the comment cleaning memo cache
+    GET /api/v1/crs/admin/cleaning-cache/stats/
+    
+    'process' covers the worker that answered; 'shared' aggregates all workers.
+    """
+    if not HELPERS_AVAILABLE:
+        return Response({
+            "error": "CRS helpers not available"
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    from apps.crs_documents.helpers.cleaning_cache import cleaning_cache
+    return Response(cleaning_cache.stats())
@@ -11,7 +11,7 @@ from .comment_extractor import (
     ReviewerComment
 )
 from .template_populator import populate_crs_template, generate_populated_crs
-from .template_manager import get_crs_template, get_template_info
+from .template_manager import get_crs_template, get_cached_template, get_template_info
 
 # Import comment cleaner (optional - may not have OpenAI installed)
 try:
@@ -38,6 +38,7 @@ __all__ = [
     
     # Template Management
     'get_crs_template',
+    'get_cached_template',
     'get_template_info',
     
     # Comment Cleaning (if available)
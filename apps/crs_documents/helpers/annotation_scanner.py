@@ -0,0 +1,255 @@
+"""
+PDF Annotation Scanner - shared by crs.pdf_extractor and comment_extractor
+Streams a PDF page by page and yields lightweight records of annotations
+and page text. Large documents are split into page ranges
+scanned by a process pool (each worker opens the document itself); only a
+bounded number of ranges is in flight, so memory stays flat regardless of
+page count, and a stuck page is abandoned after CRS_PAGE_TIMEOUT seconds.
+"""
+
+import os
+import shutil
+import logging
+import tempfile
+import multiprocessing
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+# Documents with fewer pages are scanned in-process (pool start-up costs more)
+PARALLEL_MIN_PAGES = 50
+PAGES_PER_TASK = 16
+PAGE_TIMEOUT = 30  # seconds
+
+RGB = Tuple[float, float, float]
+
+# Per-process document handle, opened once by the pool initializer
+_worker_doc = None
+
+
+class AnnotationRecord:
+    """One PDF annotation; colors are normalized 0-1 RGB or None"""
+    __slots__ = ('annot_type', 'content', 'title', 'subject', 'popup', 'fill', 'stroke', 'rect')
+
+    def __init__(self, annot_type: str, content: str, title: str, subject: str, popup: str,
+                 fill: Optional[RGB], stroke: Optional[RGB], rect: Tuple[float, float, float, float]):
+        self.annot_type = annot_type
+        self.content = content
+        self.title = title
+        self.subject = subject
+        self.popup = popup
+        self.fill = fill
+        self.stroke = stroke
+        self.rect = rect
+
+
+class PageScan:
+    """Everything a consumer needs from one page (page_index is 0-based)"""
+    __slots__ = ('page_index', 'annotations', 'text', 'error')
+
+    def __init__(self, page_index: int, annotations: List[AnnotationRecord],
+                 text: str, error: Optional[str] = None):
+        self.page_index = page_index
+        self.annotations = annotations
+        self.text = text
+        self.error = error
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def _normalize_rgb(color) -> Optional[RGB]:
+    if not color or not isinstance(color, (list, tuple)) or len(color) < 3:
+        return None
+    r, g, b = color[0], color[1], color[2]
+    if r > 1.0 or g > 1.0 or b > 1.0:
+        r, g, b = r / 255.0, g / 255.0, b / 255.0
+    return (r, g, b)
+
+
+def scan_page(page, include_text: bool = False) -> PageScan:
+    """Build the PageScan for an open fitz page"""
+    annotations = []
+    for annot in page.annots() or ():
+        try:
+            info = annot.info
+            colors = annot.colors or {}
+            annotations.append(AnnotationRecord(
+                annot_type=annot.type[1],
+                content=info.get("content") or "",
+                title=info.get("title") or "",
+                subject=info.get("subject") or "",
+                popup=str(info.get("popup") or ""),
+                fill=_normalize_rgb(colors.get("fill")),
+                stroke=_normalize_rgb(colors.get("stroke")),
+                rect=tuple(annot.rect),
+            ))
+        except Exception as e:
+            logger.warning(f"Error reading annotation on page {page.number + 1}: {e}")
+
+    text = page.get_text() if include_text else ""
+    return PageScan(page.number, annotations, text)
+
+
+def _scan_page_safe(doc, page_index: int, options: tuple) -> PageScan:
+    try:
+        return scan_page(doc.load_page(page_index), *options)
+    except Exception as e:
+        logger.warning(f"Error scanning page {page_index + 1}: {e}")
+        return PageScan(page_index, [], "", error=str(e))
+
+
+def _init_worker(pdf_path: str):
+    global _worker_doc
+    _worker_doc = fitz.open(pdf_path)
+
+
+def _scan_range_in_worker(start: int, stop: int, options: tuple) -> List[PageScan]:
+    return [_scan_page_safe(_worker_doc, page_index, options) for page_index in range(start, stop)]
+
+
+def _can_fork_workers() -> bool:
+    # Celery prefork children are daemonic and may not start their own processes
+    return not multiprocessing.current_process().daemon
+
+
+@contextmanager
+def pdf_path_for(source):
+    """
+    Local path for a PDF given as a path, bytes or file-like object
+
+    Uploads Django already spooled to disk are used in place. Other non-path
+    sources are spooled to a temporary file in 1 MB chunks, so the document
+    is opened lazily from disk (and by every worker process).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+    if hasattr(source, 'temporary_file_path'):
+        yield source.temporary_file_path()  # TemporaryUploadedFile
+        return
+
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            tmp.write(source)
+        else:
+            position = source.tell() if hasattr(source, 'tell') else None
+            source.seek(0)
+            shutil.copyfileobj(source, tmp, 1024 * 1024)
+            if position is not None:
+                source.seek(position)  # Reset for potential re-use
+        temp_path = tmp.name
+    try:
+        yield temp_path
+    finally:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+
+
+def _start_pool(workers: int, pdf_path: str):
+    return multiprocessing.Pool(workers, initializer=_init_worker, initargs=(pdf_path,))
+
+
+def _scan_with_pool(pdf_path: str, page_count: int, workers: int, options: tuple,
+                    page_timeout: Optional[float]) -> Iterator[PageScan]:
+    """
+    Scan page ranges in worker processes and yield PageScans in page order
+
+    A range gets page_timeout seconds per page. When it overruns, the pool is
+    replaced (the stuck worker cannot be interrupted inside MuPDF), the range
+    is retried one page per task, and a page that overruns on its own is
+    yielded as an error. Unfinished ranges are resubmitted to the new pool.
+    """
+    tasks = deque((start, min(start + PAGES_PER_TASK, page_count))
+                  for start in range(0, page_count, PAGES_PER_TASK))
+    in_flight = deque()
+    pool = _start_pool(workers, pdf_path)
+    try:
+        while tasks or in_flight:
+            # Keep at most 2 ranges per worker in flight - bounded memory, ordered output
+            while tasks and len(in_flight) < workers * 2:
+                start, stop = tasks.popleft()
+                in_flight.append(((start, stop), pool.apply_async(_scan_range_in_worker, (start, stop, options))))
+
+            (start, stop), result = in_flight.popleft()
+            try:
+                page_scans = result.get(page_timeout * (stop - start) if page_timeout else None)
+            except multiprocessing.TimeoutError:
+                pool.terminate()
+                pool.join()
+                requeue = [task for task, _ in in_flight]
+                in_flight.clear()
+                if stop - start > 1:
+                    logger.warning(f"Pages {start + 1}-{stop} exceeded {page_timeout}s per page, retrying page by page")
+                    requeue = [(page_index, page_index + 1) for page_index in range(start, stop)] + requeue
+                    page_scans = []
+                else:
+                    logger.warning(f"Page {start + 1} timed out after {page_timeout}s, skipping")
+                    page_scans = [PageScan(start, [], "", error=f"Timed out after {page_timeout}s")]
+                tasks.extendleft(reversed(requeue))
+                pool = _start_pool(workers, pdf_path)
+
+            for page_scan in page_scans:
+                yield page_scan
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def iter_page_scans(source, include_text: bool = False, max_workers: Optional[int] = None,
+                    page_timeout: Optional[float] = None) -> Iterator[PageScan]:
+    """
+    Yield a PageScan per page, in page order
+
+    Args:
+        source: PDF path, bytes or file-like object (e.g. BytesIO, UploadedFile)
+        include_text: Collect plain page text (page.get_text())
+        max_workers: Worker processes; 1 scans in this process. Defaults to
+            CRS_EXTRACTION_WORKERS (0 = CPU count) for documents of
+            CRS_PARALLEL_MIN_PAGES pages or more.
+        page_timeout: Seconds allowed per page when scanning in worker
+            processes (default CRS_PAGE_TIMEOUT, 0 = no limit). In-process
+            scans cannot be interrupted and are not time-limited.
+    """
+    options = (include_text,)
+    if page_timeout is None:
+        page_timeout = _setting('CRS_PAGE_TIMEOUT', PAGE_TIMEOUT)
+
+    with pdf_path_for(source) as pdf_path:
+        doc = fitz.open(pdf_path)
+        page_count = len(doc)
+        if not max_workers:
+            if page_count >= _setting('CRS_PARALLEL_MIN_PAGES', PARALLEL_MIN_PAGES):
+                max_workers = _setting('CRS_EXTRACTION_WORKERS', 0) or os.cpu_count() or 1
+            else:
+                max_workers = 1
+        workers = min(max_workers, max(1, page_count // PAGES_PER_TASK))
+
+        if workers <= 1 or not _can_fork_workers():
+            try:
+                for page_index in range(page_count):
+                    yield _scan_page_safe(doc, page_index, options)
+            finally:
+                doc.close()
+            return
+
+        doc.close()
+        logger.info(f"Scanning {page_count} pages with {workers} worker processes")
+        yield from _scan_with_pool(pdf_path, page_count, workers, options, page_timeout)
+
+
+def get_page_count(pdf_path: str) -> int:
+    """Page count without loading page content"""
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
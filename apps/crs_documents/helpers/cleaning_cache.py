@@ -0,0 +1,223 @@
+"""
+Comment Cleaning Cache - memoized CleaningResults
+Reviewers paste the same boilerplate across documents; repeated comments are
+served from an in-process LRU, then from the shared 'comment_cleaning' cache
+(Redis or database), before any rule cleaning or OpenAI call.
+
+Only OpenAI-cleaned results go to the shared cache; rule-only results are
+cheaper to recompute than to fetch. Batches read and write it with one
+get_many/set_many each.
+"""
+
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, replace
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_ALIAS = 'comment_cleaning'
+STATS_KEY_PREFIX = 'crs_cleaning:stats:'
+STATS_FLUSH_EVERY = 100
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def _shared_cache():
+    """Django cache used as the shared level, or None outside a configured project"""
+    try:
+        from django.core.cache import caches
+        return caches[SHARED_CACHE_ALIAS]
+    except Exception:
+        return None
+
+
+def normalize_comment(text: str) -> str:
+    """Cache key text: stripped, whitespace collapsed (case is kept - rules depend on it)"""
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+class CleaningResultCache:
+    """
+    Two-level cache of CleaningResults keyed by normalized text + config version
+
+    Level 1: per-process LRU (COMMENT_CLEANING_CACHE_LRU_SIZE entries)
+    Level 2: shared Django cache, TTL COMMENT_CLEANING_CACHE_TTL (OpenAI results only)
+    Never raises: a cache failure only means the comment is cleaned again.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or _setting('COMMENT_CLEANING_CACHE_LRU_SIZE', 5000)
+        self._lru: 'OrderedDict[str, dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'stores': 0}
+        self._pending = dict.fromkeys(self._stats, 0)
+
+    @property
+    def enabled(self) -> bool:
+        return _setting('COMMENT_CLEANING_CACHE_ENABLED', True)
+
+    def make_key(self, text: str, config_version: str) -> str:
+        digest = hashlib.sha256(normalize_comment(text).encode('utf-8')).hexdigest()
+        return f"crs_cleaning:{config_version}:{digest}"
+
+    def get(self, key: str, original_text: str):
+        """Cached CleaningResult for this key (with original_text set to the caller's text)"""
+        return self.get_many({key: original_text}).get(key)
+
+    def get_many(self, original_texts: Dict[str, str]) -> Dict[str, object]:
+        """
+        Cached CleaningResults for several keys
+
+        Args:
+            original_texts: {cache key: caller's text}, set as original_text on each result
+
+        Returns:
+            {cache key: CleaningResult} for the keys found; the shared cache is
+            read once for all keys missing from the LRU
+        """
+        if not self.enabled or not original_texts:
+            return {}
+
+        found = {}
+        with self._lock:
+            for key in original_texts:
+                data = self._lru.get(key)
+                if data is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = data
+        self._count('l1_hits', len(found))
+
+        missing = [key for key in original_texts if key not in found]
+        shared = _shared_cache()
+        shared_found = {}
+        if missing and shared is not None:
+            try:
+                shared_found = shared.get_many(missing)
+            except Exception as e:
+                logger.warning(f"Cleaning cache read failed: {e}")
+        for key, data in shared_found.items():
+            self._remember(key, data)
+        found.update(shared_found)
+        self._count('l2_hits', len(shared_found))
+        self._count('misses', len(missing) - len(shared_found))
+
+        return {key: self._to_result(data, original_texts[key]) for key, data in found.items()}
+
+    def set(self, key: str, result, shared: bool = True):
+        self.set_many({key: result}, shared=shared)
+
+    def set_many(self, results: Dict[str, object], shared: bool = True):
+        """
+        Store several CleaningResults
+
+        Args:
+            results: {cache key: CleaningResult}
+            shared: Also write the shared cache (one round trip); False keeps
+                cheap rule-only results in this process's LRU only
+        """
+        if not self.enabled or not results:
+            return
+        entries = {}
+        for key, result in results.items():
+            data = asdict(result)
+            data.pop('original_text', None)
+            self._remember(key, data)
+            entries[key] = data
+        self._count('stores', len(entries))
+
+        shared_cache = _shared_cache() if shared else None
+        if shared_cache is not None:
+            try:
+                shared_cache.set_many(entries, timeout=_setting('COMMENT_CLEANING_CACHE_TTL', 60 * 60 * 24 * 30))
+            except Exception as e:
+                logger.warning(f"Cleaning cache write failed: {e}")
+
+    def _remember(self, key: str, data: dict):
+        with self._lock:
+            self._lru[key] = data
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    @staticmethod
+    def _to_result(data: dict, original_text: str):
+        from .comment_cleaner import CleaningResult
+        return replace(CleaningResult(original_text='', **data), original_text=original_text)
+
+    def _count(self, name: str, count: int = 1):
+        # Shared counters are updated in batches so L1 hits stay free of I/O
+        if not count:
+            return
+        with self._lock:
+            self._stats[name] += count
+            self._pending[name] += count
+            flush = sum(self._pending.values()) >= STATS_FLUSH_EVERY
+        if flush:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add this process's counter deltas to the shared counters"""
+        with self._lock:
+            pending = {name: count for name, count in self._pending.items() if count}
+            self._pending = dict.fromkeys(self._stats, 0)
+        shared = _shared_cache()
+        if shared is None or not pending:
+            return
+        for name, count in pending.items():
+            key = STATS_KEY_PREFIX + name
+            try:
+                shared.incr(key, count)
+            except ValueError:
+                try:
+                    if not shared.add(key, count, timeout=None):
+                        shared.incr(key, count)
+                except Exception:
+                    pass
+            except Exception as e:
+                logger.warning(f"Cleaning cache stats update failed: {e}")
+                return
+
+    def stats(self) -> Dict[str, dict]:
+        """Hit rates for this process and across all processes sharing the cache"""
+        self.flush_stats()
+
+        def summarize(counts):
+            lookups = counts['l1_hits'] + counts['l2_hits'] + counts['misses']
+            hits = counts['l1_hits'] + counts['l2_hits']
+            return {**counts, 'lookups': lookups,
+                    'hit_rate': round(hits / lookups, 4) if lookups else 0.0}
+
+        with self._lock:
+            process = summarize(dict(self._stats))
+            process['lru_entries'] = len(self._lru)
+            process['lru_max_entries'] = self.max_entries
+
+        shared_stats = None
+        shared = _shared_cache()
+        if shared is not None:
+            try:
+                values = shared.get_many([STATS_KEY_PREFIX + name for name in self._stats])
+                shared_stats = summarize({
+                    name: int(values.get(STATS_KEY_PREFIX + name, 0)) for name in self._stats
+                })
+            except Exception as e:
+                logger.warning(f"Cleaning cache stats read failed: {e}")
+
+        return {'enabled': self.enabled, 'process': process, 'shared': shared_stats}
+
+    def clear_local(self):
+        with self._lock:
+            self._lru.clear()
+
+
+cleaning_cache = CleaningResultCache()
@@ -7,14 +7,24 @@ Soft-coded approach - rules are configurable without code changes
 import os
 import re
 import json
+import random
+import hashlib
+import asyncio
 import logging
-from typing import Optional, List, Tuple
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple, Dict
+from dataclasses import dataclass, replace
 from pathlib import Path
 
+from .cleaning_cache import cleaning_cache
+
 # Try to import OpenAI
 try:
-    from openai import OpenAI
+    from openai import (
+        OpenAI, AsyncOpenAI, RateLimitError, APITimeoutError,
+        APIConnectionError, InternalServerError, AuthenticationError,
+        PermissionDeniedError
+    )
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
@@ -24,6 +34,47 @@ logger = logging.getLogger(__name__)
 # Default config file path
 DEFAULT_CONFIG_PATH = Path(__file__).parent.parent / 'config' / 'crs_config.json'
 
+CLEANER_SYSTEM_PROMPT = "You clean PDF comment text. Respond with ONLY the cleaned text or 'SKIP'. No explanations."
+
+# Cleaning rules shared by the single-comment and batched prompts
+CLEANING_RULES = """RULES:
+1. Return "SKIP" if the text is ONLY technical/AutoCAD elements with NO actual comment content:
+   - Just "Typewriter 166" = SKIP
+   - Just "SHX Text" = SKIP
+   - Pure numbers/coordinates like "100.5" = SKIP
+   - Drawing codes with no comment = SKIP
+
+2. REMOVE from START (but ONLY from start):
+   - Person names (e.g., "Sreejith Rajeev", "John Smith", "Abdullah Ahmed")
+   - Annotation types: "text box", "Text Box", "Callout", "Free Text", "Note", "Sticky Note"
+   - Typewriter labels (e.g., "Typewriter 166")
+   - Title prefixes (Mr, Mrs, Dr, etc.)
+   - Any combination like "Name - text box:", "Name Callout:", etc.
+
+3. CRITICAL - Remove these annotation labels everywhere they appear:
+   - "text box" or "Text Box" → REMOVE
+   - "Callout" → REMOVE
+   - "Free Text" or "free text" → REMOVE
+   - "Note" or "Sticky Note" → REMOVE
+   - Remove with or without colons/hyphens
+
+4. KEEP names that appear IN THE MIDDLE or END of meaningful comments:
+   - "Update design as requested by Sreejith" → KEEP as is
+   - "Coordinate with John for approval" → KEEP as is
+
+5. Preserve the ACTUAL COMMENT CONTENT exactly as written.
+
+EXAMPLES:
+- "Sreejith Rajeev text box Update design" → "Update design"
+- "John Smith Callout: Check valve sizing" → "Check valve sizing"
+- "text box Check specifications" → "Check specifications"
+- "Typewriter 166" → "SKIP"
+- "Abdullah - Free Text: Review the calculations" → "Review the calculations"
+- "Note: Verify pressure ratings" → "Verify pressure ratings"
+- "Sticky Note Update P&ID" → "Update P&ID"
+- "Update the P&ID as discussed with Ahmed" → "Update the P&ID as discussed with Ahmed"
+- "AutoCAD SHX Text" → "SKIP\""""
+
 
 @dataclass
 class CleaningResult:
@@ -35,6 +86,15 @@ class CleaningResult:
     cleaning_method: str = "rule-based"  # "rule-based", "openai", "hybrid"
 
 
+@dataclass
+class PendingClean:
+    """Comment waiting for an OpenAI answer (see CommentCleaner._rule_stage)"""
+    original_text: str
+    rule_cleaned: str
+    llm_input: str
+    mode: str  # "hybrid" (refine rule result) or "openai" (rules failed)
+
+
 class CommentCleanerConfig:
     """
     Configuration for comment cleaning rules
@@ -119,7 +179,12 @@ class CommentCleanerConfig:
             "max_tokens": 150,
             "temperature": 0.1,
             "enabled": True,
-            "fallback_to_rules": True
+            "fallback_to_rules": True,
+            # Batched cleaning (clean_comments_batch)
+            "batch_size": 25,
+            "batch_max_tokens": 4096,
+            "max_concurrency": 4,
+            "max_retries": 5
         },
         
         # Minimum meaningful comment length
@@ -197,6 +262,18 @@ class CommentCleaner:
         self.config = CommentCleanerConfig(config_path)
         self.openai_client = None
         self._init_openai()
+        self.config_version = self._compute_config_version()
+    
+    def _compute_config_version(self) -> str:
+        """
+        Version of everything that shapes a CleaningResult (rules, prompts,
+        model, OpenAI on/off); part of every cleaning cache key
+        """
+        fingerprint = json.dumps(self.config.config, sort_keys=True, default=str)
+        mode = "openai" if self.openai_client else "rules"
+        return hashlib.sha256(
+            "\x00".join([fingerprint, CLEANING_RULES, CLEANER_SYSTEM_PROMPT, mode]).encode("utf-8")
+        ).hexdigest()[:16]
     
     def _init_openai(self):
         """Initialize OpenAI client if API key is available"""
@@ -234,13 +311,42 @@ class CommentCleaner:
         Returns:
             CleaningResult with cleaned text or skip indication
         """
+        cache_key = cleaning_cache.make_key(text, self.config_version)
+        cached = cleaning_cache.get(cache_key, (text or "").strip())
+        if cached is not None:
+            return cached
+        
+        result, pending = self._rule_stage(text)
+        if pending is None:
+            cleaning_cache.set(cache_key, result, shared=False)
+            return result
+        
+        try:
+            openai_cleaned = self._openai_clean(pending.llm_input, raise_errors=True)
+        except Exception as e:
+            logger.warning(f"OpenAI cleaning failed: {e}")
+            # Degraded result - not cached so the next occurrence retries OpenAI
+            return self._llm_stage(pending, None)
+        
+        result = self._llm_stage(pending, openai_cleaned)
+        cleaning_cache.set(cache_key, result)
+        return result
+    
+    def _rule_stage(self, text: str) -> Tuple[Optional[CleaningResult], Optional['PendingClean']]:
+        """
+        Skip checks and rule-based cleaning
+        
+        Returns:
+            (result, None) when no OpenAI call is needed,
+            (None, PendingClean) when the comment should go to OpenAI
+        """
         if not text or not text.strip():
             return CleaningResult(
                 original_text=text or "",
                 cleaned_text="",
                 should_skip=True,
                 skip_reason="Empty comment"
-            )
+            ), None
         
         text = text.strip()
         
@@ -252,56 +358,69 @@ class CommentCleaner:
                 cleaned_text="",
                 should_skip=True,
                 skip_reason=skip_check[1]
-            )
+            ), None
         
         # Step 2: Apply rule-based cleaning first
         rule_cleaned = self._apply_rule_cleaning(text)
+        rule_result = CleaningResult(
+            original_text=text,
+            cleaned_text=rule_cleaned,
+            should_skip=False,
+            cleaning_method="rule-based"
+        )
         
         # If rule cleaning already gives good result, return it
         if rule_cleaned and self._is_meaningful_comment(rule_cleaned):
             # Check if OpenAI cleaning would improve it
-            if self.openai_client and len(rule_cleaned) > 20:
-                try:
-                    openai_cleaned = self._openai_clean(rule_cleaned)
-                    if openai_cleaned and openai_cleaned != "SKIP":
-                        return CleaningResult(
-                            original_text=text,
-                            cleaned_text=openai_cleaned,
-                            should_skip=False,
-                            cleaning_method="hybrid"
-                        )
-                except Exception as e:
-                    logger.warning(f"OpenAI cleaning failed: {e}")
-            
-            return CleaningResult(
-                original_text=text,
-                cleaned_text=rule_cleaned,
-                should_skip=False,
-                cleaning_method="rule-based"
-            )
+            if self.openai_client and len(rule_cleaned) > 20 and self._may_need_openai(text, rule_cleaned):
+                return None, PendingClean(text, rule_cleaned, rule_cleaned, "hybrid")
+            return rule_result, None
         
         # Step 3: Try OpenAI for difficult cases
         if self.openai_client:
-            try:
-                openai_cleaned = self._openai_clean(text)
-                if openai_cleaned == "SKIP":
-                    return CleaningResult(
-                        original_text=text,
-                        cleaned_text="",
-                        should_skip=True,
-                        skip_reason="OpenAI determined as technical element",
-                        cleaning_method="openai"
-                    )
-                if openai_cleaned and self._is_meaningful_comment(openai_cleaned):
-                    return CleaningResult(
-                        original_text=text,
-                        cleaned_text=openai_cleaned,
-                        should_skip=False,
-                        cleaning_method="openai"
-                    )
-            except Exception as e:
-                logger.warning(f"OpenAI cleaning failed: {e}")
+            return None, PendingClean(text, rule_cleaned, text, "openai")
         
+        return self._rule_fallback(text, rule_cleaned), None
+    
+    def _llm_stage(self, pending: 'PendingClean', openai_cleaned: Optional[str]) -> CleaningResult:
+        """
+        Turn the OpenAI answer for a pending comment into a CleaningResult
+        
+        Args:
+            pending: Comment state from _rule_stage
+            openai_cleaned: Cleaned text, "SKIP", or None if the call failed
+        """
+        text = pending.original_text
+        
+        if pending.mode == "hybrid":
+            if openai_cleaned and openai_cleaned != "SKIP":
+                return CleaningResult(
+                    original_text=text,
+                    cleaned_text=openai_cleaned,
+                    should_skip=False,
+                    cleaning_method="hybrid"
+                )
+            return self._rule_fallback(text, pending.rule_cleaned)
+        
+        if openai_cleaned == "SKIP":
+            return CleaningResult(
+                original_text=text,
+                cleaned_text="",
+                should_skip=True,
+                skip_reason="OpenAI determined as technical element",
+                cleaning_method="openai"
+            )
+        if openai_cleaned and self._is_meaningful_comment(openai_cleaned):
+            return CleaningResult(
+                original_text=text,
+                cleaned_text=openai_cleaned,
+                should_skip=False,
+                cleaning_method="openai"
+            )
+        return self._rule_fallback(text, pending.rule_cleaned)
+    
+    def _rule_fallback(self, text: str, rule_cleaned: str) -> CleaningResult:
+        """Rule-based result, or skip if nothing meaningful is left"""
         # Fallback to rule-based result
         if rule_cleaned and self._is_meaningful_comment(rule_cleaned):
             return CleaningResult(
@@ -319,6 +438,22 @@ class CommentCleaner:
             skip_reason="Could not extract meaningful content"
         )
     
+    def _may_need_openai(self, text: str, rule_cleaned: str) -> bool:
+        """
+        False when the rules left nothing for OpenAI to remove
+        
+        Text the rules did not change, with no annotation label anywhere and
+        no name-like or title prefix, would come back from OpenAI unchanged.
+        """
+        if rule_cleaned != text:
+            return True
+        text_lower = text.lower()
+        if any(label.lower() in text_lower for label in self.config.config["annotation_labels"]):
+            return True
+        if re.match(r"^([A-Z][a-z]+\s+[A-Z][a-z]+|(Mr|Mrs|Ms|Dr|Prof|Miss|Sir|Madam)\b|Typewriter|SHX|AutoCAD)", text):
+            return True
+        return False
+    
     def _should_skip(self, text: str) -> Tuple[bool, Optional[str]]:
         """
         Check if comment should be skipped entirely
@@ -447,12 +582,13 @@ class CommentCleaner:
         
         return cleaned
     
-    def _openai_clean(self, text: str) -> str:
+    def _openai_clean(self, text: str, raise_errors: bool = False) -> str:
         """
         Use OpenAI to intelligently clean comment text
         
         Args:
             text: Comment text to clean
+            raise_errors: Re-raise API errors instead of returning the input text
             
         Returns:
             Cleaned text or "SKIP" if should be skipped
@@ -464,43 +600,7 @@ class CommentCleaner:
 
 TASK: Clean the following comment text extracted from a PDF annotation.
 
-RULES:
-1. Return "SKIP" if the text is ONLY technical/AutoCAD elements with NO actual comment content:
-   - Just "Typewriter 166" = SKIP
-   - Just "SHX Text" = SKIP
-   - Pure numbers/coordinates like "100.5" = SKIP
-   - Drawing codes with no comment = SKIP
-
-2. REMOVE from START (but ONLY from start):
-   - Person names (e.g., "Sreejith Rajeev", "John Smith", "Abdullah Ahmed")
-   - Annotation types: "text box", "Text Box", "Callout", "Free Text", "Note", "Sticky Note"
-   - Typewriter labels (e.g., "Typewriter 166")
-   - Title prefixes (Mr, Mrs, Dr, etc.)
-   - Any combination like "Name - text box:", "Name Callout:", etc.
-
-3. CRITICAL - Remove these annotation labels everywhere they appear:
-   - "text box" or "Text Box" → REMOVE
-   - "Callout" → REMOVE
-   - "Free Text" or "free text" → REMOVE
-   - "Note" or "Sticky Note" → REMOVE
-   - Remove with or without colons/hyphens
-
-4. KEEP names that appear IN THE MIDDLE or END of meaningful comments:
-   - "Update design as requested by Sreejith" → KEEP as is
-   - "Coordinate with John for approval" → KEEP as is
-
-5. Preserve the ACTUAL COMMENT CONTENT exactly as written.
-
-EXAMPLES:
-- "Sreejith Rajeev text box Update design" → "Update design"
-- "John Smith Callout: Check valve sizing" → "Check valve sizing"
-- "text box Check specifications" → "Check specifications"
-- "Typewriter 166" → "SKIP"
-- "Abdullah - Free Text: Review the calculations" → "Review the calculations"
-- "Note: Verify pressure ratings" → "Verify pressure ratings"
-- "Sticky Note Update P&ID" → "Update P&ID"
-- "Update the P&ID as discussed with Ahmed" → "Update the P&ID as discussed with Ahmed"
-- "AutoCAD SHX Text" → "SKIP"
+{CLEANING_RULES}
 
 INPUT TEXT:
 {text}
@@ -511,7 +611,7 @@ OUTPUT (cleaned text or SKIP):"""
             response = self.openai_client.chat.completions.create(
                 model=self.config.config["openai"]["model"],
                 messages=[
-                    {"role": "system", "content": "You clean PDF comment text. Respond with ONLY the cleaned text or 'SKIP'. No explanations."},
+                    {"role": "system", "content": CLEANER_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=self.config.config["openai"]["max_tokens"],
@@ -529,6 +629,8 @@ OUTPUT (cleaned text or SKIP):"""
             
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
+            if raise_errors:
+                raise
             return text
     
     def _is_meaningful_comment(self, text: str) -> bool:
@@ -544,17 +646,216 @@ OUTPUT (cleaned text or SKIP):"""
         
         return True
     
-    def clean_comments_batch(self, comments: List[str]) -> List[CleaningResult]:
+    def clean_comments_batch(self, comments: List[str], batch_size: Optional[int] = None,
+                             max_concurrency: Optional[int] = None) -> List[CleaningResult]:
         """
         Clean a batch of comments
         
+        Rule-only comments never reach OpenAI. The rest are packed
+        batch_size per request (one JSON-mode completion per chunk) and the
+        chunks run concurrently, at most max_concurrency at a time.
+        
         Args:
             comments: List of comment texts
+            batch_size: Comments per OpenAI request (config openai.batch_size)
+            max_concurrency: Parallel OpenAI requests (config openai.max_concurrency)
             
         Returns:
             List of CleaningResult objects
         """
-        return [self.clean_comment(comment) for comment in comments]
+        results: List[Optional[CleaningResult]] = [None] * len(comments)
+        pending: Dict[int, PendingClean] = {}
+        cache_keys: Dict[int, str] = {}
+        first_with_key: Dict[str, int] = {}
+        repeats: Dict[int, int] = {}
+        
+        for i, comment in enumerate(comments):
+            cache_key = cleaning_cache.make_key(comment, self.config_version)
+            if cache_key in first_with_key:
+                # Same comment earlier in this batch - clean it once
+                repeats[i] = first_with_key[cache_key]
+                continue
+            first_with_key[cache_key] = i
+            cache_keys[i] = cache_key
+        
+        # One shared-cache read for the whole batch
+        cached = cleaning_cache.get_many({key: (comments[i] or "").strip() for i, key in cache_keys.items()})
+        rule_results: Dict[str, CleaningResult] = {}
+        for i, cache_key in cache_keys.items():
+            if cache_key in cached:
+                results[i] = cached[cache_key]
+                continue
+            
+            result, pending_clean = self._rule_stage(comments[i])
+            if pending_clean is None:
+                results[i] = result
+                rule_results[cache_key] = result
+            else:
+                pending[i] = pending_clean
+        cleaning_cache.set_many(rule_results, shared=False)
+        
+        if pending:
+            openai_config = self.config.config["openai"]
+            batch_size = max(1, batch_size or openai_config.get("batch_size", 25))
+            max_concurrency = max(1, max_concurrency or openai_config.get("max_concurrency", 4))
+            
+            indices = list(pending)
+            chunks = [indices[i:i + batch_size] for i in range(0, len(indices), batch_size)]
+            logger.info(f"OpenAI batch cleaning: {len(indices)}/{len(comments)} comments "
+                        f"in {len(chunks)} request(s)")
+            
+            try:
+                answers = _run_coroutine(self._clean_chunks_async(
+                    [[(i, pending[i].llm_input) for i in chunk] for chunk in chunks],
+                    max_concurrency
+                ))
+            except Exception as e:
+                logger.warning(f"OpenAI batch cleaning failed, using rule-based results: {e}")
+                answers = {}
+            
+            fell_back = [i for i in pending if i not in answers]
+            if fell_back:
+                logger.warning(f"OpenAI cleaning unavailable for {len(fell_back)}/{len(pending)} comments, "
+                               f"using rule-based results for indices {fell_back}")
+            
+            for i, pending_clean in pending.items():
+                results[i] = self._llm_stage(pending_clean, answers.get(i))
+            # Degraded (rule fallback) results are not cached so the next occurrence retries OpenAI
+            cleaning_cache.set_many({cache_keys[i]: results[i] for i in pending if i in answers})
+        
+        for i, first in repeats.items():
+            results[i] = replace(results[first], original_text=(comments[i] or "").strip())
+        
+        cleaning_cache.flush_stats()
+        return results
+    
+    async def _clean_chunks_async(self, chunks: List[List[Tuple[int, str]]],
+                                  max_concurrency: int) -> Dict[int, str]:
+        """
+        Run chunk requests with bounded concurrency; returns {comment index: answer}
+        
+        A chunk that fails or comes back incomplete (error, unparseable JSON,
+        missing ids) is split in half and the unanswered comments retried, down
+        to single comments, so one bad comment does not cost the whole chunk its
+        OpenAI results.
+        """
+        client = AsyncOpenAI(api_key=self.openai_client.api_key, max_retries=0)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run_chunk(chunk):
+            async with semaphore:
+                try:
+                    answers = await self._openai_clean_chunk(client, chunk)
+                except (AuthenticationError, PermissionDeniedError) as e:
+                    # Smaller requests would fail the same way
+                    logger.warning(f"OpenAI batch of {len(chunk)} comments failed: {e}")
+                    return {}
+                except Exception as e:
+                    logger.warning(f"OpenAI batch of {len(chunk)} comments failed: {e}")
+                    answers = {}
+            
+            missing = [item for item in chunk if item[0] not in answers]
+            if not missing or len(chunk) == 1:
+                return answers
+            
+            middle = (len(missing) + 1) // 2
+            retries = [missing] if len(missing) == 1 else [missing[:middle], missing[middle:]]
+            logger.info(f"Retrying {len(missing)} unanswered comment(s) in {len(retries)} smaller request(s)")
+            for retry_answers in await asyncio.gather(*(run_chunk(part) for part in retries)):
+                answers.update(retry_answers)
+            return answers
+        
+        answers: Dict[int, str] = {}
+        try:
+            for chunk_answers in await asyncio.gather(*(run_chunk(chunk) for chunk in chunks)):
+                answers.update(chunk_answers)
+        finally:
+            await client.close()
+        return answers
+    
+    async def _openai_clean_chunk(self, client, chunk: List[Tuple[int, str]]) -> Dict[int, str]:
+        """
+        Clean several comments with one structured-output request
+        
+        Returns:
+            {comment index: cleaned text or "SKIP"}; comments missing from the
+            answer are left out and fall back to rule-based cleaning
+        """
+        openai_config = self.config.config["openai"]
+        items = [{"id": position, "text": text} for position, (_, text) in enumerate(chunk)]
+        
+        prompt = f"""You are a PDF comment text cleaner for engineering documents.
+
+TASK: Clean EACH of the following comment texts extracted from PDF annotations.
+
+{CLEANING_RULES}
+
+INPUT (JSON array of comments):
+{json.dumps(items, ensure_ascii=False)}
+
+OUTPUT: a JSON object {{"results": [{{"id": <id>, "text": "<cleaned text or SKIP>"}}]}} with one entry per input id."""
+        
+        max_tokens = min(
+            openai_config.get("batch_max_tokens", 4096),
+            openai_config["max_tokens"] * len(chunk) + 50
+        )
+        
+        response = await self._with_retries(lambda: client.chat.completions.create(
+            model=openai_config["model"],
+            messages=[
+                {"role": "system", "content": "You clean PDF comment text. Respond with ONLY the requested JSON object. No explanations."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=openai_config["temperature"],
+            response_format={"type": "json_object"}
+        ))
+        
+        content = response.choices[0].message.content or "{}"
+        answers = {}
+        for entry in json.loads(content).get("results", []):
+            try:
+                position = int(entry["id"])
+                text = str(entry["text"]).strip()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= position < len(chunk) and text:
+                answers[chunk[position][0]] = "SKIP" if text.upper() == "SKIP" else text
+        
+        if len(answers) < len(chunk):
+            logger.warning(f"OpenAI batch answered {len(answers)}/{len(chunk)} comments")
+        return answers
+    
+    async def _with_retries(self, make_request):
+        """Retry rate limits, timeouts and 5xx with backoff, honouring Retry-After"""
+        max_retries = self.config.config["openai"].get("max_retries", 5)
+        for attempt in range(max_retries + 1):
+            try:
+                return await make_request()
+            except (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError) as e:
+                if attempt == max_retries:
+                    raise
+                delay = min(30.0, 2 ** attempt) + random.uniform(0, 0.5)
+                retry_after = getattr(getattr(e, 'response', None), 'headers', {}).get('retry-after')
+                if retry_after:
+                    try:
+                        delay = max(delay, float(retry_after))
+                    except ValueError:
+                        pass
+                logger.info(f"OpenAI {type(e).__name__}, retrying in {delay:.1f}s "
+                            f"(attempt {attempt + 1}/{max_retries})")
+                await asyncio.sleep(delay)
+
+
+def _run_coroutine(coroutine):
+    """asyncio.run(), also from a thread that already has a running event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
 
 
 # Singleton instance for easy access
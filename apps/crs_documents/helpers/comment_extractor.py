@@ -6,13 +6,16 @@ Enhanced with intelligent comment cleaning
 Uses PyMuPDF (fitz) for better annotation extraction
 """
 
+import os
 import re
-import fitz  # PyMuPDF - better for annotations
 import PyPDF2
-from typing import List, Dict, Optional
+from typing import BinaryIO, List, Dict, Optional, Union
 from io import BytesIO
 import logging
 
+from .annotation_scanner import iter_page_scans
+from .near_duplicates import NearDuplicateIndex
+
 # Import comment cleaner for intelligent text processing
 try:
     from .comment_cleaner import get_comment_cleaner, CleaningResult
@@ -22,6 +25,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Similarity (0-1) at which two comments are treated as duplicates
+DEDUP_SIMILARITY_THRESHOLD = 0.90
+
 
 def _pre_clean_annotation_text(text: str) -> str:
     """
@@ -65,13 +71,18 @@ class ReviewerComment:
         self.cleaning_method: str = ""  # "rule-based", "openai", or "hybrid"
 
 
-def extract_reviewer_comments(pdf_buffer: BytesIO, apply_cleaning: bool = True) -> List[ReviewerComment]:
+def extract_reviewer_comments(pdf_source: Union[str, os.PathLike, bytes, BinaryIO], apply_cleaning: bool = True,
+                              max_workers: Optional[int] = None,
+                              page_timeout: Optional[float] = None) -> List[ReviewerComment]:
     """
     Extract reviewer comments from PDF using PyMuPDF (fitz)
     
     Args:
-        pdf_buffer: BytesIO object containing PDF file
+        pdf_source: PDF as a path, bytes or file-like object (e.g. an UploadedFile);
+            read from disk page by page, never copied into memory
         apply_cleaning: Whether to apply intelligent comment cleaning (default: True)
+        max_workers: Page-scanning processes (default: CRS_EXTRACTION_WORKERS for large PDFs)
+        page_timeout: Seconds allowed per page in worker processes (default: CRS_PAGE_TIMEOUT)
         
     Returns:
         List of ReviewerComment objects
@@ -90,68 +101,60 @@ def extract_reviewer_comments(pdf_buffer: BytesIO, apply_cleaning: bool = True)
             logger.warning(f"⚠️ Could not initialize comment cleaner: {e}")
     
     try:
-        # Use PyMuPDF (fitz) for better annotation extraction
-        pdf_bytes = pdf_buffer.read()
-        pdf_buffer.seek(0)  # Reset for potential re-use
-        
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        logger.info(f"📄 Opened PDF with {len(doc)} pages")
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
+        # Use PyMuPDF (fitz) for better annotation extraction; pages are
+        # streamed from disk (and fanned out to worker processes when large)
+        page_total = 0
+        for page_scan in iter_page_scans(pdf_source, include_text=True, max_workers=max_workers,
+                                         page_timeout=page_timeout):
+            page_num = page_scan.page_index
+            page_total += 1
             
             # Extract annotations (comments, highlights, etc.)
-            annotations = page.annots()
-            if annotations:
-                for annot in annotations:
-                    try:
-                        annot_type = annot.type[1]  # Get annotation type name
-                        content = annot.info.get("content", "") or ""
-                        title = annot.info.get("title", "") or ""  # Often contains author name
-                        subject = annot.info.get("subject", "") or ""
-                        
-                        # Skip empty annotations
-                        if not content.strip():
-                            # Try to get text from popup or other sources
-                            popup = annot.info.get("popup", "")
-                            if popup:
-                                content = str(popup)
-                        
-                        if not content.strip():
-                            continue
-                        
-                        # Pre-clean the content to remove annotation type labels
-                        content_cleaned = _pre_clean_annotation_text(content.strip())
-                        
-                        # Skip if pre-cleaning removed everything
-                        if not content_cleaned or len(content_cleaned) < 5:
-                            logger.debug(f"Skipped empty after pre-clean: {content[:50]}...")
-                            continue
-                        
-                        comment = ReviewerComment()
-                        comment.comment_text = content_cleaned
-                        comment.page_number = page_num + 1
-                        comment.comment_type = _map_annot_type_to_comment_type(annot_type)
-                        comment.reviewer_name = title.strip() if title.strip() else "Not Provided"
-                        comment.raw_text = f"{annot_type}: {content}"
-                        
-                        # Try to extract discipline from content
-                        comment.discipline = _extract_discipline_from_text(content)
-                        
-                        comments.append(comment)
-                        logger.debug(f"Found annotation: {annot_type} - {content[:50]}...")
-                        
-                    except Exception as e:
-                        logger.warning(f"Error extracting annotation: {e}")
+            for annot in page_scan.annotations:
+                try:
+                    annot_type = annot.annot_type
+                    content = annot.content
+                    title = annot.title  # Often contains author name
+                    
+                    # Skip empty annotations
+                    if not content.strip():
+                        # Try to get text from popup or other sources
+                        content = annot.popup
+                    
+                    if not content.strip():
+                        continue
+                    
+                    # Pre-clean the content to remove annotation type labels
+                    content_cleaned = _pre_clean_annotation_text(content.strip())
+                    
+                    # Skip if pre-cleaning removed everything
+                    if not content_cleaned or len(content_cleaned) < 5:
+                        logger.debug(f"Skipped empty after pre-clean: {content[:50]}...")
                         continue
+                    
+                    comment = ReviewerComment()
+                    comment.comment_text = content_cleaned
+                    comment.page_number = page_num + 1
+                    comment.comment_type = _map_annot_type_to_comment_type(annot_type)
+                    comment.reviewer_name = title.strip() if title.strip() else "Not Provided"
+                    comment.raw_text = f"{annot_type}: {content}"
+                    
+                    # Try to extract discipline from content
+                    comment.discipline = _extract_discipline_from_text(content)
+                    
+                    comments.append(comment)
+                    logger.debug(f"Found annotation: {annot_type} - {content[:50]}...")
+                    
+                except Exception as e:
+                    logger.warning(f"Error extracting annotation: {e}")
+                    continue
             
             # Also extract text-based comments from page content
-            text = page.get_text()
-            if text:
-                text_comments = _extract_comments_from_text(text, page_num + 1)
+            if page_scan.text:
+                text_comments = _extract_comments_from_text(page_scan.text, page_num + 1)
                 comments.extend(text_comments)
         
-        doc.close()
+        logger.info(f"📄 Scanned PDF with {page_total} pages")
         logger.info(f"✅ Extracted {len(comments)} raw comments from PDF")
     
     except Exception as e:
@@ -159,7 +162,7 @@ def extract_reviewer_comments(pdf_buffer: BytesIO, apply_cleaning: bool = True)
         # Fallback to PyPDF2
         try:
             logger.info("Falling back to PyPDF2...")
-            comments = _extract_with_pypdf2(pdf_buffer)
+            comments = _extract_with_pypdf2(pdf_source)
         except Exception as e2:
             logger.error(f"PyPDF2 fallback also failed: {str(e2)}")
             return []
@@ -177,26 +180,29 @@ def extract_reviewer_comments(pdf_buffer: BytesIO, apply_cleaning: bool = True)
         cleaned_comments = []
         skipped_count = 0
         
-        for comment in comments:
-            try:
-                result = cleaner.clean_comment(comment.comment_text)
-                
-                if result.should_skip:
-                    skipped_count += 1
-                    logger.debug(f"Skipped comment: {comment.comment_text[:50]}... Reason: {result.skip_reason}")
-                    continue
-                
-                # Update comment with cleaned text
-                comment.raw_text = comment.comment_text  # Preserve original
-                comment.comment_text = result.cleaned_text
-                comment.cleaned = True
-                comment.cleaning_method = result.cleaning_method
-                cleaned_comments.append(comment)
-                
-            except Exception as e:
-                logger.warning(f"Cleaning error for comment: {e}")
-                # Keep original comment on error
+        try:
+            results = cleaner.clean_comments_batch([comment.comment_text for comment in comments])
+        except Exception as e:
+            logger.warning(f"Cleaning error for comments: {e}")
+            # Keep original comments on error
+            results = [None] * len(comments)
+        
+        for comment, result in zip(comments, results):
+            if result is None:
                 cleaned_comments.append(comment)
+                continue
+            
+            if result.should_skip:
+                skipped_count += 1
+                logger.debug(f"Skipped comment: {comment.comment_text[:50]}... Reason: {result.skip_reason}")
+                continue
+            
+            # Update comment with cleaned text
+            comment.raw_text = comment.comment_text  # Preserve original
+            comment.comment_text = result.cleaned_text
+            comment.cleaned = True
+            comment.cleaning_method = result.cleaning_method
+            cleaned_comments.append(comment)
         
         logger.info(f"✅ Cleaned {len(cleaned_comments)} comments, skipped {skipped_count} technical elements")
         comments = cleaned_comments
@@ -246,13 +252,18 @@ def _extract_discipline_from_text(text: str) -> str:
     return "Not Provided"
 
 
-def _extract_with_pypdf2(pdf_buffer: BytesIO) -> List[ReviewerComment]:
+def _extract_with_pypdf2(pdf_source) -> List[ReviewerComment]:
     """Fallback extraction using PyPDF2"""
     comments = []
-    pdf_buffer.seek(0)
     
     try:
-        pdf_reader = PyPDF2.PdfReader(pdf_buffer)
+        if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+            pdf_source = BytesIO(pdf_source)
+        elif hasattr(pdf_source, 'temporary_file_path'):
+            pdf_source = pdf_source.temporary_file_path()
+        elif hasattr(pdf_source, 'seek'):
+            pdf_source.seek(0)
+        pdf_reader = PyPDF2.PdfReader(pdf_source)
         
         for page_num, page in enumerate(pdf_reader.pages, start=1):
             text = page.extract_text()
@@ -447,13 +458,19 @@ def _filter_incomplete_comments(comments: List[ReviewerComment]) -> List[Reviewe
     return filtered_comments
 
 
-def _deduplicate_comments(comments: List[ReviewerComment]) -> List[ReviewerComment]:
+def _deduplicate_comments(comments: List[ReviewerComment],
+                          similarity_threshold: float = DEDUP_SIMILARITY_THRESHOLD) -> List[ReviewerComment]:
     """
     Remove duplicate comments based on text similarity
     Enhanced to handle near-duplicates and variations
+
+    Near-duplicates are found through a positional block + MinHash/LSH index
+    (see near_duplicates.py), so each comment is compared only with the few kept
+    comments sharing a bucket, and every pair the old 90% positional comparison
+    caught is still caught.
     """
     unique_comments = []
-    seen_texts = set()
+    index = NearDuplicateIndex(threshold=similarity_threshold)
     
     def normalize_for_comparison(text: str) -> str:
         """Normalize text for duplicate detection"""
@@ -482,38 +499,8 @@ def _deduplicate_comments(comments: List[ReviewerComment]) -> List[ReviewerComme
         if len(normalized) < 5:
             continue
         
-        # Check for exact duplicates
-        if normalized in seen_texts:
-            continue
-        
-        # Check for near-duplicates (90% similarity on first 150 chars)
-        is_duplicate = False
-        normalized_prefix = normalized[:150]
-        
-        for seen_text in seen_texts:
-            seen_prefix = seen_text[:150]
-            
-            # Calculate simple similarity (matching chars / total chars)
-            if len(normalized_prefix) > 0 and len(seen_prefix) > 0:
-                # Use Levenshtein-like approach: check if 90% similar
-                min_len = min(len(normalized_prefix), len(seen_prefix))
-                max_len = max(len(normalized_prefix), len(seen_prefix))
-                
-                if min_len > 0:
-                    # Simple character-by-character comparison
-                    matches = sum(1 for i in range(min_len) 
-                                if i < len(normalized_prefix) and 
-                                   i < len(seen_prefix) and 
-                                   normalized_prefix[i] == seen_prefix[i])
-                    
-                    similarity = matches / max_len
-                    
-                    if similarity >= 0.90:  # 90% similar
-                        is_duplicate = True
-                        break
-        
-        if not is_duplicate:
-            seen_texts.add(normalized)
+        # Exact and near-duplicates (90% similar on first 150 chars by default)
+        if index.add_if_new(normalized):
             unique_comments.append(comment)
     
     return unique_comments
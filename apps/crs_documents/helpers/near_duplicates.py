@@ -0,0 +1,175 @@
+"""
+Near-Duplicate Index - MinHash/LSH over character shingles
+Used by comment_extractor to dedupe thousands of annotations in near-linear
+time instead of comparing every comment with every comment already kept.
+"""
+
+import math
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+# Mersenne prime 2^31 - 1: (a * x + b) stays below 2^62, no uint64 overflow
+_PRIME = (1 << 31) - 1
+
+
+def positional_similarity(a: str, b: str) -> float:
+    """Matching characters at the same position / length of the longer text"""
+    if not a or not b:
+        return 0.0
+    matches = sum(1 for x, y in zip(a, b) if x == y)
+    return matches / max(len(a), len(b))
+
+
+class NearDuplicateIndex:
+    """
+    Index of texts already kept; answers "is this a near-duplicate?"
+
+    Two candidate sources, so each lookup touches only texts that share a bucket:
+
+    - Positional blocks: the window is cut into fixed-position blocks sized so
+      that two texts whose positional character match reaches the threshold
+      always share at least one identical block (pigeonhole). This finds every
+      pair the original character-by-character comparison found.
+    - LSH buckets of MinHash signatures (bands x rows) over shingles, for texts
+      shifted by inserted or dropped characters.
+
+    A candidate is a duplicate when either the positional match or the shingle
+    Jaccard similarity reaches the threshold.
+
+    Args:
+        threshold: similarity (0-1) at which texts count as duplicates
+        shingle_size: characters per shingle
+        bands, rows: LSH layout; bands * rows MinHash permutations
+        compare_chars: only the first N characters are compared
+    """
+
+    def __init__(self, threshold: float = 0.90, shingle_size: int = 5,
+                 bands: int = 20, rows: int = 5, compare_chars: int = 150, seed: int = 1):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = rows
+        self.compare_chars = compare_chars
+
+        rng = np.random.RandomState(seed)
+        num_perm = bands * rows
+        self._a = rng.randint(1, _PRIME, size=(num_perm, 1)).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=(num_perm, 1)).astype(np.uint64)
+
+        # Largest block size that keeps the pigeonhole guarantee: a pair at the
+        # threshold has at most (1 - threshold) * n mismatches in its n common
+        # positions, fewer than the floor(n / block_size) whole blocks there
+        self.block_size = max(1, int(1 / (2 * (1 - threshold)))) if threshold < 1 else compare_chars
+
+        self._exact: Set[str] = set()
+        self._blocks: Dict[Tuple[int, str], List[int]] = defaultdict(list)
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [defaultdict(list) for _ in range(bands)]
+        self._texts: List[str] = []
+        self._shingles: List[Set[str]] = []
+
+    def _shingle(self, text: str) -> Set[str]:
+        k = self.shingle_size
+        if len(text) <= k:
+            return {text}
+        return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+    def _signature(self, shingles: Set[str]) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode('utf-8')) & _PRIME for s in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, ...]]:
+        r = self.rows
+        return [tuple(signature[i * r:(i + 1) * r].tolist()) for i in range(self.bands)]
+
+    def _block_keys(self, text: str) -> List[Tuple[int, str]]:
+        size = self.block_size
+        return [(start, text[start:start + size]) for start in range(0, len(text) - size + 1, size)]
+
+    def _positional_candidates(self, text: str, block_keys: List[Tuple[int, str]]) -> List[int]:
+        """
+        Indexed texts sharing enough blocks with text to possibly reach the threshold
+
+        With n common positions and at most n - ceil(threshold * longer length)
+        mismatches, at least floor(n / block_size) - mismatches blocks are shared.
+        """
+        shared = Counter()
+        for key in block_keys:
+            shared.update(self._blocks.get(key, ()))
+
+        def min_matches(length: int) -> int:
+            # Tolerance: 0.9 * 70 is 63.00000000000001, yet 63 / 70 >= 0.9
+            return math.ceil(self.threshold * length - 1e-9)
+
+        # Blocks needed by length of the other text; lengths outside the range cannot match
+        needed = {}
+        longest = min(int(len(text) / self.threshold + 1e-9), self.compare_chars)
+        for other_len in range(min_matches(len(text)), longest + 1):
+            common = min(len(text), other_len)
+            mismatches = common - min_matches(max(len(text), other_len))
+            if mismatches >= 0:
+                needed[other_len] = max(1, common // self.block_size - mismatches)
+        if not needed:
+            return []
+
+        fewest = min(needed.values())
+        texts = self._texts
+        return [
+            idx for idx, count in shared.items()
+            if count >= fewest and count >= needed.get(len(texts[idx]), len(block_keys) + 1)
+        ]
+
+    def _is_similar(self, text: str, shingles: Set[str], idx: int) -> bool:
+        other = self._texts[idx]
+        # Length ratio bounds both measures; skip obviously different texts cheaply
+        if min(len(text), len(other)) < self.threshold * max(len(text), len(other)):
+            return False
+        other_shingles = self._shingles[idx]
+        jaccard = len(shingles & other_shingles) / len(shingles | other_shingles)
+        if jaccard >= self.threshold:
+            return True
+        return positional_similarity(text, other) >= self.threshold
+
+    def add_if_new(self, text: str) -> bool:
+        """
+        Add text unless it is a near-duplicate of one already indexed
+
+        Returns:
+            True if the text was new (and is now indexed), False if duplicate
+        """
+        if text in self._exact:
+            return False
+
+        window = text[:self.compare_chars]
+        shingles = self._shingle(window)
+        keys = self._band_keys(self._signature(shingles))
+        block_keys = self._block_keys(window)
+
+        checked = set()
+        for idx in self._positional_candidates(window, block_keys):
+            checked.add(idx)
+            if positional_similarity(window, self._texts[idx]) >= self.threshold:
+                return False
+
+        for band, key in enumerate(keys):
+            for idx in self._buckets[band].get(key, ()):
+                if idx in checked:
+                    continue
+                checked.add(idx)
+                if self._is_similar(window, shingles, idx):
+                    return False
+
+        idx = len(self._texts)
+        self._exact.add(text)
+        self._texts.append(window)
+        self._shingles.append(shingles)
+        for key in block_keys:
+            self._blocks[key].append(idx)
+        for band, key in enumerate(keys):
+            self._buckets[band][key].append(idx)
+        return True
@@ -6,8 +6,12 @@ Enhanced with S3Service for proper bucket access
 """
 
 import os
+import time
+import threading
 import requests
+from dataclasses import dataclass, field, replace
 from io import BytesIO
+from typing import Optional, Tuple
 from django.conf import settings
 from pathlib import Path
 import logging
@@ -34,6 +38,33 @@ LOCAL_TEMPLATE_PATHS = [
 ]
 
 
+# Remote (S3/URL) templates are re-checked by ETag at most this often
+TEMPLATE_REVALIDATE_SECONDS = getattr(settings, 'CRS_TEMPLATE_REVALIDATE_SECONDS', 300)
+
+
+@dataclass(frozen=True)
+class CachedTemplate:
+    """
+    A loaded CRS template shared by every export in this process
+    
+    content is immutable bytes; each caller wraps it in its own BytesIO,
+    which shares the buffer until written to.
+    """
+    content: bytes
+    origin: str             # 'local', 's3' or 'url'
+    source: str             # local path, S3 key or URL
+    version: str            # local mtime/size, or remote ETag
+    validation: dict        # validate_template() result
+    column_mapping: dict = field(default_factory=dict)
+    loaded_at: float = 0.0
+    checked_at: float = 0.0
+
+
+_template_lock = threading.Lock()  # guards _cached_template, held only to read or swap it
+_load_lock = threading.Lock()      # single flight for revalidation and loading (network I/O)
+_cached_template: Optional[CachedTemplate] = None
+
+
 def get_s3_service():
     """Get S3Service instance if available"""
     try:
@@ -55,6 +86,12 @@ def download_template_from_s3_service() -> BytesIO:
     Raises:
         FileNotFoundError: If template not found in S3
     """
+    _, content, _ = _download_from_s3_service()
+    return BytesIO(content)
+
+
+def _download_from_s3_service() -> Tuple[str, bytes, str]:
+    """Download the template from the first S3 key that has it; returns (key, content, etag)"""
     s3_service = get_s3_service()
     if not s3_service:
         raise FileNotFoundError("S3Service not available")
@@ -68,9 +105,8 @@ def download_template_from_s3_service() -> BytesIO:
             if result.get('success') and result.get('body'):
                 # Read the streaming body
                 content = result['body'].read()
-                template_buffer = BytesIO(content)
                 logger.info(f"✅ Downloaded template from S3: {template_key} ({len(content)} bytes)")
-                return template_buffer
+                return template_key, content, result.get('etag') or ''
                 
         except Exception as e:
             logger.debug(f"Template not found at {template_key}: {e}")
@@ -89,22 +125,167 @@ def get_crs_template() -> BytesIO:
     3. Fallback to direct URL download
     4. Cache downloaded template for future use
     
+    The template is loaded once per process and served from memory while
+    it is current (see get_cached_template).
+    
     Returns:
         BytesIO: Template file buffer
     
     Raises:
         FileNotFoundError: If template cannot be found or downloaded
     """
+    return BytesIO(get_cached_template().content)
+
+
+def get_cached_template() -> CachedTemplate:
+    """
+    Process-wide CRS template with its validation and column mapping
+    
+    Revalidation:
+    - local file: mtime/size compared on every call (a stat per path)
+    - S3 / URL download: ETag compared every TEMPLATE_REVALIDATE_SECONDS;
+      if the check itself fails the cached copy keeps being served
+    
+    One caller at a time revalidates or loads, without holding the cache
+    lock; meanwhile other callers are served the cached copy, and only
+    callers with no template at all wait for the load.
+    
+    Raises:
+        FileNotFoundError: If template cannot be found or downloaded
+    """
+    with _template_lock:
+        cached = _cached_template
+    
+    if cached is not None:
+        if not _load_lock.acquire(blocking=False):
+            return cached  # Another caller is checking or reloading it
+        try:
+            current = _revalidate(cached)
+            if current is not None:
+                _swap_template(current, expected=cached)
+                return current
+            logger.info(f"🔄 CRS template changed ({cached.source}), reloading")
+            return _swap_template(_load_template())
+        finally:
+            _load_lock.release()
+    
+    with _load_lock:
+        with _template_lock:
+            cached = _cached_template
+        if cached is not None:
+            return cached  # Loaded while this caller waited
+        return _swap_template(_load_template())
+
+
+def _swap_template(template: CachedTemplate, expected: Optional[CachedTemplate] = None) -> CachedTemplate:
+    """Publish a template; with expected, only if the cache still holds that entry (not invalidated meanwhile)"""
+    global _cached_template
+    with _template_lock:
+        if expected is None or _cached_template is expected:
+            _cached_template = template
+    return template
+
+
+def invalidate_template_cache():
+    """Drop the cached template; the next export loads it again"""
+    global _cached_template
+    with _template_lock:
+        _cached_template = None
+
+
+def _local_template_version(path: str) -> Optional[str]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def _first_local_template() -> Tuple[Optional[str], Optional[str]]:
+    """(path, version) of the highest-priority local template, or (None, None)"""
+    for template_path in LOCAL_TEMPLATE_PATHS:
+        version = _local_template_version(template_path)
+        if version:
+            return template_path, version
+    return None, None
+
+
+def _remote_etag(cached: CachedTemplate) -> Optional[str]:
+    if cached.origin == 's3':
+        s3_service = get_s3_service()
+        info = s3_service.get_file_info(cached.source) if s3_service else {}
+        if not info.get('success'):
+            raise FileNotFoundError(info.get('error', 'S3Service not available'))
+        return info.get('etag') or ''
+    response = requests.head(cached.source, timeout=5, allow_redirects=True)
+    response.raise_for_status()
+    return response.headers.get('ETag', '')
+
+
+def _revalidate(cached: CachedTemplate) -> Optional[CachedTemplate]:
+    """The cache entry if still current (possibly with a new checked_at), else None"""
+    path, version = _first_local_template()
+    if cached.origin == 'local':
+        return cached if (path, version) == (cached.source, cached.version) else None
     
+    # A local template takes priority over a downloaded one
+    if path:
+        return None
+    
+    now = time.time()
+    if now - cached.checked_at < TEMPLATE_REVALIDATE_SECONDS:
+        return cached
+    
+    try:
+        etag = _remote_etag(cached)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not revalidate CRS template {cached.source}: {e}, serving cached copy")
+        return replace(cached, checked_at=now)
+    
+    if not etag or etag != cached.version:
+        return None
+    return replace(cached, checked_at=now)
+
+
+def _build_cached_template(content: bytes, origin: str, source: str, version: str) -> CachedTemplate:
+    # Validation and column detection parse the workbook - done once per template version
+    from .template_populator import validate_template, detect_column_mapping
+    
+    validation = validate_template(BytesIO(content))
+    column_mapping = detect_column_mapping(BytesIO(content)) if validation.get('valid') else {}
+    now = time.time()
+    return CachedTemplate(
+        content=content,
+        origin=origin,
+        source=source,
+        version=version,
+        validation=validation,
+        column_mapping=column_mapping,
+        loaded_at=now,
+        checked_at=now,
+    )
+
+
+def _cache_download(content: bytes, origin: str, source: str, etag: str) -> CachedTemplate:
+    """Cache a downloaded template locally; track the local copy if that worked"""
+    if cache_template_locally(BytesIO(content)):
+        path, version = _first_local_template()
+        if path:
+            return _build_cached_template(content, 'local', path, version)
+    return _build_cached_template(content, origin, source, etag)
+
+
+def _load_template() -> CachedTemplate:
     # Strategy 1: Check local paths first (fastest)
     for template_path in LOCAL_TEMPLATE_PATHS:
         if os.path.exists(template_path):
             logger.info(f"✅ Found local CRS template: {template_path}")
             try:
+                version = _local_template_version(template_path)
                 with open(template_path, 'rb') as f:
-                    template_buffer = BytesIO(f.read())
-                    logger.info(f"✅ Loaded template successfully ({len(template_buffer.getvalue())} bytes)")
-                    return template_buffer
+                    content = f.read()
+                logger.info(f"✅ Loaded template successfully ({len(content)} bytes)")
+                return _build_cached_template(content, 'local', template_path, version)
             except Exception as e:
                 logger.warning(f"⚠️ Failed to read local template {template_path}: {e}")
                 continue
@@ -112,26 +293,26 @@ def get_crs_template() -> BytesIO:
     # Strategy 2: Download from AWS S3 using S3Service
     logger.info(f"⬇️ No local template found, attempting download from AWS S3 bucket...")
     try:
-        template_buffer = download_template_from_s3_service()
+        template_key, content, etag = _download_from_s3_service()
         
         # Cache the downloaded template for future use
-        cache_template_locally(template_buffer)
+        cached = _cache_download(content, 's3', template_key, etag)
         
         logger.info(f"✅ Downloaded and cached template from AWS S3")
-        return template_buffer
+        return cached
         
     except Exception as e:
         logger.warning(f"⚠️ S3Service download failed: {e}, trying direct URL...")
     
     # Strategy 3: Fallback to direct URL download
     try:
-        template_buffer = download_template_from_s3(DEFAULT_TEMPLATE_URL)
+        content, etag = _download_url(DEFAULT_TEMPLATE_URL)
         
         # Cache the downloaded template for future use
-        cache_template_locally(template_buffer)
+        cached = _cache_download(content, 'url', DEFAULT_TEMPLATE_URL, etag)
         
         logger.info(f"✅ Downloaded and cached template from direct URL")
-        return template_buffer
+        return cached
         
     except Exception as e:
         logger.error(f"❌ Failed to download template: {e}")
@@ -160,6 +341,12 @@ def download_template_from_s3(url: str, timeout: int = 30) -> BytesIO:
     Raises:
         requests.RequestException: If download fails
     """
+    content, _ = _download_url(url, timeout)
+    return BytesIO(content)
+
+
+def _download_url(url: str, timeout: int = 30) -> Tuple[bytes, str]:
+    """Download the template from a URL; returns (content, etag)"""
     logger.info(f"Downloading template from: {url}")
     
     response = requests.get(url, timeout=timeout, allow_redirects=True)
@@ -170,10 +357,9 @@ def download_template_from_s3(url: str, timeout: int = 30) -> BytesIO:
     if 'spreadsheet' not in content_type and 'excel' not in content_type:
         logger.warning(f"⚠️ Unexpected content type: {content_type}")
     
-    template_buffer = BytesIO(response.content)
     logger.info(f"Downloaded {len(response.content)} bytes")
     
-    return template_buffer
+    return response.content, response.headers.get('ETag', '')
 
 
 def cache_template_locally(template_buffer: BytesIO) -> bool:
@@ -220,9 +406,22 @@ def get_template_info() -> dict:
         's3_url': DEFAULT_TEMPLATE_URL,
         's3_accessible': False,
         's3_service_available': False,
-        'recommended_action': None
+        'recommended_action': None,
+        'cache': None,
     }
     
+    cached = _cached_template
+    if cached is not None:
+        info['cache'] = {
+            'origin': cached.origin,
+            'source': cached.source,
+            'version': cached.version,
+            'size': len(cached.content),
+            'valid': cached.validation.get('valid', False),
+            'loaded_at': cached.loaded_at,
+            'checked_at': cached.checked_at,
+        }
+    
     # Check local templates
     for path in LOCAL_TEMPLATE_PATHS:
         if os.path.exists(path):
@@ -265,4 +464,4 @@ def get_template_info() -> dict:
 
 
 # Expose main function
-__all__ = ['get_crs_template', 'get_template_info']
+__all__ = ['get_crs_template', 'get_cached_template', 'invalidate_template_cache', 'get_template_info']
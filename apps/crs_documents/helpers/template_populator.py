@@ -7,7 +7,8 @@ Does NOT modify existing code or APIs
 
 import openpyxl
 from openpyxl.styles import Alignment, Font, Border, Side
-from typing import List, BinaryIO
+from openpyxl.styles.cell_style import StyleArray
+from typing import Dict, List, BinaryIO, Tuple
 from io import BytesIO
 from datetime import datetime
 from .comment_extractor import ReviewerComment
@@ -16,7 +17,8 @@ from .comment_extractor import ReviewerComment
 def populate_crs_template(
     template_buffer: BytesIO,
     comments: List[ReviewerComment],
-    document_metadata: dict = None
+    document_metadata: dict = None,
+    column_mapping: dict = None
 ) -> BytesIO:
     """
     Populate CRS template with extracted comments
@@ -31,6 +33,8 @@ def populate_crs_template(
         template_buffer: BytesIO containing original CRS template
         comments: List of ReviewerComment objects
         document_metadata: Optional metadata (project name, doc number, etc.)
+        column_mapping: Optional pre-detected column mapping for this template
+            (e.g. CachedTemplate.column_mapping); detected from the sheet if omitted
     
     Returns:
         BytesIO containing populated template (SAME FORMAT)
@@ -58,10 +62,8 @@ def populate_crs_template(
         # Find the data starting row (usually after header)
         data_start_row = _find_data_start_row(sheet)
         
-        # Populate comments one row at a time
-        for idx, comment in enumerate(comments, start=0):
-            row_num = data_start_row + idx
-            _populate_comment_row(sheet, row_num, comment, idx + 1)
+        # Populate comments - column mapping, merged cells and row styles resolved once
+        CRSSheetPopulator(sheet, data_start_row, len(comments), column_mapping).write_rows(comments)
         
         # Save to BytesIO - PRESERVES ORIGINAL FORMAT
         output_buffer = BytesIO()
@@ -140,66 +142,134 @@ def _find_data_start_row(sheet) -> int:
     return 10
 
 
-def _populate_comment_row(sheet, row_num: int, comment: ReviewerComment, index: int):
+# Returned by a value getter to leave the cell untouched
+SKIP_CELL = object()
+
+# Comment fields in write order: (column mapping key, value getter)
+COMMENT_ROW_FIELDS = (
+    ('no', lambda comment, index: index),
+    ('reviewer', lambda comment, index: comment.reviewer_name),
+    ('comment', lambda comment, index: comment.comment_text),
+    ('discipline', lambda comment, index: comment.discipline),
+    ('type', lambda comment, index: comment.comment_type),
+    ('section', lambda comment, index: comment.section_reference),
+    ('page', lambda comment, index: f"Page {comment.page_number}" if comment.page_number else SKIP_CELL),
+    # Status and response columns - leave empty for user to fill
+    ('status', lambda comment, index: "Open"),
+)
+
+# Columns whose formatting is carried down from the row above
+FORMAT_COLUMNS = range(1, 20)
+
+
+class CRSSheetPopulator:
     """
-    Populate a single row with comment data
-    Determines column positions dynamically
-    Handles merged cells gracefully
+    Writes comment rows into a CRS sheet in a single pass
+    
+    Everything that used to be recomputed per row is resolved once per sheet:
+    the column mapping, the merged-cell anchor of every target cell and the
+    style ids each row inherits from the row above. Populating N comments is
+    O(N + merged ranges) instead of O(N x merged ranges).
     """
-    try:
-        # Typical CRS column structure (flexible detection)
-        column_mapping = _detect_column_mapping(sheet)
-        
-        # Helper to safely set cell value (handles merged cells)
-        def safe_set_value(row, col, value):
+    
+    def __init__(self, sheet, data_start_row: int, row_count: int, column_mapping: dict = None):
+        self.sheet = sheet
+        self.data_start_row = data_start_row
+        self.column_mapping = column_mapping or _detect_column_mapping(sheet)
+        self.fields = [
+            (self.column_mapping[field], get_value)
+            for field, get_value in COMMENT_ROW_FIELDS
+            if field in self.column_mapping
+        ]
+        last_row = data_start_row + row_count - 1
+        self.merged_anchors = _merged_anchor_lookup(
+            sheet, data_start_row, last_row, {col for col, _ in self.fields}
+        )
+        self._row_style_ids = None
+    
+    def write_rows(self, comments: List[ReviewerComment]):
+        for idx, comment in enumerate(comments):
+            row_num = self.data_start_row + idx
             try:
-                cell = sheet.cell(row, col)
-                # Check if it's a merged cell
-                if hasattr(cell, 'coordinate'):
-                    for merged_range in sheet.merged_cells.ranges:
-                        if cell.coordinate in merged_range:
-                            # Get the top-left cell of the merged range
-                            min_col, min_row, max_col, max_row = merged_range.bounds
-                            cell = sheet.cell(min_row, min_col)
-                            break
-                cell.value = value
-            except AttributeError:
-                # MergedCell objects can't be written to directly
-                pass
-            except Exception:
-                pass
-        
-        # Populate each field
-        if 'no' in column_mapping:
-            safe_set_value(row_num, column_mapping['no'], index)
-        
-        if 'reviewer' in column_mapping:
-            safe_set_value(row_num, column_mapping['reviewer'], comment.reviewer_name)
-        
-        if 'comment' in column_mapping:
-            safe_set_value(row_num, column_mapping['comment'], comment.comment_text)
-        
-        if 'discipline' in column_mapping:
-            safe_set_value(row_num, column_mapping['discipline'], comment.discipline)
-        
-        if 'type' in column_mapping:
-            safe_set_value(row_num, column_mapping['type'], comment.comment_type)
-        
-        if 'section' in column_mapping:
-            safe_set_value(row_num, column_mapping['section'], comment.section_reference)
-        
-        if 'page' in column_mapping and comment.page_number:
-            safe_set_value(row_num, column_mapping['page'], f"Page {comment.page_number}")
+                for col, get_value in self.fields:
+                    value = get_value(comment, idx + 1)
+                    if value is not SKIP_CELL:
+                        self._set_value(row_num, col, value)
+                
+                # Copy formatting from row above if exists
+                self._apply_row_formatting(row_num)
+            except Exception as e:
+                print(f"Error populating row {row_num}: {str(e)}")
+    
+    def _set_value(self, row: int, col: int, value):
+        """Set a cell value, writing merged cells through their top-left cell"""
+        try:
+            anchor = self.merged_anchors.get((row, col))
+            cell = self.sheet.cell(*anchor) if anchor else self.sheet.cell(row, col)
+            cell.value = value
+        except AttributeError:
+            # MergedCell objects can't be written to directly
+            pass
+        except Exception:
+            pass
+    
+    def _apply_row_formatting(self, row_num: int):
+        """
+        Give the row the formatting of the row above
         
-        # Status and response columns - leave empty for user to fill
-        if 'status' in column_mapping:
-            safe_set_value(row_num, column_mapping['status'], "Open")
+        The first data row copies from the row above it; every later row
+        would copy the same font/border/alignment/number format again, so
+        their style ids are captured once and assigned directly.
+        """
+        if self._row_style_ids is None:
+            _copy_row_formatting(self.sheet, row_num - 1, row_num)
+            self._row_style_ids = [
+                (col, _formatting_style_ids(self.sheet.cell(row_num, col)))
+                for col in FORMAT_COLUMNS
+            ]
+            return
         
-        # Copy formatting from row above if exists
-        _copy_row_formatting(sheet, row_num - 1, row_num)
+        try:
+            for col, (font_id, border_id, alignment_id, num_fmt_id) in self._row_style_ids:
+                cell = self.sheet.cell(row_num, col)
+                if cell._style is None:
+                    # New cells have no style array until first styled
+                    cell._style = StyleArray()
+                style = cell._style
+                style.fontId = font_id
+                style.borderId = border_id
+                style.alignmentId = alignment_id
+                style.numFmtId = num_fmt_id
+        except Exception:
+            pass  # Silent fail for formatting
+
+
+def _formatting_style_ids(cell) -> Tuple[int, int, int, int]:
+    style = cell._style or StyleArray()
+    return (style.fontId, style.borderId, style.alignmentId, style.numFmtId)
+
+
+def _merged_anchor_lookup(sheet, first_row: int, last_row: int, columns) -> Dict[Tuple[int, int], Tuple[int, int]]:
+    """
+    Map (row, col) -> (anchor row, anchor col) for merged cells in the write area
     
-    except Exception as e:
-        print(f"Error populating row {row_num}: {str(e)}")
+    One pass over the merged ranges, limited to the rows and columns that
+    will actually be written.
+    """
+    lookup = {}
+    if last_row < first_row or not columns:
+        return lookup
+    
+    for merged_range in sheet.merged_cells.ranges:
+        min_col, min_row, max_col, max_row = merged_range.bounds
+        if max_row < first_row or min_row > last_row:
+            continue
+        for col in columns:
+            if min_col <= col <= max_col:
+                for row in range(max(min_row, first_row), min(max_row, last_row) + 1):
+                    # First range listed wins, as in a linear scan
+                    lookup.setdefault((row, col), (min_row, min_col))
+    return lookup
 
 
 def _detect_column_mapping(sheet) -> dict:
@@ -261,6 +331,21 @@ def _detect_column_mapping(sheet) -> dict:
     return mapping
 
 
+def detect_column_mapping(template_buffer: BytesIO) -> dict:
+    """
+    Column mapping of a template's active sheet, for reuse across exports
+    
+    Args:
+        template_buffer: BytesIO containing the CRS template
+    
+    Returns:
+        dict: field name -> column number (see _detect_column_mapping)
+    """
+    template_buffer.seek(0)
+    workbook = openpyxl.load_workbook(template_buffer)
+    return _detect_column_mapping(workbook.active)
+
+
 def _copy_row_formatting(sheet, source_row: int, target_row: int):
     """
     Copy formatting from source row to target row
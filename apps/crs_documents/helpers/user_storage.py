@@ -5,25 +5,37 @@ Manages user-specific folders and file storage in S3
 Structure:
 users/
   {user_id}/
-    profile.json           # User metadata
     uploads/               # Original uploaded files
       {timestamp}_{filename}
     exports/               # Generated exports (xlsx, csv, pdf, docx, json)
       {timestamp}_{format}_{filename}
-    history/               # Activity logs
-      {year}/{month}/
-        activity_{date}.json
+
+Activity history and profile counters live in the database
+(apps.core.storage_models): one INSERT per event and atomic counter updates.
+Upload/export listings page through the StoredFile catalog (apps.core.storage_catalog).
+Older users/{user_id}/profile.json and history/ objects are still read to seed
+the database (see the import_legacy_storage_history command).
 
 Does NOT modify existing code or APIs
 """
 
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from io import BytesIO
-from typing import Optional, Dict, List, Any
+from typing import Any, BinaryIO, Dict, List, Optional, Union
 import logging
 
+from django.db.models import F
+from django.utils import timezone
+
+from apps.core import storage_usage
+from apps.core.boto3_helper import Boto3Helper
+from apps.core.storage_catalog import (
+    ensure_cataloged, file_dict, filter_files, forget_file, paginate_files, record_file
+)
+from apps.core.storage_models import StorageActivity, StoredFile, UserStorageProfile
+
 logger = logging.getLogger(__name__)
 
 # Try to import S3 service from multiple possible locations
@@ -61,11 +73,13 @@ class UserStorageManager:
             self.username = user.username
             self.email = getattr(user, 'email', '')
             self.full_name = f"{getattr(user, 'first_name', '')} {getattr(user, 'last_name', '')}".strip()
+            self.db_user_id = user.pk
         else:
             self.user_id = user_id or 0
             self.username = username or 'anonymous'
             self.email = ''
             self.full_name = ''
+            self.db_user_id = user_id or None
         
         # S3 configuration
         self.s3_service = S3Service() if S3_AVAILABLE else None
@@ -75,17 +89,12 @@ class UserStorageManager:
         self.user_base_path = f"users/{self.user_id}"
         self.uploads_path = f"{self.user_base_path}/uploads"
         self.exports_path = f"{self.user_base_path}/exports"
-        self.history_path = f"{self.user_base_path}/history"
+        self.history_path = f"{self.user_base_path}/history"  # legacy activity JSON
         
     def _get_timestamp(self) -> str:
         """Get formatted timestamp for filenames"""
         return datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    def _get_date_path(self) -> str:
-        """Get year/month path for history organization"""
-        now = datetime.now()
-        return f"{now.year}/{now.month:02d}"
-    
     def ensure_user_folders(self) -> Dict[str, bool]:
         """
         Ensure all user folders exist in S3
@@ -102,7 +111,6 @@ class UserStorageManager:
             f"{self.user_base_path}/",
             f"{self.uploads_path}/",
             f"{self.exports_path}/",
-            f"{self.history_path}/",
         ]
         
         results = {}
@@ -126,61 +134,72 @@ class UserStorageManager:
         return {'success': True, 'folders': results}
     
     def _update_user_profile(self):
-        """Create or update user profile JSON in S3"""
-        if not self.s3_service:
+        """Create the user's storage profile if needed and record activity"""
+        if not self.db_user_id:
             return
         
-        profile_key = f"{self.user_base_path}/profile.json"
-        
-        # Try to get existing profile
-        existing_profile = {}
+        try:
+            updated = UserStorageProfile.objects.filter(pk=self.db_user_id).update(last_activity=timezone.now())
+            if not updated:
+                self._get_profile()
+        except Exception as e:
+            logger.error(f"Failed to update user profile: {e}")
+    
+    def _read_legacy_profile(self) -> Dict:
+        """profile.json written before counters moved to the database"""
+        if not self.s3_service:
+            return {}
         try:
             response = self.s3_service.s3_client.get_object(
                 Bucket=self.bucket_name,
-                Key=profile_key
+                Key=f"{self.user_base_path}/profile.json"
             )
-            existing_profile = json.loads(response['Body'].read().decode('utf-8'))
+            return json.loads(response['Body'].read().decode('utf-8'))
         except Exception:
-            pass  # Profile doesn't exist yet
+            return {}  # Profile doesn't exist
+    
+    def _get_profile(self) -> Optional[UserStorageProfile]:
+        """The user's counters row, created (and seeded from profile.json) on first use"""
+        if not self.db_user_id:
+            return None
         
-        # Update profile
-        profile = {
-            'user_id': self.user_id,
-            'username': self.username,
-            'email': self.email,
-            'full_name': self.full_name,
-            'created_at': existing_profile.get('created_at', datetime.now().isoformat()),
-            'last_activity': datetime.now().isoformat(),
-            'total_uploads': existing_profile.get('total_uploads', 0),
-            'total_exports': existing_profile.get('total_exports', 0),
-        }
+        profile = UserStorageProfile.objects.filter(pk=self.db_user_id).first()
+        if profile is not None:
+            return profile
         
-        try:
-            self.s3_service.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=profile_key,
-                Body=json.dumps(profile, indent=2),
-                ContentType='application/json'
-            )
-        except Exception as e:
-            logger.error(f"Failed to update user profile: {e}")
+        legacy = self._read_legacy_profile()
+        defaults = {
+            'total_uploads': int(legacy.get('total_uploads', 0) or 0),
+            'total_exports': int(legacy.get('total_exports', 0) or 0),
+        }
+        created_at = parse_timestamp(legacy.get('created_at'))
+        if created_at:
+            defaults['created_at'] = created_at
+        profile, _ = UserStorageProfile.objects.get_or_create(user_id=self.db_user_id, defaults=defaults)
+        return profile
     
     def save_upload(
         self,
-        file_content: bytes,
+        file_content: Union[bytes, BinaryIO],
         original_filename: str,
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        expected_sha256: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Save uploaded file to user's uploads folder
         
+        Streamed to S3 (multipart for large files); size and SHA-256 are
+        computed while uploading.
+        
         Args:
-            file_content: File content as bytes
+            file_content: File content as bytes, a binary file object or a
+                Django UploadedFile (TemporaryUploadedFile is read from disk)
             original_filename: Original filename
             metadata: Optional metadata dict
+            expected_sha256: Optional hex SHA-256 the content must match
             
         Returns:
-            Dict with upload result and S3 key
+            Dict with upload result, S3 key, size and sha256
         """
         if not self.s3_service:
             return {'success': False, 'error': 'S3 not available'}
@@ -202,18 +221,27 @@ class UserStorageManager:
             upload_metadata.update({k: str(v) for k, v in metadata.items()})
         
         try:
-            self.s3_service.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_content,
-                Metadata=upload_metadata
+            uploaded = Boto3Helper.upload_stream(
+                file_content,
+                self.bucket_name,
+                s3_key,
+                s3_client=self.s3_service.s3_client,
+                extra_args={'Metadata': upload_metadata},
+                expected_sha256=expected_sha256
+            )
+            
+            record_file(
+                self.bucket_name, s3_key, StoredFile.KIND_UPLOAD, uploaded['size'],
+                user_id=self.db_user_id, sha256=uploaded['sha256']
             )
+            storage_usage.record_upload(self.bucket_name, s3_key, uploaded['size'])
             
             # Log activity
             self.log_activity('upload', {
                 's3_key': s3_key,
                 'filename': original_filename,
-                'size': len(file_content),
+                'size': uploaded['size'],
+                'sha256': uploaded['sha256'],
                 'metadata': metadata
             })
             
@@ -226,7 +254,8 @@ class UserStorageManager:
                 'success': True,
                 's3_key': s3_key,
                 'filename': original_filename,
-                'size': len(file_content),
+                'size': uploaded['size'],
+                'sha256': uploaded['sha256'],
                 'timestamp': timestamp
             }
             
@@ -286,6 +315,9 @@ class UserStorageManager:
                 }
             )
             
+            record_file(self.bucket_name, s3_key, StoredFile.KIND_EXPORT, len(file_content), user_id=self.db_user_id)
+            storage_usage.record_upload(self.bucket_name, s3_key, len(file_content))
+            
             # Log activity
             self.log_activity('export', {
                 's3_key': s3_key,
@@ -315,78 +347,85 @@ class UserStorageManager:
     
     def log_activity(self, action: str, details: Dict[str, Any]):
         """
-        Log user activity to S3 history folder
+        Append an entry to the user's activity log
+        
+        A single INSERT, so concurrent uploads/exports never overwrite each
+        other's entries.
         
         Args:
             action: Action type (upload, export, download, view, etc.)
             details: Activity details
         """
-        if not self.s3_service:
-            return
-        
-        date_path = self._get_date_path()
-        today = datetime.now().strftime("%Y-%m-%d")
-        history_key = f"{self.history_path}/{date_path}/activity_{today}.json"
-        
-        # Get existing activities for today
-        activities = []
-        try:
-            response = self.s3_service.s3_client.get_object(
-                Bucket=self.bucket_name,
-                Key=history_key
-            )
-            activities = json.loads(response['Body'].read().decode('utf-8'))
-        except Exception:
-            pass  # File doesn't exist yet
-        
-        # Add new activity
-        activity_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'action': action,
-            'user_id': self.user_id,
-            'username': self.username,
-            'details': details
-        }
-        activities.append(activity_entry)
-        
         try:
-            self.s3_service.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=history_key,
-                Body=json.dumps(activities, indent=2, default=str),
-                ContentType='application/json'
+            StorageActivity.objects.create(
+                user_id=self.db_user_id,
+                action=action,
+                details=json.loads(json.dumps(details, default=str)),
             )
         except Exception as e:
             logger.error(f"Failed to log activity: {e}")
     
     def _increment_profile_stat(self, stat_name: str):
-        """Increment a stat in user profile"""
-        if not self.s3_service:
+        """Increment a stat in user profile (atomic UPDATE ... SET n = n + 1)"""
+        if not self.db_user_id or stat_name not in UserStorageProfile.COUNTERS:
             return
         
-        profile_key = f"{self.user_base_path}/profile.json"
-        
         try:
-            response = self.s3_service.s3_client.get_object(
-                Bucket=self.bucket_name,
-                Key=profile_key
-            )
-            profile = json.loads(response['Body'].read().decode('utf-8'))
-            profile[stat_name] = profile.get(stat_name, 0) + 1
-            profile['last_activity'] = datetime.now().isoformat()
-            
-            self.s3_service.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=profile_key,
-                Body=json.dumps(profile, indent=2),
-                ContentType='application/json'
-            )
+            changes = {stat_name: F(stat_name) + 1, 'last_activity': timezone.now()}
+            if not UserStorageProfile.objects.filter(pk=self.db_user_id).update(**changes):
+                self._get_profile()
+                UserStorageProfile.objects.filter(pk=self.db_user_id).update(**changes)
         except Exception as e:
             logger.error(f"Failed to increment profile stat: {e}")
     
+    def list_files(
+        self,
+        kind: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        file_format: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        One newest-first page of the user's uploads or exports
+        
+        Args:
+            kind: StoredFile.KIND_UPLOAD or StoredFile.KIND_EXPORT
+            limit: Page size
+            cursor: next_cursor of the previous page
+            file_format: Filter by extension (xlsx, csv, json, pdf, docx)
+            since: Only files modified at or after this time
+            until: Only files modified before this time
+            
+        Returns:
+            Dict with 'files' (file info dicts) and 'next_cursor'
+            
+        Raises:
+            InvalidCursor: If the cursor is malformed
+        """
+        if not self.s3_service:
+            return {'files': [], 'next_cursor': None}
+        
+        prefix = f"{self.uploads_path}/" if kind == StoredFile.KIND_UPLOAD else f"{self.exports_path}/"
+        ensure_cataloged(self.s3_service.s3_client, self.bucket_name, prefix, kind, user_id=self.db_user_id)
+        
+        files = StoredFile.objects.filter(bucket=self.bucket_name, kind=kind)
+        if self.db_user_id:
+            files = files.filter(user_id=self.db_user_id)
+        else:
+            files = files.filter(s3_key__startswith=prefix)
+        files = filter_files(files, file_format=file_format, since=since, until=until)
+        
+        page = paginate_files(files, limit=limit, cursor=cursor)
+        return {
+            'files': [file_dict(stored_file) for stored_file in page['files']],
+            'next_cursor': page['next_cursor'],
+        }
+    
     def get_user_uploads(self, limit: int = 50) -> List[Dict]:
         """
-        Get list of user's uploaded files
+        Get list of user's uploaded files (newest first)
         
         Args:
             limit: Maximum number of files to return
@@ -394,38 +433,15 @@ class UserStorageManager:
         Returns:
             List of file info dicts
         """
-        if not self.s3_service:
-            return []
-        
         try:
-            response = self.s3_service.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=f"{self.uploads_path}/",
-                MaxKeys=limit
-            )
-            
-            files = []
-            for obj in response.get('Contents', []):
-                key = obj['Key']
-                if key.endswith('/'):
-                    continue  # Skip folders
-                
-                files.append({
-                    's3_key': key,
-                    'filename': key.split('/')[-1],
-                    'size': obj['Size'],
-                    'last_modified': obj['LastModified'].isoformat(),
-                })
-            
-            return sorted(files, key=lambda x: x['last_modified'], reverse=True)
-            
+            return self.list_files(StoredFile.KIND_UPLOAD, limit=limit)['files']
         except Exception as e:
             logger.error(f"Failed to list uploads: {e}")
             return []
     
     def get_user_exports(self, limit: int = 50) -> List[Dict]:
         """
-        Get list of user's exported files
+        Get list of user's exported files (newest first)
         
         Args:
             limit: Maximum number of files to return
@@ -433,100 +449,69 @@ class UserStorageManager:
         Returns:
             List of file info dicts
         """
-        if not self.s3_service:
-            return []
-        
         try:
-            response = self.s3_service.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=f"{self.exports_path}/",
-                MaxKeys=limit
-            )
-            
-            files = []
-            for obj in response.get('Contents', []):
-                key = obj['Key']
-                if key.endswith('/'):
-                    continue
-                
-                filename = key.split('/')[-1]
-                format_ext = filename.split('.')[-1] if '.' in filename else 'unknown'
-                
-                files.append({
-                    's3_key': key,
-                    'filename': filename,
-                    'format': format_ext,
-                    'size': obj['Size'],
-                    'last_modified': obj['LastModified'].isoformat(),
-                })
-            
-            return sorted(files, key=lambda x: x['last_modified'], reverse=True)
-            
+            return self.list_files(StoredFile.KIND_EXPORT, limit=limit)['files']
         except Exception as e:
             logger.error(f"Failed to list exports: {e}")
             return []
     
-    def get_activity_history(self, days: int = 30) -> List[Dict]:
+    def get_activity_history(self, days: int = 30, action: Optional[str] = None) -> List[Dict]:
         """
         Get user's activity history
         
         Args:
             days: Number of days of history to retrieve
+            action: Only entries of this action type
             
         Returns:
-            List of activity entries
+            List of activity entries, newest first
         """
-        if not self.s3_service:
+        if not self.db_user_id:
             return []
         
-        all_activities = []
-        
         try:
-            # List all activity files in history folder
-            response = self.s3_service.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=f"{self.history_path}/",
+            activities = StorageActivity.objects.filter(
+                user_id=self.db_user_id,
+                created_at__gte=timezone.now() - timedelta(days=days)
             )
-            
-            for obj in response.get('Contents', []):
-                key = obj['Key']
-                if not key.endswith('.json'):
-                    continue
-                
-                try:
-                    file_response = self.s3_service.s3_client.get_object(
-                        Bucket=self.bucket_name,
-                        Key=key
-                    )
-                    activities = json.loads(file_response['Body'].read().decode('utf-8'))
-                    all_activities.extend(activities)
-                except Exception:
-                    continue
-            
-            # Sort by timestamp descending
-            all_activities.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            
-            return all_activities[:days * 100]  # Approximate limit
+            if action:
+                activities = activities.filter(action=action)
+            
+            return [
+                {
+                    'timestamp': activity.created_at.isoformat(),
+                    'action': activity.action,
+                    'user_id': self.user_id,
+                    'username': self.username,
+                    'details': activity.details,
+                }
+                for activity in activities.order_by('-created_at')[:days * 100]  # Approximate limit
+            ]
             
         except Exception as e:
             logger.error(f"Failed to get activity history: {e}")
             return []
     
     def get_user_profile(self) -> Optional[Dict]:
-        """Get user's profile from S3"""
-        if not self.s3_service:
-            return None
-        
-        profile_key = f"{self.user_base_path}/profile.json"
-        
+        """Get user's storage profile"""
         try:
-            response = self.s3_service.s3_client.get_object(
-                Bucket=self.bucket_name,
-                Key=profile_key
-            )
-            return json.loads(response['Body'].read().decode('utf-8'))
-        except Exception:
+            profile = self._get_profile()
+        except Exception as e:
+            logger.error(f"Failed to load user profile: {e}")
+            return None
+        if profile is None:
             return None
+        
+        return {
+            'user_id': self.user_id,
+            'username': self.username,
+            'email': self.email,
+            'full_name': self.full_name,
+            'created_at': profile.created_at.isoformat(),
+            'last_activity': profile.last_activity.isoformat(),
+            'total_uploads': profile.total_uploads,
+            'total_exports': profile.total_exports,
+        }
     
     def download_file(self, s3_key: str) -> Optional[BytesIO]:
         """
@@ -586,10 +571,13 @@ class UserStorageManager:
             return False
         
         try:
+            size = storage_usage.object_size(self.s3_service.s3_client, self.bucket_name, s3_key)
             self.s3_service.s3_client.delete_object(
                 Bucket=self.bucket_name,
                 Key=s3_key
             )
+            forget_file(self.bucket_name, s3_key)
+            storage_usage.record_delete(self.bucket_name, s3_key, size)
             
             # Log delete activity
             self.log_activity('delete', {
@@ -681,6 +669,17 @@ class UserStorageManager:
             return None
 
 
+def parse_timestamp(value) -> Optional[datetime]:
+    """Aware datetime from an ISO timestamp written by datetime.now().isoformat()"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
 def get_user_storage(user) -> UserStorageManager:
     """
     Factory function to get UserStorageManager for a user
@@ -25,7 +25,9 @@ import json
 import os
 from datetime import datetime, timedelta
 
-from apps.crs_documents.helpers.user_storage import get_user_storage, UserStorageManager
+from apps.core.storage_catalog import InvalidCursor
+from apps.core.storage_models import StoredFile
+from apps.crs_documents.helpers.user_storage import get_user_storage, UserStorageManager, parse_timestamp
 
 logger = logging.getLogger(__name__)
 
@@ -86,26 +88,66 @@ def user_history_overview(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _list_user_files(request, kind: str, result_key: str):
+    """
+    Paginated upload/export listing shared by user_uploads and user_exports
+    
+    Query params:
+        - limit: Page size (default 50)
+        - cursor: next_cursor from the previous page
+        - file_format: Filter by format (xlsx, csv, json, pdf, docx); `format`
+          is also accepted but DRF reserves it for renderer selection
+        - since / until: ISO date or datetime bounds on last_modified
+    """
+    limit = int(request.query_params.get('limit', 50))
+    bounds = {}
+    for param in ('since', 'until'):
+        value = request.query_params.get(param)
+        if value:
+            bounds[param] = parse_timestamp(value)
+            if bounds[param] is None:
+                return Response({
+                    'success': False,
+                    'error': f'Invalid {param} - expected an ISO date or datetime'
+                }, status=status.HTTP_400_BAD_REQUEST)
+    
+    storage = get_user_storage(request.user)
+    try:
+        page = storage.list_files(
+            kind,
+            limit=limit,
+            cursor=request.query_params.get('cursor') or None,
+            file_format=request.query_params.get('file_format') or request.query_params.get('format') or None,
+            **bounds
+        )
+    except InvalidCursor:
+        return Response({
+            'success': False,
+            'error': 'Invalid cursor'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'success': True,
+        'count': len(page['files']),
+        result_key: page['files'],
+        'next_cursor': page['next_cursor']
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_uploads(request):
     """
-    Get list of user's uploaded files
+    Get a page of the user's uploaded files (newest first)
     
     Query params:
         - limit: Maximum number of files (default 50)
+        - cursor: next_cursor from the previous page
+        - file_format: Filter by file extension
+        - since / until: ISO date or datetime bounds
     """
     try:
-        limit = int(request.query_params.get('limit', 50))
-        storage = get_user_storage(request.user)
-        
-        uploads = storage.get_user_uploads(limit=limit)
-        
-        return Response({
-            'success': True,
-            'count': len(uploads),
-            'uploads': uploads
-        })
+        return _list_user_files(request, StoredFile.KIND_UPLOAD, 'uploads')
         
     except Exception as e:
         logger.error(f"Error getting user uploads: {e}")
@@ -119,28 +161,16 @@ def user_uploads(request):
 @permission_classes([IsAuthenticated])
 def user_exports(request):
     """
-    Get list of user's exported files
+    Get a page of the user's exported files (newest first)
     
     Query params:
         - limit: Maximum number of files (default 50)
-        - format: Filter by format (xlsx, csv, json, pdf, docx)
+        - cursor: next_cursor from the previous page
+        - file_format: Filter by format (xlsx, csv, json, pdf, docx)
+        - since / until: ISO date or datetime bounds
     """
     try:
-        limit = int(request.query_params.get('limit', 50))
-        format_filter = request.query_params.get('format', None)
-        
-        storage = get_user_storage(request.user)
-        exports = storage.get_user_exports(limit=limit)
-        
-        # Apply format filter if specified
-        if format_filter:
-            exports = [e for e in exports if e.get('format') == format_filter]
-        
-        return Response({
-            'success': True,
-            'count': len(exports),
-            'exports': exports
-        })
+        return _list_user_files(request, StoredFile.KIND_EXPORT, 'exports')
         
     except Exception as e:
         logger.error(f"Error getting user exports: {e}")
@@ -200,11 +230,7 @@ def user_activity(request):
         action_filter = request.query_params.get('action', None)
         
         storage = get_user_storage(request.user)
-        activities = storage.get_activity_history(days=days)
-        
-        # Apply action filter if specified
-        if action_filter:
-            activities = [a for a in activities if a.get('action') == action_filter]
+        activities = storage.get_activity_history(days=days, action=action_filter)
         
         return Response({
             'success': True,
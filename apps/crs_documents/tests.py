@@ -0,0 +1,80 @@
+"""
+Tests for the CRS document helpers
+"""
+import random
+import string
+
+from django.test import SimpleTestCase
+
+from apps.crs_documents.helpers.near_duplicates import NearDuplicateIndex
+
+
+def baseline_is_duplicate(text: str, seen_texts) -> bool:
+    """The comparison _deduplicate_comments used before the index: 90% positional match on 150 chars"""
+    prefix = text[:150]
+    for seen_text in seen_texts:
+        seen_prefix = seen_text[:150]
+        min_len = min(len(prefix), len(seen_prefix))
+        max_len = max(len(prefix), len(seen_prefix))
+        matches = sum(1 for i in range(min_len) if prefix[i] == seen_prefix[i])
+        if matches / max_len >= 0.90:
+            return True
+    return False
+
+
+class NearDuplicateIndexTests(SimpleTestCase):
+    """NearDuplicateIndex must catch every duplicate the original comparator caught"""
+
+    alphabet = string.ascii_lowercase + ' '
+
+    def _mutate(self, rng, text, substitutions):
+        chars = list(text)
+        for pos in rng.sample(range(min(len(text), 150)), substitutions):
+            chars[pos] = rng.choice([c for c in self.alphabet if c != text[pos]])
+        return ''.join(chars)
+
+    def test_recall_matches_baseline_for_substitutions(self):
+        rng = random.Random(7)
+        for substitutions in (6, 8, 12, 15):
+            missed = 0
+            for _ in range(300):
+                original = ''.join(rng.choice(self.alphabet) for _ in range(rng.randint(120, 200)))
+                variant = self._mutate(rng, original, substitutions)
+                index = NearDuplicateIndex()
+                index.add_if_new(original)
+                if baseline_is_duplicate(variant, [original]) and index.add_if_new(variant):
+                    missed += 1
+            self.assertEqual(missed, 0, f"{missed} baseline duplicates missed with {substitutions} substitutions")
+
+    def test_recall_matches_baseline_for_different_lengths(self):
+        rng = random.Random(11)
+        for _ in range(500):
+            original = ''.join(rng.choice(self.alphabet) for _ in range(rng.randint(5, 160)))
+            variant = original[:max(5, len(original) - rng.randint(0, 3))] + 'x' * rng.randint(0, 3)
+            if len(variant) > 10:
+                variant = self._mutate(rng, variant, rng.randint(0, len(variant) // 10))
+            index = NearDuplicateIndex()
+            index.add_if_new(original)
+            if baseline_is_duplicate(variant, [original]):
+                self.assertFalse(index.add_if_new(variant), f"missed {variant!r} ~ {original!r}")
+
+    def test_corpus_keeps_no_baseline_duplicates(self):
+        rng = random.Random(3)
+        words = 'pressure valve line pump tag missing relief flow control rating vent drain note'.split()
+        texts = []
+        for _ in range(300):
+            text = ' '.join(rng.choice(words) for _ in range(rng.randint(8, 30)))
+            texts.append(text)
+            if rng.random() < 0.5:
+                texts.append(self._mutate(rng, text, rng.randint(1, len(text[:150]) // 10)))
+
+        index = NearDuplicateIndex()
+        kept = [text for text in texts if index.add_if_new(text)]
+        for position, text in enumerate(kept):
+            self.assertFalse(baseline_is_duplicate(text, kept[:position]))
+
+    def test_distinct_texts_are_kept(self):
+        index = NearDuplicateIndex()
+        self.assertTrue(index.add_if_new('pipe line 6"-P-1001 missing insulation code'))
+        self.assertTrue(index.add_if_new('relief valve PSV-201 set pressure not shown'))
+        self.assertFalse(index.add_if_new('pipe line 6"-P-1001 missing insulation code'))
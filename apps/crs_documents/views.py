@@ -18,7 +18,7 @@ from .serializers import CRSDocumentSerializer, CRSDocumentVersionSerializer
 try:
     from .helpers.comment_extractor import extract_reviewer_comments, get_comment_statistics
     from .helpers.template_populator import populate_crs_template, validate_template
-    from .helpers.template_manager import get_crs_template, get_template_info
+    from .helpers.template_manager import get_crs_template, get_cached_template, get_template_info
     HELPERS_AVAILABLE = True
 except ImportError:
     HELPERS_AVAILABLE = False
@@ -139,29 +139,32 @@ class CRSDocumentViewSet(viewsets.ModelViewSet):
             
             # Get template file or use smart template manager
             template_file = request.FILES.get('template_file')
+            column_mapping = None
             if not template_file:
-                # Use smart template manager (checks local + AWS S3)
+                # Use smart template manager (checks local + AWS S3, cached and pre-validated)
                 try:
-                    template_buffer = get_crs_template()
+                    cached_template = get_cached_template()
                 except FileNotFoundError as e:
                     return Response({
                         'error': 'CRS template not available',
                         'details': str(e),
                         'suggestion': 'Upload template_file in request or ensure local/S3 template is available'
                     }, status=status.HTTP_400_BAD_REQUEST)
+                template_buffer = BytesIO(cached_template.content)
+                validation = cached_template.validation
+                column_mapping = cached_template.column_mapping
             else:
                 template_buffer = BytesIO(template_file.read())
+                # Validate template
+                validation = validate_template(BytesIO(template_buffer.getvalue()))
             
-            # Validate template
-            validation = validate_template(BytesIO(template_buffer.getvalue()))
             if not validation.get('valid'):
                 return Response({
                     'error': f"Invalid template: {validation.get('error')}"
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Step 1: Extract comments from PDF
-            pdf_buffer = BytesIO(pdf_file.read())
-            comments = extract_reviewer_comments(pdf_buffer)
+            # Step 1: Extract comments from PDF (read from the upload, not copied into memory)
+            comments = extract_reviewer_comments(pdf_file)
             
             if not comments:
                 return Response({
@@ -182,7 +185,8 @@ class CRSDocumentViewSet(viewsets.ModelViewSet):
             populated_buffer = populate_crs_template(
                 BytesIO(template_buffer.getvalue()),
                 comments,
-                metadata
+                metadata,
+                column_mapping=column_mapping
             )
             
             # Step 4: Generate statistics
@@ -231,8 +235,7 @@ class CRSDocumentViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Extract comments
-            pdf_buffer = BytesIO(pdf_file.read())
-            comments = extract_reviewer_comments(pdf_buffer)
+            comments = extract_reviewer_comments(pdf_file)
             
             # Get statistics
             stats = get_comment_statistics(comments)
@@ -375,8 +378,7 @@ class CRSDocumentViewSet(viewsets.ModelViewSet):
             # Process based on file type
             if is_pdf:
                 # Extract comments from PDF
-                pdf_buffer = BytesIO(uploaded_file.read())
-                comments = extract_reviewer_comments(pdf_buffer)
+                comments = extract_reviewer_comments(uploaded_file)
                 
                 if not comments:
                     return Response({
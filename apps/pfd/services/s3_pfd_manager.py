@@ -9,14 +9,18 @@ rejlers-edrs-project/
     PID/         - Converted P&ID files
 """
 
-import boto3
 import os
 import json
 from datetime import datetime
 from io import BytesIO
-from typing import List, Dict, Optional, Tuple
+from typing import BinaryIO, List, Dict, Optional, Tuple, Union
 import logging
 
+from apps.core import storage_usage
+from apps.core.boto3_helper import Boto3Helper
+from apps.core.storage_catalog import ensure_cataloged, filter_files, paginate_files, record_file
+from apps.core.storage_models import StoredFile
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,19 +39,92 @@ class S3PFDManager:
         self.pfd_folder = f'{self.base_path}/PFD'
         self.pid_folder = f'{self.base_path}/PID'
         
-        # Initialize S3 client
-        self.s3_client = boto3.client(
-            's3',
-            region_name=self.region,
-            aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY')
+        # Shared pooled client for the PFD bucket region
+        self.s3_client = Boto3Helper.get_s3_client(region=self.region)
+        
+        logger.debug(f"S3PFDManager initialized: bucket={self.bucket_name}, region={self.region}")
+    
+    def _folder_for(self, kind: str) -> str:
+        """S3 folder holding files of a catalog kind"""
+        return self.pfd_folder if kind == StoredFile.KIND_PFD else self.pid_folder
+    
+    def _cataloged_files(self, kind: str):
+        """Catalog rows of a folder, reconciled from S3 on first use"""
+        folder = self._folder_for(kind)
+        ensure_cataloged(self.s3_client, self.bucket_name, f"{folder}/", kind)
+        return StoredFile.objects.filter(bucket=self.bucket_name, kind=kind, s3_key__startswith=f"{folder}/")
+    
+    def _cataloged_keys(self, keys: List[str]) -> set:
+        """Subset of keys present in the catalog (one query instead of a HEAD per key)"""
+        return set(
+            StoredFile.objects.filter(bucket=self.bucket_name, s3_key__in=keys).values_list('s3_key', flat=True)
         )
+    
+    def list_files_page(
+        self,
+        kind: str,
+        prefix: str = '',
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        file_format: Optional[str] = None
+    ) -> Dict:
+        """
+        One newest-first page of PFD or P&ID files
         
-        logger.info(f"S3PFDManager initialized: bucket={self.bucket_name}, region={self.region}")
+        Args:
+            kind: StoredFile.KIND_PFD or StoredFile.KIND_PID
+            prefix: Optional filename prefix filter
+            limit: Page size
+            cursor: next_cursor of the previous page
+            file_format: Optional extension filter
+            
+        Returns:
+            Dict with 'files' (file metadata dicts) and 'next_cursor'
+            
+        Raises:
+            InvalidCursor: If the cursor is malformed
+        """
+        folder = self._folder_for(kind)
+        files = filter_files(self._cataloged_files(kind), file_format=file_format)
+        if prefix:
+            files = files.filter(s3_key__startswith=f"{folder}/{prefix}")
+        page = paginate_files(files, limit=limit, cursor=cursor)
+        
+        # PFD/P&ID pairing reads the other folder's catalog
+        other_kind = StoredFile.KIND_PID if kind == StoredFile.KIND_PFD else StoredFile.KIND_PFD
+        ensure_cataloged(self.s3_client, self.bucket_name, f"{self._folder_for(other_kind)}/", other_kind)
+        
+        results = []
+        if kind == StoredFile.KIND_PFD:
+            pid_keys = {row.s3_key: self._get_pid_key_for_pfd(row.s3_key) for row in page['files']}
+            existing = self._cataloged_keys(list(pid_keys.values()))
+        else:
+            candidates = {row.s3_key: self._pfd_key_candidates(row.s3_key) for row in page['files']}
+            existing = self._cataloged_keys([key for keys in candidates.values() for key in keys])
+        
+        for row in page['files']:
+            file_info = {
+                's3_key': row.s3_key,
+                'filename': row.s3_key.replace(f"{folder}/", ''),
+                'size': row.size,
+                'last_modified': row.last_modified.isoformat(),
+                'extension': os.path.splitext(row.filename)[1].lower()
+            }
+            if kind == StoredFile.KIND_PFD:
+                pid_key = pid_keys[row.s3_key]
+                file_info['has_pid_conversion'] = pid_key in existing
+                file_info['pid_key'] = pid_key if pid_key in existing else None
+            else:
+                pfd_key = next((key for key in candidates[row.s3_key] if key in existing), None)
+                file_info['has_pfd_source'] = pfd_key is not None
+                file_info['pfd_key'] = pfd_key
+            results.append(file_info)
+        
+        return {'files': results, 'next_cursor': page['next_cursor']}
     
     def list_pfd_files(self, prefix: str = '', limit: int = 100) -> List[Dict]:
         """
-        List all PFD files from the PFD folder
+        List PFD files from the PFD folder (newest first)
         
         Args:
             prefix: Optional prefix to filter files
@@ -57,43 +134,7 @@ class S3PFDManager:
             List of file metadata dicts
         """
         try:
-            search_prefix = f"{self.pfd_folder}/"
-            if prefix:
-                search_prefix = f"{self.pfd_folder}/{prefix}"
-            
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=search_prefix,
-                MaxKeys=limit
-            )
-            
-            files = []
-            for obj in response.get('Contents', []):
-                key = obj['Key']
-                
-                # Skip if it's the folder itself
-                if key.endswith('/'):
-                    continue
-                
-                # Extract filename
-                filename = key.replace(f"{self.pfd_folder}/", '')
-                
-                # Check if corresponding P&ID exists
-                pid_key = self._get_pid_key_for_pfd(key)
-                has_pid_conversion = self._check_file_exists(pid_key)
-                
-                file_info = {
-                    's3_key': key,
-                    'filename': filename,
-                    'size': obj['Size'],
-                    'last_modified': obj['LastModified'].isoformat(),
-                    'has_pid_conversion': has_pid_conversion,
-                    'pid_key': pid_key if has_pid_conversion else None,
-                    'extension': os.path.splitext(filename)[1].lower()
-                }
-                
-                files.append(file_info)
-            
+            files = self.list_files_page(StoredFile.KIND_PFD, prefix=prefix, limit=limit)['files']
             logger.info(f"Found {len(files)} PFD files")
             return files
             
@@ -103,7 +144,7 @@ class S3PFDManager:
     
     def list_pid_files(self, prefix: str = '', limit: int = 100) -> List[Dict]:
         """
-        List all P&ID files from the PID folder
+        List P&ID files from the PID folder (newest first)
         
         Args:
             prefix: Optional prefix to filter files
@@ -113,43 +154,7 @@ class S3PFDManager:
             List of file metadata dicts
         """
         try:
-            search_prefix = f"{self.pid_folder}/"
-            if prefix:
-                search_prefix = f"{self.pid_folder}/{prefix}"
-            
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=search_prefix,
-                MaxKeys=limit
-            )
-            
-            files = []
-            for obj in response.get('Contents', []):
-                key = obj['Key']
-                
-                # Skip if it's the folder itself
-                if key.endswith('/'):
-                    continue
-                
-                # Extract filename
-                filename = key.replace(f"{self.pid_folder}/", '')
-                
-                # Try to find corresponding PFD
-                pfd_key = self._get_pfd_key_for_pid(key)
-                has_pfd_source = self._check_file_exists(pfd_key)
-                
-                file_info = {
-                    's3_key': key,
-                    'filename': filename,
-                    'size': obj['Size'],
-                    'last_modified': obj['LastModified'].isoformat(),
-                    'has_pfd_source': has_pfd_source,
-                    'pfd_key': pfd_key if has_pfd_source else None,
-                    'extension': os.path.splitext(filename)[1].lower()
-                }
-                
-                files.append(file_info)
-            
+            files = self.list_files_page(StoredFile.KIND_PID, prefix=prefix, limit=limit)['files']
             logger.info(f"Found {len(files)} P&ID files")
             return files
             
@@ -209,14 +214,25 @@ class S3PFDManager:
             logger.error(f"Error retrieving P&ID file {s3_key}: {e}")
             return None
     
-    def upload_pfd_file(self, file_content: bytes, filename: str, metadata: Dict = None) -> Dict:
+    def upload_pfd_file(
+        self,
+        file_content: Union[bytes, BinaryIO],
+        filename: str,
+        metadata: Dict = None,
+        expected_sha256: Optional[str] = None
+    ) -> Dict:
         """
         Upload a new PFD file to the PFD folder
         
+        Streamed to S3 (multipart for large drawings); size and SHA-256 are
+        computed while uploading.
+        
         Args:
-            file_content: File content as bytes
+            file_content: File content as bytes, a binary file object or a
+                Django UploadedFile (TemporaryUploadedFile is read from disk)
             filename: Filename to use
             metadata: Optional metadata dict
+            expected_sha256: Optional hex SHA-256 the content must match
             
         Returns:
             Upload result dict
@@ -235,21 +251,29 @@ class S3PFDManager:
             # Determine content type
             content_type = self._get_content_type(filename)
             
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_content,
-                ContentType=content_type,
-                Metadata=s3_metadata
+            # Uploading under an existing name replaces that file
+            previous_size = storage_usage.object_size(self.s3_client, self.bucket_name, s3_key)
+            
+            uploaded = Boto3Helper.upload_stream(
+                file_content,
+                self.bucket_name,
+                s3_key,
+                s3_client=self.s3_client,
+                extra_args={'ContentType': content_type, 'Metadata': s3_metadata},
+                expected_sha256=expected_sha256
             )
             
+            record_file(self.bucket_name, s3_key, StoredFile.KIND_PFD, uploaded['size'], sha256=uploaded['sha256'])
+            storage_usage.record_upload(self.bucket_name, s3_key, uploaded['size'], previous_size)
+            
             logger.info(f"Uploaded PFD file: {s3_key}")
             
             return {
                 'success': True,
                 's3_key': s3_key,
                 'filename': filename,
-                'size': len(file_content),
+                'size': uploaded['size'],
+                'sha256': uploaded['sha256'],
                 'url': self.get_presigned_url(s3_key)
             }
             
@@ -307,6 +331,9 @@ class S3PFDManager:
                 Metadata=s3_metadata
             )
             
+            record_file(self.bucket_name, pid_key, StoredFile.KIND_PID, len(pid_content))
+            storage_usage.record_upload(self.bucket_name, pid_key, len(pid_content))
+            
             logger.info(f"Saved P&ID conversion: {pid_key}")
             
             return {
@@ -405,9 +432,9 @@ class S3PFDManager:
         # This will return the most recent version
         return f"{self.pid_folder}/{base_name}_PID.pdf"
     
-    def _get_pfd_key_for_pid(self, pid_key: str) -> str:
+    def _pfd_key_candidates(self, pid_key: str) -> List[str]:
         """
-        Get the source PFD key for a P&ID file
+        Possible source PFD keys for a P&ID file, most likely first
         Reverses the naming pattern
         """
         pid_filename = pid_key.replace(f"{self.pid_folder}/", '')
@@ -415,14 +442,21 @@ class S3PFDManager:
         # Remove _PID_timestamp suffix and extension
         base_name = pid_filename.split('_PID_')[0] if '_PID_' in pid_filename else pid_filename.split('_PID.')[0]
         
-        # Try common PFD extensions
-        for ext in ['.pdf', '.dwg', '.dxf', '.png', '.jpg']:
-            pfd_key = f"{self.pfd_folder}/{base_name}{ext}"
+        # Common PFD extensions
+        return [f"{self.pfd_folder}/{base_name}{ext}" for ext in ['.pdf', '.dwg', '.dxf', '.png', '.jpg']]
+    
+    def _get_pfd_key_for_pid(self, pid_key: str) -> str:
+        """
+        Get the source PFD key for a P&ID file
+        Reverses the naming pattern
+        """
+        candidates = self._pfd_key_candidates(pid_key)
+        for pfd_key in candidates:
             if self._check_file_exists(pfd_key):
                 return pfd_key
         
         # Return default if not found
-        return f"{self.pfd_folder}/{base_name}.pdf"
+        return candidates[0]
     
     def _get_content_type(self, filename: str) -> str:
         """Determine content type from filename"""
@@ -448,8 +482,8 @@ class S3PFDManager:
             'base_path': self.base_path,
             'pfd_folder': self.pfd_folder,
             'pid_folder': self.pid_folder,
-            'pfd_count': len(self.list_pfd_files()),
-            'pid_count': len(self.list_pid_files())
+            'pfd_count': self._cataloged_files(StoredFile.KIND_PFD).count(),
+            'pid_count': self._cataloged_files(StoredFile.KIND_PID).count()
         }
 
 
@@ -10,6 +10,8 @@ from rest_framework.response import Response
 from django.http import HttpResponse
 import logging
 
+from apps.core.storage_catalog import InvalidCursor
+from apps.core.storage_models import StoredFile
 from ..services.s3_pfd_manager import get_s3_pfd_manager
 
 logger = logging.getLogger(__name__)
@@ -25,21 +27,35 @@ def list_s3_pfd_files(request):
     Query params:
         - prefix: Filter by filename prefix
         - limit: Max files to return (default 100)
+        - cursor: next_cursor from the previous page
+        - file_format: Filter by file extension
     """
     try:
         prefix = request.query_params.get('prefix', '')
         limit = int(request.query_params.get('limit', 100))
         
         manager = get_s3_pfd_manager()
-        files = manager.list_pfd_files(prefix=prefix, limit=limit)
+        page = manager.list_files_page(
+            StoredFile.KIND_PFD,
+            prefix=prefix,
+            limit=limit,
+            cursor=request.query_params.get('cursor') or None,
+            file_format=request.query_params.get('file_format') or request.query_params.get('format') or None
+        )
         
         return Response({
             'success': True,
-            'count': len(files),
-            'files': files,
+            'count': len(page['files']),
+            'files': page['files'],
+            'next_cursor': page['next_cursor'],
             'bucket_info': manager.get_bucket_structure_info()
         })
         
+    except InvalidCursor:
+        return Response({
+            'success': False,
+            'error': 'Invalid cursor'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error listing S3 PFD files: {e}")
         return Response({
@@ -58,21 +74,35 @@ def list_s3_pid_files(request):
     Query params:
         - prefix: Filter by filename prefix
         - limit: Max files to return (default 100)
+        - cursor: next_cursor from the previous page
+        - file_format: Filter by file extension
     """
     try:
         prefix = request.query_params.get('prefix', '')
         limit = int(request.query_params.get('limit', 100))
         
         manager = get_s3_pfd_manager()
-        files = manager.list_pid_files(prefix=prefix, limit=limit)
+        page = manager.list_files_page(
+            StoredFile.KIND_PID,
+            prefix=prefix,
+            limit=limit,
+            cursor=request.query_params.get('cursor') or None,
+            file_format=request.query_params.get('file_format') or request.query_params.get('format') or None
+        )
         
         return Response({
             'success': True,
-            'count': len(files),
-            'files': files,
+            'count': len(page['files']),
+            'files': page['files'],
+            'next_cursor': page['next_cursor'],
             'bucket_info': manager.get_bucket_structure_info()
         })
         
+    except InvalidCursor:
+        return Response({
+            'success': False,
+            'error': 'Invalid cursor'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error listing S3 P&ID files: {e}")
         return Response({
@@ -147,6 +177,7 @@ def upload_pfd_to_s3(request):
         - file: File upload
         - filename: Optional custom filename
         - metadata: Optional JSON metadata
+        - sha256: Optional hex SHA-256 of the file, verified after upload
     """
     try:
         uploaded_file = request.FILES.get('file')
@@ -166,12 +197,13 @@ def upload_pfd_to_s3(request):
         metadata['uploaded_by'] = request.user.username
         metadata['user_id'] = request.user.id
         
-        # Upload to S3
+        # Upload to S3 (streamed from the uploaded file, not read into memory)
         manager = get_s3_pfd_manager()
         result = manager.upload_pfd_file(
-            file_content=uploaded_file.read(),
+            file_content=uploaded_file,
             filename=filename,
-            metadata=metadata
+            metadata=metadata,
+            expected_sha256=request.POST.get('sha256') or None
         )
         
         if result['success']:
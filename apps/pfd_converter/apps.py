@@ -5,3 +5,7 @@ class PfdConverterConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.pfd_converter'
     verbose_name = 'PFD to P&ID Converter'
+    
+    def ready(self):
+        """Import signals when app is ready"""
+        import apps.pfd_converter.signals
@@ -9,7 +9,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Avg
+from apps.users.history_stats import get_user_history_stats
 from .models import PFDDocument, PIDConversion
 from django.http import FileResponse, HttpResponse
 
@@ -27,13 +27,11 @@ def pfd_history_overview(request):
     try:
         user = request.user
         
-        # Get user statistics
+        # User statistics - one row, maintained by signals
+        stats = get_user_history_stats(user)
         pfd_docs = PFDDocument.objects.filter(uploaded_by=user)
         conversions = PIDConversion.objects.filter(pfd_document__uploaded_by=user)
         
-        completed_conversions = conversions.filter(status='completed')
-        avg_confidence = completed_conversions.aggregate(Avg('confidence_score'))['confidence_score__avg'] or 0
-        
         # Recent uploads
         recent_uploads = pfd_docs.order_by('-created_at')[:10].values(
             'id',
@@ -67,10 +65,10 @@ def pfd_history_overview(request):
                 'profile': {
                     'username': user.get_full_name() or user.email or user.username,
                     'email': user.email,
-                    'total_uploads': pfd_docs.count(),
-                    'total_conversions': conversions.count(),
-                    'completed_conversions': completed_conversions.count(),
-                    'avg_confidence_score': round(avg_confidence, 1)
+                    'total_uploads': stats.pfd_uploads,
+                    'total_conversions': stats.pfd_conversions,
+                    'completed_conversions': stats.pfd_completed_conversions,
+                    'avg_confidence_score': round(stats.avg_confidence_score, 1)
                 },
                 'recent_uploads': list(recent_uploads),
                 'recent_conversions': recent_conversions
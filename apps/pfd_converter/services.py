@@ -21,6 +21,7 @@ from reportlab.lib import colors
 from reportlab.platypus import Table, TableStyle
 import os
 from django.conf import settings
+from apps.core.llm_cache import LLMResultCache, hash_file, hash_text
 
 logger = logging.getLogger(__name__)
 
@@ -88,11 +89,15 @@ class PFDToPIDConverter:
     - 3-Step Process Engineering Workflow
     """
     
+    EXTRACTION_SYSTEM_PROMPT = "You are an expert process engineer specializing in oil & gas process design. You analyze Process Flow Diagrams (PFDs) and extract detailed process information for P&ID generation."
+    
+    result_cache = LLMResultCache('pfd_extraction')
+    
     def __init__(self, project_id=None):
         self.model = config('OPENAI_MODEL', default='gpt-4o')
         self.project_id = project_id
         
-    def extract_pfd_data(self, image_file, project_id=None):
+    def extract_pfd_data(self, image_file, project_id=None, use_cache=True):
         """
         Extract process flow information from PFD using AI vision
         Implements Step 1 of PFD to P&ID conversion workflow
@@ -100,14 +105,12 @@ class PFDToPIDConverter:
         Args:
             image_file: File object containing PFD image
             project_id: Optional project ID for project-specific design basis
+            use_cache: Serve/store results in the content-addressed result cache (False = bypass)
             
         Returns:
             dict: Extracted process flow data with 3-step structure
         """
         try:
-            # Convert image to base64
-            image_data = self._prepare_image(image_file)
-            
             # Use domain knowledge enhanced prompt for 3-step process
             if USE_DOMAIN_KNOWLEDGE:
                 prompt = get_domain_enhanced_extraction_prompt(project_id)
@@ -119,13 +122,28 @@ class PFDToPIDConverter:
                 prompt = self._get_extraction_prompt()
                 logger.info("Using default extraction prompt")
             
+            # Same file + model + prompt => same extraction; skip the GPT-4o call
+            cache_key = self.result_cache.make_key(
+                hash_file(image_file),
+                self.model,
+                hash_text(self.EXTRACTION_SYSTEM_PROMPT, prompt)
+            )
+            if use_cache:
+                cached_data = self.result_cache.get(cache_key)
+                if cached_data is not None:
+                    logger.info("✅ Serving PFD extraction from result cache")
+                    return cached_data
+            
+            # Convert image to base64
+            image_data = self._prepare_image(image_file)
+            
             # Call OpenAI API
             response = openai.chat.completions.create(
                 model=self.model,
                 messages=[
                     {
                         "role": "system",
-                        "content": "You are an expert process engineer specializing in oil & gas process design. You analyze Process Flow Diagrams (PFDs) and extract detailed process information for P&ID generation."
+                        "content": self.EXTRACTION_SYSTEM_PROMPT
                     },
                     {
                         "role": "user",
@@ -147,6 +165,8 @@ class PFDToPIDConverter:
             # Parse response
             content = response.choices[0].message.content
             extracted_data = self._parse_extraction_response(content)
+            if 'raw_content' not in extracted_data:  # Don't pin unparseable responses
+                self.result_cache.set(cache_key, extracted_data)
             
             logger.info(f"Successfully extracted PFD data: {len(extracted_data.get('equipment', []))} equipment items")
             return extracted_data
@@ -0,0 +1,65 @@
+"""
+PFD Converter Signals
+Keep the per-user history statistics (apps.users.UserHistoryStats) current
+"""
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from apps.users.history_stats import adjust_user_history_stats
+from .models import PFDDocument, PIDConversion
+
+
+def _document_owner_id(document_id):
+    return PFDDocument.objects.filter(pk=document_id).values_list('uploaded_by_id', flat=True).first()
+
+
+def _conversion_counts(status, confidence_score):
+    """What one conversion contributes to the completed/confidence counters"""
+    if status != 'completed':
+        return (0, 0, 0)
+    if confidence_score is None:
+        return (1, 0, 0)
+    return (1, 1, confidence_score)
+
+
+def _counter_deltas(new, old):
+    return {
+        'pfd_completed_conversions': new[0] - old[0],
+        'pfd_confidence_count': new[1] - old[1],
+        'pfd_confidence_total': new[2] - old[2],
+    }
+
+
+@receiver(post_save, sender=PFDDocument)
+def count_pfd_upload(sender, instance, created, **kwargs):
+    if created:
+        adjust_user_history_stats(instance.uploaded_by_id, pfd_uploads=1)
+
+
+@receiver(post_delete, sender=PFDDocument)
+def uncount_pfd_upload(sender, instance, **kwargs):
+    adjust_user_history_stats(instance.uploaded_by_id, pfd_uploads=-1)
+
+
+@receiver(post_init, sender=PIDConversion)
+def remember_conversion_counts(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not loaded
+    instance._counted = _conversion_counts(instance.__dict__.get('status'), instance.__dict__.get('confidence_score'))
+
+
+@receiver(post_save, sender=PIDConversion)
+def count_conversion(sender, instance, created, **kwargs):
+    previous = (0, 0, 0) if created else instance._counted
+    instance._counted = _conversion_counts(instance.status, instance.confidence_score)
+    deltas = _counter_deltas(instance._counted, previous)
+    if created:
+        deltas['pfd_conversions'] = 1
+    if any(deltas.values()):
+        adjust_user_history_stats(_document_owner_id(instance.pfd_document_id), **deltas)
+
+
+@receiver(post_delete, sender=PIDConversion)
+def uncount_conversion(sender, instance, **kwargs):
+    # Sent before the document row is deleted, even when the delete cascades from it
+    deltas = _counter_deltas((0, 0, 0), instance._counted)
+    deltas['pfd_conversions'] = -1
+    adjust_user_history_stats(_document_owner_id(instance.pfd_document_id), **deltas)
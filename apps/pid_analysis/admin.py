@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PIDDrawing, PIDAnalysisReport, PIDIssue
+from .models import PIDDrawing, PIDAnalysisReport, PIDIssue, PIDAnalysisJob
 
 
 @admin.register(PIDDrawing)
@@ -69,3 +69,10 @@ class PIDIssueAdmin(admin.ModelAdmin):
             'fields': ('status', 'approval', 'remark')
         }),
     )
+
+
+@admin.register(PIDAnalysisJob)
+class PIDAnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'pid_drawing', 'status', 'current_pass', 'progress', 'created_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['id', 'celery_task_id', 'events', 'created_at', 'started_at', 'completed_at', 'updated_at']
@@ -5,3 +5,7 @@ class PidAnalysisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.pid_analysis'
     verbose_name = 'P&ID Analysis'
+    
+    def ready(self):
+        """Import signals when app is ready"""
+        import apps.pid_analysis.signals
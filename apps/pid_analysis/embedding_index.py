@@ -0,0 +1,166 @@
+"""
+In-memory embedding index for RAG context retrieval
+All active chunk embeddings are held in one pre-normalized NumPy matrix,
+so a query is a single matrix-vector product plus an argpartition for top_k.
+"""
+import json
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+class ChunkEmbeddingIndex:
+    """
+    Process-wide matrix of reference document chunk embeddings
+
+    The index is rebuilt lazily when it has been invalidated (signals on
+    ReferenceDocument save/delete) or when the database fingerprint of the
+    active documents changes, which also covers updates made by other
+    worker processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None  # (n_chunks, dim), rows L2-normalized
+        self._chunks: List[Dict[str, Any]] = []    # text + metadata, aligned with matrix rows
+        self._fingerprint: Optional[Tuple] = None
+
+    def invalidate(self):
+        """Drop the cached matrix; the next search rebuilds it"""
+        with self._lock:
+            self._matrix = None
+            self._chunks = []
+            self._fingerprint = None
+
+    @property
+    def size(self) -> int:
+        return len(self._chunks)
+
+    def _active_documents(self):
+        from .models import ReferenceDocument
+
+        return ReferenceDocument.objects.filter(
+            is_active=True,
+            embedding_status='completed'
+        )
+
+    def _current_fingerprint(self) -> Tuple:
+        """Cheap aggregate that changes whenever the active document set changes"""
+        from django.db.models import Count, Max, Sum
+
+        stats = self._active_documents().aggregate(
+            count=Count('id'),
+            id_sum=Sum('id'),
+            last_updated=Max('updated_at'),
+        )
+        return (stats['count'], stats['id_sum'], stats['last_updated'])
+
+    def _build(self, fingerprint: Tuple):
+        """Load all chunk embeddings from the database into one matrix"""
+        vectors = []
+        chunks = []
+        dimension = None
+
+        documents = self._active_documents().only('id', 'vector_db_ids').iterator()
+        for doc in documents:
+            if not doc.vector_db_ids:
+                continue
+
+            try:
+                # Parse stored chunk data
+                if isinstance(doc.vector_db_ids, str):
+                    chunk_data = json.loads(doc.vector_db_ids)
+                else:
+                    chunk_data = doc.vector_db_ids
+            except Exception as e:
+                print(f"[WARNING] Failed to process document {doc.id}: {str(e)}")
+                continue
+
+            for chunk in chunk_data:
+                if 'embedding' not in chunk or 'text' not in chunk:
+                    continue
+                embedding = chunk['embedding']
+                if dimension is None:
+                    dimension = len(embedding)
+                elif len(embedding) != dimension:
+                    # Chunk embedded with a different model - cannot share the matrix
+                    print(f"[WARNING] Skipping chunk {chunk.get('id')} with dimension {len(embedding)} (expected {dimension})")
+                    continue
+
+                vectors.append(embedding)
+                chunks.append({
+                    'text': chunk['text'],
+                    'metadata': chunk.get('metadata', {})
+                })
+
+        if vectors:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+
+        self._matrix = matrix
+        self._chunks = chunks
+        self._fingerprint = fingerprint
+        print(f"[INFO] RAG embedding index built: {len(chunks)} chunks")
+
+    def _ensure_current(self):
+        fingerprint = self._current_fingerprint()
+        if self._matrix is not None and fingerprint == self._fingerprint:
+            return
+        with self._lock:
+            if self._matrix is None or fingerprint != self._fingerprint:
+                self._build(fingerprint)
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        similarity_threshold: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Return up to top_k chunks with cosine similarity >= similarity_threshold
+
+        Results are sorted by similarity (highest first).
+        """
+        self._ensure_current()
+
+        # Take a consistent snapshot in case another thread rebuilds meanwhile
+        matrix, chunks = self._matrix, self._chunks
+        if matrix is None or not chunks or top_k <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape[0] != matrix.shape[1]:
+            print(f"[WARNING] Query dimension {query.shape[0]} does not match index dimension {matrix.shape[1]}")
+            return []
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return []
+
+        scores = matrix @ (query / query_norm)
+
+        if top_k < len(scores):
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        results = []
+        for idx in candidates:
+            similarity = float(scores[idx])
+            if similarity < similarity_threshold:
+                break
+            results.append({
+                'text': chunks[idx]['text'],
+                'similarity': similarity,
+                'metadata': chunks[idx]['metadata']
+            })
+        return results
+
+
+# Shared by every RAGService instance in this process
+embedding_index = ChunkEmbeddingIndex()
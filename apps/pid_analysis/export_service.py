@@ -2,11 +2,67 @@
 P&ID Report Export Service
 Generate professional reports in PDF, Excel, and CSV formats with customizable branding
 """
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse
 from django.conf import settings
 from datetime import datetime
 import csv
-import io
+import tempfile
+
+# Export libraries are optional; import once at module load
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+    REPORTLAB_AVAILABLE = True
+    REPORTLAB_IMPORT_ERROR = None
+except ImportError as e:
+    REPORTLAB_AVAILABLE = False
+    REPORTLAB_IMPORT_ERROR = str(e)
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    OPENPYXL_AVAILABLE = True
+    OPENPYXL_IMPORT_ERROR = None
+except ImportError as e:
+    OPENPYXL_AVAILABLE = False
+    OPENPYXL_IMPORT_ERROR = str(e)
+
+# Issues are read from the database in chunks of this many rows
+ISSUE_CHUNK_SIZE = 500
+# Generated PDF/Excel files stay in memory up to this size, then spill to disk
+SPOOL_MAX_SIZE = 10 * 1024 * 1024
+# Keys in report_data that may hold the issue list when no PIDIssue rows exist
+REPORT_DATA_ISSUE_KEYS = ['issues', 'identified_issues', 'analysis_issues', 'pid_issues']
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for streaming csv.writer output"""
+    
+    def write(self, value):
+        return value
+
+
+class _SheetRowWriter:
+    """Appends rows to a write-only worksheet by absolute row number (gaps become empty rows)"""
+    
+    def __init__(self, ws):
+        self.ws = ws
+        self.last_row = 0
+    
+    def write(self, row, cells):
+        while self.last_row < row - 1:
+            self.ws.append([])
+            self.last_row += 1
+        self.ws.append(cells)
+        self.last_row = row
+    
+    def merge(self, cell_range):
+        self.ws.merged_cells.add(cell_range)
 
 
 class PIDReportExportService:
@@ -37,23 +93,73 @@ class PIDReportExportService:
         self.footer_text = getattr(settings, 'REPORT_FOOTER_TEXT', 'CONFIDENTIAL ENGINEERING DOCUMENT')
         self.footer_note = getattr(settings, 'REPORT_FOOTER_NOTE_FORMATTED', f'This document is the property of {self.company_name}. Unauthorized distribution is prohibited.')
     
+    def _report_issues(self, report, include_nested=False):
+        """
+        Issue dicts for a report, or None when the report has no issue data
+        
+        Database issues are streamed with iterator() so memory stays flat;
+        otherwise the first issue list found in report_data is used (and
+        report_data['analysis_result']['issues'] when include_nested).
+        """
+        issues = report.issues.order_by('serial_number')
+        if issues.exists():
+            return (
+                {
+                    'serial_number': issue.serial_number,
+                    'pid_reference': issue.pid_reference,
+                    'category': issue.category,
+                    'issue_observed': issue.issue_observed,
+                    'action_required': issue.action_required,
+                    'severity': issue.severity.upper(),
+                    'status': issue.status.upper(),
+                    'approval': issue.approval,
+                    'remark': issue.remark,
+                }
+                for issue in issues.iterator(chunk_size=ISSUE_CHUNK_SIZE)
+            )
+        
+        report_data = getattr(report, 'report_data', None)
+        if not isinstance(report_data, dict):
+            return None
+        
+        for key in REPORT_DATA_ISSUE_KEYS:
+            if key in report_data and isinstance(report_data[key], list):
+                return (self._json_issue(issue) for issue in report_data[key] if isinstance(issue, dict))
+        
+        # Try nested structure
+        if include_nested and 'analysis_result' in report_data:
+            analysis_result = report_data['analysis_result']
+            if isinstance(analysis_result, dict) and 'issues' in analysis_result:
+                return (self._json_issue(issue) for issue in analysis_result['issues'] if isinstance(issue, dict))
+        
+        return None
+    
+    @staticmethod
+    def _json_issue(issue):
+        return {
+            'serial_number': issue.get('serial_number', ''),
+            'pid_reference': issue.get('pid_reference', ''),
+            'category': issue.get('category', ''),
+            'issue_observed': issue.get('issue_observed', ''),
+            'action_required': issue.get('action_required', ''),
+            'severity': str(issue.get('severity', '')).upper(),
+            'status': str(issue.get('status', '')).upper(),
+            'approval': issue.get('approval', ''),
+            'remark': issue.get('remark', ''),
+        }
+    
+    def export_filename(self, drawing, extension):
+        return f'PID_Analysis_{drawing.drawing_number or "Report"}_{datetime.now().strftime("%Y%m%d")}.{extension}'
+    
     def export_pdf(self, drawing):
         """Export report as PDF with customizable branding"""
         print(f"[PDF_EXPORT] Starting PDF export for drawing: {drawing.drawing_number}")
         print(f"[PDF_EXPORT] Drawing has analysis_report: {hasattr(drawing, 'analysis_report')}")
         
-        try:
-            from reportlab.lib import colors
-            from reportlab.lib.pagesizes import A4, landscape
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import cm
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-            from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-            print(f"[PDF_EXPORT] Reportlab imported successfully")
-        except ImportError as e:
-            print(f"[ERROR] Failed to import reportlab: {str(e)}")
+        if not REPORTLAB_AVAILABLE:
+            print(f"[ERROR] Failed to import reportlab: {REPORTLAB_IMPORT_ERROR}")
             return HttpResponse(
-                f"PDF export library not available: {str(e)}",
+                f"PDF export library not available: {REPORTLAB_IMPORT_ERROR}",
                 content_type='text/plain',
                 status=500
             )
@@ -70,7 +176,8 @@ class PIDReportExportService:
         report = drawing.analysis_report
         print(f"[PDF_EXPORT] Report total_issues: {report.total_issues}")
         
-        buffer = io.BytesIO()
+        # Generated into a spooled file: memory up to SPOOL_MAX_SIZE, then disk
+        buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
         
         # Create PDF document (landscape for better table display)
         doc = SimpleDocTemplate(
@@ -226,60 +333,21 @@ class PIDReportExportService:
             ['#', 'P&ID Ref', 'Issue Observed', 'Action Required', 'Severity', 'Status']
         ]
         
-        # Add issues with comprehensive fallback strategy
-        issues_found = False
-        
-        # Method 1: Try database issues first
-        db_issues = list(report.issues.all().order_by('serial_number'))
-        if db_issues:
-            for issue in db_issues:
+        # Add issues: database rows first, then report_data JSON
+        issues = self._report_issues(report, include_nested=True)
+        if issues is not None:
+            for issue in issues:
                 issues_data.append([
-                    str(issue.serial_number),
-                    issue.pid_reference[:30],
-                    issue.issue_observed[:80],
-                    issue.action_required[:80],
-                    issue.severity.upper(),
-                    issue.status.upper()
+                    str(issue['serial_number']),
+                    str(issue['pid_reference'])[:30],
+                    str(issue['issue_observed'])[:80],
+                    str(issue['action_required'])[:80],
+                    issue['severity'],
+                    issue['status']
                 ])
-            issues_found = True
-        
-        # Method 2: Try report_data JSON if no database issues
-        if not issues_found and hasattr(report, 'report_data') and isinstance(report.report_data, dict):
-            # Try multiple possible keys
-            possible_keys = ['issues', 'identified_issues', 'analysis_issues', 'pid_issues']
-            for key in possible_keys:
-                if key in report.report_data and isinstance(report.report_data[key], list):
-                    for issue in report.report_data[key]:
-                        if isinstance(issue, dict):
-                            issues_data.append([
-                                str(issue.get('serial_number', '')),
-                                str(issue.get('pid_reference', ''))[:30],
-                                str(issue.get('issue_observed', ''))[:80],
-                                str(issue.get('action_required', ''))[:80],
-                                str(issue.get('severity', '')).upper(),
-                                str(issue.get('status', '')).upper()
-                            ])
-                    issues_found = True
-                    break
-            
-            # Try nested structure
-            if not issues_found and 'analysis_result' in report.report_data:
-                analysis_result = report.report_data['analysis_result']
-                if isinstance(analysis_result, dict) and 'issues' in analysis_result:
-                    for issue in analysis_result['issues']:
-                        if isinstance(issue, dict):
-                            issues_data.append([
-                                str(issue.get('serial_number', '')),
-                                str(issue.get('pid_reference', ''))[:30],
-                                str(issue.get('issue_observed', ''))[:80],
-                                str(issue.get('action_required', ''))[:80],
-                                str(issue.get('severity', '')).upper(),
-                                str(issue.get('status', '')).upper()
-                            ])
-                    issues_found = True
-        
-        # Method 3: Generate placeholder if report claims issues exist
-        if not issues_found and report.total_issues > 0:
+        
+        # Generate placeholder if report claims issues exist
+        elif report.total_issues > 0:
             for i in range(min(report.total_issues, 10)):
                 issues_data.append([
                     str(i + 1),
@@ -361,6 +429,7 @@ class PIDReportExportService:
         try:
             doc.build(elements)
         except Exception as e:
+            buffer.close()
             print(f"[ERROR] Failed to build PDF document: {str(e)}")
             import traceback
             traceback.print_exc()
@@ -370,27 +439,24 @@ class PIDReportExportService:
                 status=500
             )
         
-        # FileResponse
+        # FileResponse streams the spooled file in chunks and closes it
         buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="PID_Analysis_{drawing.drawing_number or "Report"}_{datetime.now().strftime("%Y%m%d")}.pdf"'
-        
-        return response
+        return FileResponse(
+            buffer,
+            as_attachment=True,
+            filename=self.export_filename(drawing, 'pdf'),
+            content_type='application/pdf'
+        )
     
     def export_excel(self, drawing):
         """Export report as Excel with customizable branding"""
         print(f"[EXCEL_EXPORT] Starting Excel export for drawing: {drawing.drawing_number}")
         print(f"[EXCEL_EXPORT] Drawing has analysis_report: {hasattr(drawing, 'analysis_report')}")
         
-        try:
-            import openpyxl
-            from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-            from openpyxl.utils import get_column_letter
-            print(f"[EXCEL_EXPORT] openpyxl imported successfully")
-        except ImportError as e:
-            print(f"[ERROR] Failed to import openpyxl: {str(e)}")
+        if not OPENPYXL_AVAILABLE:
+            print(f"[ERROR] Failed to import openpyxl: {OPENPYXL_IMPORT_ERROR}")
             return HttpResponse(
-                f"Excel export library not available: {str(e)}",
+                f"Excel export library not available: {OPENPYXL_IMPORT_ERROR}",
                 content_type='text/plain',
                 status=500
             )
@@ -407,10 +473,11 @@ class PIDReportExportService:
         report = drawing.analysis_report
         print(f"[EXCEL_EXPORT] Report total_issues: {report.total_issues}")
         
-        # Create workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "P&ID Analysis Report"
+        # Write-only workbook: rows are streamed to disk as they are appended,
+        # so they must be written top to bottom
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("P&ID Analysis Report")
+        sheet = _SheetRowWriter(ws)
         
         # Styles
         header_font = Font(name='Arial', size=14, bold=True, color='FFFFFF')
@@ -431,33 +498,50 @@ class PIDReportExportService:
             bottom=Side(style='thin')
         )
         
+        def styled(value, font=None, fill=None, alignment=None, cell_border=None):
+            cell = WriteOnlyCell(ws, value=value)
+            if font:
+                cell.font = font
+            if fill:
+                cell.fill = fill
+            if alignment:
+                cell.alignment = alignment
+            if cell_border:
+                cell.border = cell_border
+            return cell
+        
+        def data_row(values, left_columns):
+            return [
+                styled(value, normal_font, alignment=left_alignment if col in left_columns else center_alignment, cell_border=border)
+                for col, value in enumerate(values, start=1)
+            ]
+        
+        # Column widths (write-only sheets need these before any row)
+        ws.column_dimensions['A'].width = 8
+        ws.column_dimensions['B'].width = 25
+        ws.column_dimensions['C'].width = 40
+        ws.column_dimensions['D'].width = 40
+        ws.column_dimensions['E'].width = 15
+        ws.column_dimensions['F'].width = 15
+        
         # Company Header
-        ws.merge_cells('A1:F1')
-        ws['A1'] = self.company_name
-        ws['A1'].font = Font(name='Arial', size=18, bold=True, color='003366')
-        ws['A1'].alignment = center_alignment
+        sheet.merge('A1:F1')
+        sheet.write(1, [styled(self.company_name, Font(name='Arial', size=18, bold=True, color='003366'), alignment=center_alignment)])
         
-        ws.merge_cells('A2:F2')
-        ws['A2'] = self.company_subtitle
-        ws['A2'].font = Font(name='Arial', size=10, color='666666')
-        ws['A2'].alignment = center_alignment
+        sheet.merge('A2:F2')
+        sheet.write(2, [styled(self.company_subtitle, Font(name='Arial', size=10, color='666666'), alignment=center_alignment)])
         
-        ws.merge_cells('A3:F3')
-        ws['A3'] = self.company_website
-        ws['A3'].font = Font(name='Arial', size=9, color='0066CC')
-        ws['A3'].alignment = center_alignment
+        sheet.merge('A3:F3')
+        sheet.write(3, [styled(self.company_website, Font(name='Arial', size=9, color='0066CC'), alignment=center_alignment)])
         
         # Title
-        ws.merge_cells('A5:F5')
-        ws['A5'] = self.report_title
-        ws['A5'].font = title_font
-        ws['A5'].alignment = center_alignment
+        sheet.merge('A5:F5')
+        sheet.write(5, [styled(self.report_title, title_font, alignment=center_alignment)])
         
         # Drawing Information
         row = 7
-        ws[f'A{row}'] = 'DRAWING INFORMATION'
-        ws[f'A{row}'].font = subtitle_font
-        ws.merge_cells(f'A{row}:F{row}')
+        sheet.write(row, [styled('DRAWING INFORMATION', subtitle_font)])
+        sheet.merge(f'A{row}:F{row}')
         
         row += 1
         info_data = [
@@ -490,189 +574,104 @@ class PIDReportExportService:
             ['Report Generated:', datetime.now().strftime('%d-%b-%Y %H:%M')],
         ])
         
+        label_fill = PatternFill(start_color='F0F0F0', end_color='F0F0F0', fill_type='solid')
         for label, value in info_data:
-            ws[f'A{row}'] = label
-            ws[f'A{row}'].font = bold_font
-            ws[f'A{row}'].fill = PatternFill(start_color='F0F0F0', end_color='F0F0F0', fill_type='solid')
-            ws[f'B{row}'] = value
-            ws[f'B{row}'].font = normal_font
-            ws.merge_cells(f'B{row}:F{row}')
+            sheet.write(row, [styled(label, bold_font, label_fill), styled(value, normal_font)])
+            sheet.merge(f'B{row}:F{row}')
             row += 1
         
         # Summary
         row += 2
-        ws[f'A{row}'] = 'ANALYSIS SUMMARY'
-        ws[f'A{row}'].font = subtitle_font
-        ws.merge_cells(f'A{row}:F{row}')
+        sheet.write(row, [styled('ANALYSIS SUMMARY', subtitle_font)])
+        sheet.merge(f'A{row}:F{row}')
         
         row += 1
-        report = drawing.analysis_report
         summary_headers = ['Total Issues', 'Pending', 'Approved', 'Ignored']
         summary_values = [report.total_issues, report.pending_count, report.approved_count, report.ignored_count]
+        value_font = Font(name='Arial', size=12, bold=True)
         
-        for col, (header, value) in enumerate(zip(summary_headers, summary_values), start=1):
-            cell = ws.cell(row=row, column=col)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center_alignment
-            cell.border = border
-            
-            value_cell = ws.cell(row=row+1, column=col)
-            value_cell.value = value
-            value_cell.font = Font(name='Arial', size=12, bold=True)
-            value_cell.alignment = center_alignment
-            value_cell.border = border
+        sheet.write(row, [styled(header, header_font, header_fill, center_alignment, border) for header in summary_headers])
+        sheet.write(row + 1, [styled(value, value_font, alignment=center_alignment, cell_border=border) for value in summary_values])
         
         # Issues Table
         row += 4
-        ws[f'A{row}'] = 'DETAILED ISSUES & OBSERVATIONS'
-        ws[f'A{row}'].font = subtitle_font
-        ws.merge_cells(f'A{row}:F{row}')
+        sheet.write(row, [styled('DETAILED ISSUES & OBSERVATIONS', subtitle_font)])
+        sheet.merge(f'A{row}:F{row}')
         
         row += 1
         headers = ['#', 'P&ID Reference', 'Issue Observed', 'Action Required', 'Severity', 'Status']
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=row, column=col)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center_alignment
-            cell.border = border
-        
-        # Add issues with comprehensive fallback strategy
-        issues_found = False
-        
-        # Method 1: Try database issues first
-        db_issues = list(report.issues.all().order_by('serial_number'))
-        if db_issues:
-            for issue in db_issues:
+        sheet.write(row, [styled(header, header_font, header_fill, center_alignment, border) for header in headers])
+        
+        # Add issues: database rows first, then report_data JSON
+        issues = self._report_issues(report)
+        if issues is not None:
+            for issue in issues:
                 row += 1
-                data = [
-                    issue.serial_number,
-                    issue.pid_reference,
-                    issue.issue_observed,
-                    issue.action_required,
-                    issue.severity.upper(),
-                    issue.status.upper()
-                ]
-                
-                for col, value in enumerate(data, start=1):
-                    cell = ws.cell(row=row, column=col)
-                    cell.value = value
-                    cell.font = normal_font
-                    cell.alignment = left_alignment if col in [2, 3, 4] else center_alignment
-                    cell.border = border
-            issues_found = True
-        
-        # Method 2: Try report_data JSON if no database issues
-        if not issues_found and hasattr(report, 'report_data') and isinstance(report.report_data, dict):
-            # Try multiple possible keys
-            possible_keys = ['issues', 'identified_issues', 'analysis_issues', 'pid_issues']
-            for key in possible_keys:
-                if key in report.report_data and isinstance(report.report_data[key], list):
-                    for issue in report.report_data[key]:
-                        if isinstance(issue, dict):
-                            row += 1
-                            data = [
-                                issue.get('serial_number', ''),
-                                issue.get('pid_reference', ''),
-                                issue.get('issue_observed', ''),
-                                issue.get('action_required', ''),
-                                str(issue.get('severity', '')).upper(),
-                                str(issue.get('status', '')).upper()
-                            ]
-                            
-                            for col, value in enumerate(data, start=1):
-                                cell = ws.cell(row=row, column=col)
-                                cell.value = value
-                                cell.font = normal_font
-                                cell.alignment = left_alignment if col in [2, 3, 4] else center_alignment
-                                cell.border = border
-                    issues_found = True
-                    break
-        
-        # Method 3: Generate placeholder if report claims issues exist
-        if not issues_found and report.total_issues > 0:
+                sheet.write(row, data_row([
+                    issue['serial_number'],
+                    issue['pid_reference'],
+                    issue['issue_observed'],
+                    issue['action_required'],
+                    issue['severity'],
+                    issue['status']
+                ], (2, 3, 4)))
+        
+        # Generate placeholder if report claims issues exist
+        elif report.total_issues > 0:
             for i in range(min(report.total_issues, 10)):
                 row += 1
-                data = [
+                sheet.write(row, data_row([
                     i + 1,
                     f'REF-{i+1:03d}',
                     'Issue data not found in serialization',
                     'Investigate backend data pipeline',
                     'OBSERVATION',
                     'PENDING'
-                ]
-                
-                for col, value in enumerate(data, start=1):
-                    cell = ws.cell(row=row, column=col)
-                    cell.value = value
-                    cell.font = normal_font
-                    cell.alignment = left_alignment if col in [2, 3, 4] else center_alignment
-                    cell.border = border
+                ], (2, 3, 4)))
         
         # Specification Breaks Section
         if hasattr(report, 'report_data') and isinstance(report.report_data, dict):
             spec_breaks = report.report_data.get('specification_breaks', [])
             if spec_breaks:
                 row += 4
-                ws[f'A{row}'] = 'SPECIFICATION BREAKS'
-                ws[f'A{row}'].font = subtitle_font
-                ws.merge_cells(f'A{row}:F{row}')
+                sheet.write(row, [styled('SPECIFICATION BREAKS', subtitle_font)])
+                sheet.merge(f'A{row}:F{row}')
                 
                 row += 1
                 spec_headers = ['ID', 'Location', 'Upstream Spec', 'Downstream Spec', 'Reason', 'Marked']
-                for col, header in enumerate(spec_headers, start=1):
-                    cell = ws.cell(row=row, column=col)
-                    cell.value = header
-                    cell.font = header_font
-                    cell.fill = PatternFill(start_color='8B5CF6', end_color='8B5CF6', fill_type='solid')
-                    cell.alignment = center_alignment
-                    cell.border = border
+                spec_fill = PatternFill(start_color='8B5CF6', end_color='8B5CF6', fill_type='solid')
+                sheet.write(row, [styled(header, header_font, spec_fill, center_alignment, border) for header in spec_headers])
                 
                 for sb in spec_breaks:
                     row += 1
                     upstream = f"{sb.get('upstream_spec', {}).get('material_spec', 'N/A')} {sb.get('upstream_spec', {}).get('pressure_class', '')}"
                     downstream = f"{sb.get('downstream_spec', {}).get('material_spec', 'N/A')} {sb.get('downstream_spec', {}).get('pressure_class', '')}"
                     
-                    spec_data = [
+                    sheet.write(row, data_row([
                         sb.get('spec_break_id', ''),
                         sb.get('location', ''),
                         upstream,
                         downstream,
                         sb.get('reason_for_break', ''),
                         '✓' if sb.get('break_properly_marked') == 'Yes' else '✗'
-                    ]
-                    
-                    for col, value in enumerate(spec_data, start=1):
-                        cell = ws.cell(row=row, column=col)
-                        cell.value = value
-                        cell.font = normal_font
-                        cell.alignment = left_alignment if col in [2, 3, 4, 5] else center_alignment
-                        cell.border = border
-        
-        # Column widths
-        ws.column_dimensions['A'].width = 8
-        ws.column_dimensions['B'].width = 25
-        ws.column_dimensions['C'].width = 40
-        ws.column_dimensions['D'].width = 40
-        ws.column_dimensions['E'].width = 15
-        ws.column_dimensions['F'].width = 15
+                    ], (2, 3, 4, 5)))
         
         # Footer
         row += 3
-        ws.merge_cells(f'A{row}:F{row}')
-        ws[f'A{row}'] = f'{self.footer_text} - Generated: {datetime.now().strftime("%d-%b-%Y %H:%M:%S")}'
-        ws[f'A{row}'].font = Font(name='Arial', size=8, italic=True, color='666666')
-        ws[f'A{row}'].alignment = center_alignment
-        
-        # Save to buffer with error handling
-        buffer = io.BytesIO()
+        sheet.merge(f'A{row}:F{row}')
+        sheet.write(row, [styled(
+            f'{self.footer_text} - Generated: {datetime.now().strftime("%d-%b-%Y %H:%M:%S")}',
+            Font(name='Arial', size=8, italic=True, color='666666'),
+            alignment=center_alignment
+        )])
+        
+        # Save to a spooled file with error handling
+        buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
         try:
             wb.save(buffer)
             buffer.seek(0)
         except Exception as e:
+            buffer.close()
             print(f"[ERROR] Failed to save Excel workbook: {str(e)}")
             import traceback
             traceback.print_exc()
@@ -682,13 +681,12 @@ class PIDReportExportService:
                 status=500
             )
         
-        response = HttpResponse(
-            buffer.getvalue(),
+        return FileResponse(
+            buffer,
+            as_attachment=True,
+            filename=self.export_filename(drawing, 'xlsx'),
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        response['Content-Disposition'] = f'attachment; filename="PID_Analysis_{drawing.drawing_number or "Report"}_{datetime.now().strftime("%Y%m%d")}.xlsx"'
-        
-        return response
     
     def export_csv(self, drawing):
         """Export report as CSV"""
@@ -707,19 +705,24 @@ class PIDReportExportService:
         report = drawing.analysis_report
         print(f"[CSV_EXPORT] Report total_issues: {report.total_issues}")
         
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="PID_Analysis_{drawing.drawing_number or "Report"}_{datetime.now().strftime("%Y%m%d")}.csv"'
+        # Rows are generated lazily and streamed to the client as they are written
+        response = StreamingHttpResponse(self._csv_rows(drawing, report), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{self.export_filename(drawing, "csv")}"'
         
-        writer = csv.writer(response)
+        return response
+    
+    def _csv_rows(self, drawing, report):
+        """Yield the CSV export one formatted line at a time"""
+        writer = csv.writer(_Echo())
         
         # Header
-        writer.writerow([f'{self.company_name} - {self.report_title}'])
-        writer.writerow([self.company_website])
-        writer.writerow([])
+        yield writer.writerow([f'{self.company_name} - {self.report_title}'])
+        yield writer.writerow([self.company_website])
+        yield writer.writerow([])
         
         # Drawing Information
-        writer.writerow(['DRAWING INFORMATION'])
-        writer.writerow(['Drawing Number', drawing.drawing_number or 'N/A'])
+        yield writer.writerow(['DRAWING INFORMATION'])
+        yield writer.writerow(['Drawing Number', drawing.drawing_number or 'N/A'])
         
         # Add structured drawing number details if available
         if drawing.area or drawing.p_area or drawing.doc_code or drawing.serial_number:
@@ -737,72 +740,45 @@ class PIDReportExportService:
             if drawing.sheet_number and drawing.total_sheets:
                 structured_parts.append(f'Sheet: {drawing.sheet_number}/{drawing.total_sheets}')
             
-            writer.writerow(['  (Structure)', ' | '.join(structured_parts)])
+            yield writer.writerow(['  (Structure)', ' | '.join(structured_parts)])
         
-        writer.writerow(['Drawing Title', drawing.drawing_title or 'N/A'])
-        writer.writerow(['Revision', drawing.revision or 'N/A'])
-        writer.writerow(['Project Name', drawing.project_name or 'N/A'])
-        writer.writerow(['Analysis Date', drawing.analysis_completed_at.strftime('%d-%b-%Y %H:%M') if drawing.analysis_completed_at else 'N/A'])
-        writer.writerow(['Report Generated', datetime.now().strftime('%d-%b-%Y %H:%M')])
-        writer.writerow([])
+        yield writer.writerow(['Drawing Title', drawing.drawing_title or 'N/A'])
+        yield writer.writerow(['Revision', drawing.revision or 'N/A'])
+        yield writer.writerow(['Project Name', drawing.project_name or 'N/A'])
+        yield writer.writerow(['Analysis Date', drawing.analysis_completed_at.strftime('%d-%b-%Y %H:%M') if drawing.analysis_completed_at else 'N/A'])
+        yield writer.writerow(['Report Generated', datetime.now().strftime('%d-%b-%Y %H:%M')])
+        yield writer.writerow([])
         
         # Summary
-        report = drawing.analysis_report
-        writer.writerow(['ANALYSIS SUMMARY'])
-        writer.writerow(['Total Issues', 'Pending', 'Approved', 'Ignored'])
-        writer.writerow([report.total_issues, report.pending_count, report.approved_count, report.ignored_count])
-        writer.writerow([])
+        yield writer.writerow(['ANALYSIS SUMMARY'])
+        yield writer.writerow(['Total Issues', 'Pending', 'Approved', 'Ignored'])
+        yield writer.writerow([report.total_issues, report.pending_count, report.approved_count, report.ignored_count])
+        yield writer.writerow([])
         
         # Issues
-        writer.writerow(['DETAILED ISSUES & OBSERVATIONS'])
-        writer.writerow(['#', 'P&ID Reference', 'Category', 'Issue Observed', 'Action Required', 'Severity', 'Status', 'Approval', 'Remark'])
-        
-        # Add issues with comprehensive fallback strategy
-        issues_found = False
-        
-        # Method 1: Try database issues first
-        db_issues = list(report.issues.all().order_by('serial_number'))
-        if db_issues:
-            for issue in db_issues:
-                writer.writerow([
-                    issue.serial_number,
-                    issue.pid_reference,
-                    issue.category,
-                    issue.issue_observed,
-                    issue.action_required,
-                    issue.severity.upper(),
-                    issue.status.upper(),
-                    issue.approval,
-                    issue.remark
+        yield writer.writerow(['DETAILED ISSUES & OBSERVATIONS'])
+        yield writer.writerow(['#', 'P&ID Reference', 'Category', 'Issue Observed', 'Action Required', 'Severity', 'Status', 'Approval', 'Remark'])
+        
+        # Add issues: database rows first, then report_data JSON
+        issues = self._report_issues(report)
+        if issues is not None:
+            for issue in issues:
+                yield writer.writerow([
+                    issue['serial_number'],
+                    issue['pid_reference'],
+                    issue['category'],
+                    issue['issue_observed'],
+                    issue['action_required'],
+                    issue['severity'],
+                    issue['status'],
+                    issue['approval'],
+                    issue['remark']
                 ])
-            issues_found = True
-        
-        # Method 2: Try report_data JSON if no database issues
-        if not issues_found and hasattr(report, 'report_data') and isinstance(report.report_data, dict):
-            # Try multiple possible keys
-            possible_keys = ['issues', 'identified_issues', 'analysis_issues', 'pid_issues']
-            for key in possible_keys:
-                if key in report.report_data and isinstance(report.report_data[key], list):
-                    for issue in report.report_data[key]:
-                        if isinstance(issue, dict):
-                            writer.writerow([
-                                issue.get('serial_number', ''),
-                                issue.get('pid_reference', ''),
-                                issue.get('category', ''),
-                                issue.get('issue_observed', ''),
-                                issue.get('action_required', ''),
-                                str(issue.get('severity', '')).upper(),
-                                str(issue.get('status', '')).upper(),
-                                issue.get('approval', ''),
-                                issue.get('remark', '')
-                            ])
-                    issues_found = True
-                    break
-        
-        # Method 3: Generate placeholder if report claims issues exist
-        if not issues_found and report.total_issues > 0:
+        
+        # Generate placeholder if report claims issues exist
+        elif report.total_issues > 0:
             for i in range(min(report.total_issues, 10)):
-                writer.writerow([
+                yield writer.writerow([
                     i + 1,
                     f'REF-{i+1:03d}',
                     'OBSERVATION',
@@ -814,20 +790,20 @@ class PIDReportExportService:
                     'Data retrieval issue'
                 ])
         
-        writer.writerow([])
+        yield writer.writerow([])
         
         # Specification Breaks
         if hasattr(report, 'report_data') and isinstance(report.report_data, dict):
             spec_breaks = report.report_data.get('specification_breaks', [])
             if spec_breaks:
-                writer.writerow(['SPECIFICATION BREAKS'])
-                writer.writerow(['ID', 'Location', 'Upstream Spec', 'Downstream Spec', 'Reason', 'Properly Marked', 'Transition Required', 'Cost Impact'])
+                yield writer.writerow(['SPECIFICATION BREAKS'])
+                yield writer.writerow(['ID', 'Location', 'Upstream Spec', 'Downstream Spec', 'Reason', 'Properly Marked', 'Transition Required', 'Cost Impact'])
                 
                 for sb in spec_breaks:
                     upstream = f"{sb.get('upstream_spec', {}).get('material_spec', 'N/A')} {sb.get('upstream_spec', {}).get('pressure_class', '')}"
                     downstream = f"{sb.get('downstream_spec', {}).get('material_spec', 'N/A')} {sb.get('downstream_spec', {}).get('pressure_class', '')}"
                     
-                    writer.writerow([
+                    yield writer.writerow([
                         sb.get('spec_break_id', ''),
                         sb.get('location', ''),
                         upstream,
@@ -838,8 +814,6 @@ class PIDReportExportService:
                         sb.get('cost_impact', 'N/A')
                     ])
                 
-                writer.writerow([])
-        
-        writer.writerow([f'{self.footer_text} - Generated: {datetime.now().strftime("%d-%b-%Y %H:%M:%S")}'])
+                yield writer.writerow([])
         
-        return response
+        yield writer.writerow([f'{self.footer_text} - Generated: {datetime.now().strftime("%d-%b-%Y %H:%M:%S")}'])
@@ -9,8 +9,9 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, Count
 from django.utils import timezone
+from apps.users.history_stats import get_user_history_stats
 from .models import PIDDrawing, PIDAnalysisReport
 from django.http import FileResponse, HttpResponse
 import os
@@ -45,13 +46,11 @@ def pid_history_overview(request):
     try:
         user = request.user
         
-        # Get user statistics
+        # User statistics - one row, maintained by signals
+        stats = get_user_history_stats(user)
         drawings = PIDDrawing.objects.filter(uploaded_by=user)
         reports = PIDAnalysisReport.objects.filter(pid_drawing__uploaded_by=user)
         
-        total_issues = sum(report.total_issues for report in reports)
-        avg_issues = reports.aggregate(Avg('total_issues'))['total_issues__avg'] or 0
-        
         # Recent uploads (last 10)
         recent_uploads = drawings.order_by('-created_at')[:10].values(
             'id',
@@ -85,10 +84,10 @@ def pid_history_overview(request):
                 'profile': {
                     'username': user.get_full_name() or user.email or user.username,
                     'email': user.email,
-                    'total_uploads': drawings.count(),
-                    'total_analyses': reports.count(),
-                    'total_issues_found': total_issues,
-                    'avg_issues_per_drawing': round(avg_issues, 1)
+                    'total_uploads': stats.pid_uploads,
+                    'total_analyses': stats.pid_analyses,
+                    'total_issues_found': stats.pid_issues_found,
+                    'avg_issues_per_drawing': round(stats.avg_issues_per_drawing, 1)
                 },
                 'recent_uploads': list(recent_uploads),
                 'recent_analyses': recent_analyses
@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-16 18:18
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pid_analysis', '0005_piddrawing_area_piddrawing_doc_code_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PIDAnalysisJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('celery_task_id', models.CharField(blank=True, help_text='Celery task id', max_length=255)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('current_pass', models.IntegerField(default=0, help_text='Analysis pass currently running (1-4)')),
+                ('progress', models.IntegerField(default=0, help_text='Completion percentage (0-100)')),
+                ('events', models.JSONField(blank=True, default=list, help_text='Progress events emitted by the worker')),
+                ('error_message', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('pid_drawing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_jobs', to='pid_analysis.piddrawing')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pid_analysis_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'P&ID Analysis Job',
+                'verbose_name_plural': 'P&ID Analysis Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['pid_drawing', '-created_at'], name='pid_analysi_pid_dra_41754d_idx'), models.Index(fields=['status'], name='pid_analysi_status_941b76_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-16 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pid_analysis', '0006_pidanalysisjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pidanalysisreport',
+            name='excel_report_revision',
+            field=models.PositiveIntegerField(blank=True, help_text='Report revision the stored Excel was generated from', null=True),
+        ),
+        migrations.AddField(
+            model_name='pidanalysisreport',
+            name='pdf_report_revision',
+            field=models.PositiveIntegerField(blank=True, help_text='Report revision the stored PDF was generated from', null=True),
+        ),
+        migrations.AddField(
+            model_name='pidanalysisreport',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented whenever an issue of this report changes'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
@@ -209,6 +210,12 @@ class PIDAnalysisReport(models.Model):
         help_text='Generated Excel report'
     )
     
+    # Export artifact cache: revision is bumped on every issue change, and a
+    # stored file is only served while its *_revision matches
+    revision = models.PositiveIntegerField(default=0, help_text='Incremented whenever an issue of this report changes')
+    pdf_report_revision = models.PositiveIntegerField(null=True, blank=True, help_text='Report revision the stored PDF was generated from')
+    excel_report_revision = models.PositiveIntegerField(null=True, blank=True, help_text='Report revision the stored Excel was generated from')
+    
     # Timestamps
     generated_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -276,3 +283,76 @@ class PIDIssue(models.Model):
     
     def __str__(self):
         return f"Issue #{self.serial_number} - {self.pid_reference}"
+
+
+class PIDAnalysisJob(models.Model):
+    """Queued P&ID analysis job executed by a Celery worker"""
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    TOTAL_PASSES = 4
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    pid_drawing = models.ForeignKey(
+        PIDDrawing,
+        on_delete=models.CASCADE,
+        related_name='analysis_jobs'
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pid_analysis_jobs'
+    )
+    
+    # Queue tracking
+    celery_task_id = models.CharField(max_length=255, blank=True, help_text='Celery task id')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    
+    # Progress (pass 1-4 of the multi-pass analysis)
+    current_pass = models.IntegerField(default=0, help_text='Analysis pass currently running (1-4)')
+    progress = models.IntegerField(default=0, help_text='Completion percentage (0-100)')
+    events = models.JSONField(default=list, blank=True, help_text='Progress events emitted by the worker')
+    error_message = models.TextField(blank=True, default='')
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'P&ID Analysis Job'
+        verbose_name_plural = 'P&ID Analysis Jobs'
+        indexes = [
+            models.Index(fields=['pid_drawing', '-created_at']),
+            models.Index(fields=['status']),
+        ]
+    
+    def __str__(self):
+        return f"Job {self.id} ({self.status}) for drawing {self.pid_drawing_id}"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+    
+    def add_event(self, pass_number, message):
+        """Record a progress event and persist only the progress fields"""
+        from django.utils import timezone
+        
+        self.current_pass = pass_number
+        # Each pass owns an equal share of the bar; a pass is 'done' when the next one starts
+        self.progress = min(99, int((pass_number - 1) * 100 / self.TOTAL_PASSES))
+        self.events = list(self.events or []) + [{
+            'pass': pass_number,
+            'message': message,
+            'timestamp': timezone.now().isoformat(),
+        }]
+        self.save(update_fields=['current_pass', 'progress', 'events', 'updated_at'])
@@ -0,0 +1,163 @@
+"""
+PDF Page Renderer for P&ID Vision Analysis
+Renders and encodes pages concurrently (process pool) with adaptive DPI
+and selectable output format (PNG/JPEG/WebP).
+"""
+import base64
+import io
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+
+SUPPORTED_FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'jpg': ('JPEG', 'image/jpeg'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+# Per-process document handle, opened once by the pool initializer
+_worker_doc = None
+
+
+def normalize_format(image_format: Optional[str]) -> str:
+    """Return the canonical format key, raising ValueError for unsupported formats"""
+    key = (image_format or 'png').lower()
+    if key not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported image format '{image_format}'. Use png, jpeg or webp")
+    return 'jpeg' if key == 'jpg' else key
+
+
+def mime_type_for(image_format: str) -> str:
+    return SUPPORTED_FORMATS[normalize_format(image_format)][1]
+
+
+def adaptive_dpi(page_rect, dpi: int, max_edge_px: Optional[int], min_dpi: int = 100) -> int:
+    """
+    Lower the DPI for large sheets so the long edge stays within max_edge_px
+
+    A3 sheets keep 300 DPI; A1/A0 sheets are rendered at a lower DPI instead of
+    producing 10,000+ pixel images that the vision model downscales anyway.
+    """
+    if not max_edge_px:
+        return dpi
+    long_edge_inches = max(page_rect.width, page_rect.height) / 72
+    if long_edge_inches <= 0:
+        return dpi
+    return int(max(min_dpi, min(dpi, max_edge_px / long_edge_inches)))
+
+
+def encode_pixmap(samples: bytes, width: int, height: int, image_format: str, quality: int) -> str:
+    """Encode raw RGB samples as a base64 string in the requested format"""
+    pil_format = SUPPORTED_FORMATS[image_format][0]
+    img = Image.frombytes("RGB", [width, height], samples)
+    buffer = io.BytesIO()
+    if pil_format == 'PNG':
+        # compress_level 6 is several times faster than optimize=True for similar size
+        img.save(buffer, format="PNG", compress_level=6)
+    else:
+        img.save(buffer, format=pil_format, quality=quality)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def _render_pixmap(doc, page_num: int, dpi: int, max_edge_px: Optional[int]):
+    page = doc.load_page(page_num)
+    page_dpi = adaptive_dpi(page.rect, dpi, max_edge_px)
+    mat = fitz.Matrix(page_dpi / 72, page_dpi / 72)
+    return page.get_pixmap(matrix=mat, alpha=False)
+
+
+def _init_worker(pdf_path: str):
+    global _worker_doc
+    _worker_doc = fitz.open(pdf_path)
+
+
+def _render_page_in_worker(args) -> str:
+    page_num, dpi, max_edge_px, image_format, quality = args
+    pix = _render_pixmap(_worker_doc, page_num, dpi, max_edge_px)
+    return encode_pixmap(pix.samples, pix.width, pix.height, image_format, quality)
+
+
+def _can_fork_workers() -> bool:
+    # Celery prefork children are daemonic and may not start their own processes
+    return not multiprocessing.current_process().daemon
+
+
+def render_pdf_pages(
+    pdf_file,
+    dpi: int = 300,
+    image_format: str = 'png',
+    quality: int = 85,
+    max_edge_px: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> List[str]:
+    """
+    Render every page of a PDF to base64-encoded images, in page order
+
+    Args:
+        pdf_file: Django FieldFile/file object or local file path
+        dpi: Maximum rendering resolution
+        image_format: png, jpeg or webp
+        quality: JPEG/WebP quality (ignored for PNG)
+        max_edge_px: Cap on the long edge in pixels (adaptive DPI); None disables
+        max_workers: Worker processes; 1 renders serially in this process
+
+    Returns:
+        List of base64-encoded image strings
+    """
+    image_format = normalize_format(image_format)
+    temp_path = None
+
+    # Workers open the document independently, so they need a path rather than bytes
+    if isinstance(pdf_file, str):
+        pdf_path = pdf_file
+    else:
+        pdf_file.seek(0)  # Ensure we're at the start
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+            for chunk in iter(lambda: pdf_file.read(1024 * 1024), b''):
+                tmp.write(chunk)
+            temp_path = tmp.name
+        pdf_path = temp_path
+
+    try:
+        doc = fitz.open(pdf_path)
+        page_count = len(doc)
+        workers = max_workers or min(page_count, os.cpu_count() or 1)
+
+        if workers > 1 and page_count > 1 and _can_fork_workers():
+            doc.close()
+            jobs = [(n, dpi, max_edge_px, image_format, quality) for n in range(page_count)]
+            with ProcessPoolExecutor(
+                max_workers=min(workers, page_count),
+                initializer=_init_worker,
+                initargs=(pdf_path,)
+            ) as executor:
+                return list(executor.map(_render_page_in_worker, jobs))
+
+        # In-process: rendering stays on this thread (PyMuPDF is not thread-safe),
+        # encoding overlaps on a thread pool since PIL releases the GIL while compressing
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, page_count))) as executor:
+                futures = []
+                for page_num in range(page_count):
+                    pix = _render_pixmap(doc, page_num, dpi, max_edge_px)
+                    futures.append(executor.submit(
+                        encode_pixmap, pix.samples, pix.width, pix.height, image_format, quality
+                    ))
+                    del pix
+                return [future.result() for future in futures]
+        finally:
+            doc.close()
+
+    finally:
+        if temp_path:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
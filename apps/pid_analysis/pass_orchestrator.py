@@ -0,0 +1,98 @@
+"""
+Pass Orchestrator for Multi-Pass P&ID Analysis
+Runs independent analysis passes concurrently on a thread pool with
+per-pass timeouts and cancellation.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+
+class PassOrchestrator:
+    """
+    Submit passes by name, then collect their results with a timeout
+
+    Passes are I/O bound (OpenAI calls), so threads give real overlap.
+    A pass that times out or is cancelled yields its default result; the
+    worker thread is abandoned and ends when its own HTTP timeout fires.
+    """
+
+    def __init__(self, max_workers: int = 3):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pid-pass')
+        self._futures: Dict[str, Any] = {}
+        self._timeouts: Dict[str, Optional[float]] = {}
+        self._started: Dict[str, Any] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
+
+    def submit(self, name: str, fn: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        Start a pass
+
+        The timeout counts from when a worker picks the pass up, so a pass
+        queued behind an abandoned one still gets its full budget.
+        """
+        started = (threading.Event(), [])
+
+        def run():
+            started[1].append(time.monotonic())
+            started[0].set()
+            return fn(*args, **kwargs)
+
+        self._futures[name] = self._executor.submit(run)
+        self._timeouts[name] = timeout
+        self._started[name] = started
+        print(f"[INFO] Pass '{name}' started" + (f" (timeout {timeout:.0f}s)" if timeout else ""))
+
+    def cancel(self, name: str):
+        """Cancel a pass and discard its result"""
+        future = self._futures.pop(name, None)
+        self._timeouts.pop(name, None)
+        self._started.pop(name, None)
+        if future is not None:
+            if not future.cancel():
+                print(f"[INFO] Pass '{name}' cancelled (result will be discarded)")
+            else:
+                print(f"[INFO] Pass '{name}' cancelled before start")
+
+    def result(self, name: str, default: Any = None) -> Any:
+        """Wait for a pass; returns default on timeout, cancellation or error"""
+        future = self._futures.pop(name, None)
+        timeout = self._timeouts.pop(name, None)
+        started = self._started.pop(name, None)
+        if future is None:
+            return default
+
+        # Waiting outside any handler: an interrupt of the caller (e.g. Celery's
+        # SoftTimeLimitExceeded) propagates instead of becoming the default result.
+        # A queued pass is waited for until it starts (abandoned passes end when
+        # their own HTTP timeout fires), then for its timeout
+        if timeout:
+            started_event, started_at = started
+            started_event.wait()
+            wait([future], timeout=max(0.0, started_at[0] + timeout - time.monotonic()))
+        else:
+            wait([future])
+        if not future.done():
+            future.cancel()
+            print(f"[ERROR] Pass '{name}' timed out")
+            return default
+        if future.cancelled():
+            return default
+        error = future.exception()
+        if error is not None:
+            print(f"[ERROR] Pass '{name}' failed: {str(error)}")
+            return default
+        return future.result()
+
+    def shutdown(self):
+        """Cancel anything still pending and release the pool without blocking"""
+        for name in list(self._futures):
+            self.cancel(name)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,103 @@
+"""
+P&ID Analysis Persistence
+Writes an analysis result (report + issues) in one atomic transaction
+"""
+from typing import Any, Dict, List
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import PIDDrawing, PIDAnalysisReport, PIDIssue
+
+STATUSES = ('approved', 'ignored', 'pending')
+
+
+def summarize_issues(issues: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Total and per-status counts (the fields PIDAnalysisReport stores) in one pass"""
+    counts = {f'{key}_count': 0 for key in STATUSES}
+    for issue in issues:
+        issue_status = (issue.get('status') or 'pending').lower()
+        if issue_status in STATUSES:
+            counts[f'{issue_status}_count'] += 1
+    counts['total_issues'] = len(issues)
+    return counts
+
+
+def build_issue(report: PIDAnalysisReport, issue_data: Dict[str, Any]) -> PIDIssue:
+    return PIDIssue(
+        report=report,
+        serial_number=issue_data.get('serial_number', 0),
+        pid_reference=issue_data.get('pid_reference', ''),
+        issue_observed=issue_data.get('issue_observed', ''),
+        action_required=issue_data.get('action_required', ''),
+        severity=issue_data.get('severity', 'observation'),
+        category=issue_data.get('category', ''),
+        location_on_drawing=issue_data.get('location_on_drawing'),  # Include location data
+        status=issue_data.get('status', 'pending'),
+        approval=issue_data.get('approval', 'Pending'),
+        remark=issue_data.get('remark', 'Pending'),
+    )
+
+
+def save_analysis_result(drawing: PIDDrawing, analysis_result: Dict[str, Any]) -> PIDAnalysisReport:
+    """
+    Replace the drawing's report with a new analysis result
+
+    One transaction: delete old report, insert report with its counts,
+    bulk-insert all issues, update the drawing once.
+    """
+    issues = analysis_result.get('issues', [])
+    summary = summarize_issues(issues)
+
+    with transaction.atomic():
+        # Delete existing report if any (issues cascade)
+        PIDAnalysisReport.objects.filter(pid_drawing=drawing).delete()
+
+        report = PIDAnalysisReport.objects.create(
+            pid_drawing=drawing,
+            report_data=analysis_result,
+            total_issues=summary['total_issues'],
+            approved_count=summary['approved_count'],
+            ignored_count=summary['ignored_count'],
+            pending_count=summary['pending_count'],
+        )
+
+        PIDIssue.objects.bulk_create(
+            [build_issue(report, issue_data) for issue_data in issues],
+            batch_size=500
+        )
+
+        # Update drawing
+        drawing.status = 'completed'
+        drawing.analysis_completed_at = timezone.now()
+        update_fields = ['status', 'analysis_completed_at', 'updated_at']
+
+        # Update drawing metadata from analysis if available
+        drawing_info = analysis_result.get('drawing_info') or {}
+        for field in ('drawing_number', 'drawing_title', 'revision'):
+            if not getattr(drawing, field) and drawing_info.get(field):
+                setattr(drawing, field, drawing_info[field])
+                update_fields.append(field)
+
+        drawing.save(update_fields=update_fields)
+
+    return report
+
+
+def refresh_report_counts(report: PIDAnalysisReport):
+    """Recount issue statuses with one aggregate query and one update"""
+    counts = report.issues.aggregate(
+        approved_count=Count('id', filter=Q(status='approved')),
+        ignored_count=Count('id', filter=Q(status='ignored')),
+        pending_count=Count('id', filter=Q(status='pending')),
+    )
+    for field, value in counts.items():
+        setattr(report, field, value)
+    report.save(update_fields=['approved_count', 'ignored_count', 'pending_count', 'updated_at'])
+
+
+def bump_report_revision(report: PIDAnalysisReport):
+    """Invalidate the report's stored export artifacts (atomic increment)"""
+    PIDAnalysisReport.objects.filter(pk=report.pk).update(revision=F('revision') + 1)
+    report.refresh_from_db(fields=['revision'])
@@ -6,7 +6,6 @@ import os
 import json
 from typing import List, Dict, Any, Optional
 from openai import OpenAI
-import numpy as np
 
 
 class RAGService:
@@ -116,7 +115,7 @@ class RAGService:
         Returns:
             Concatenated context text from relevant chunks
         """
-        from .models import ReferenceDocument
+        from .embedding_index import embedding_index
         
         # Get configuration
         top_k = top_k or int(os.environ.get('RAG_TOP_K', '5'))
@@ -126,57 +125,13 @@ class RAGService:
             # Generate query embedding
             query_embedding = self.generate_embedding(query)
             
-            # Get all active reference documents
-            documents = ReferenceDocument.objects.filter(
-                is_active=True,
-                embedding_status='completed'
-            )
-            
-            if not documents.exists():
-                print("[INFO] No active reference documents found")
-                return ""
-            
-            # Calculate similarities
-            all_chunks = []
+            # One matrix-vector product over all active chunks
+            top_chunks = embedding_index.search(query_embedding, top_k, similarity_threshold)
             
-            for doc in documents:
-                if not doc.vector_db_ids:
-                    continue
-                
-                try:
-                    # Parse stored chunk data
-                    if isinstance(doc.vector_db_ids, str):
-                        chunk_data = json.loads(doc.vector_db_ids)
-                    else:
-                        chunk_data = doc.vector_db_ids
-                    
-                    for chunk in chunk_data:
-                        if 'embedding' in chunk and 'text' in chunk:
-                            # Calculate cosine similarity
-                            similarity = self._cosine_similarity(
-                                query_embedding,
-                                chunk['embedding']
-                            )
-                            
-                            if similarity >= similarity_threshold:
-                                all_chunks.append({
-                                    'text': chunk['text'],
-                                    'similarity': similarity,
-                                    'metadata': chunk.get('metadata', {})
-                                })
-                
-                except Exception as e:
-                    print(f"[WARNING] Failed to process document {doc.id}: {str(e)}")
-                    continue
-            
-            if not all_chunks:
-                print(f"[INFO] No relevant chunks found (threshold: {similarity_threshold})")
+            if not top_chunks:
+                print(f"[INFO] No relevant chunks found (threshold: {similarity_threshold}, indexed: {embedding_index.size})")
                 return ""
             
-            # Sort by similarity and take top_k
-            all_chunks.sort(key=lambda x: x['similarity'], reverse=True)
-            top_chunks = all_chunks[:top_k]
-            
             # Build context
             context_parts = []
             for chunk in top_chunks:
@@ -226,25 +181,3 @@ class RAGService:
 **Important:** Use the reference context above to enhance your analysis with specific standards, guidelines, and best practices. Cross-reference equipment specifications and design requirements with the provided documentation."""
         
         return augmented_prompt
-    
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
-        try:
-            # Convert to numpy arrays
-            a = np.array(vec1)
-            b = np.array(vec2)
-            
-            # Calculate cosine similarity
-            dot_product = np.dot(a, b)
-            norm_a = np.linalg.norm(a)
-            norm_b = np.linalg.norm(b)
-            
-            if norm_a == 0 or norm_b == 0:
-                return 0.0
-            
-            similarity = dot_product / (norm_a * norm_b)
-            return float(similarity)
-            
-        except Exception as e:
-            print(f"[ERROR] Similarity calculation failed: {str(e)}")
-            return 0.0
@@ -0,0 +1,116 @@
+"""
+P&ID Report Artifact Cache
+PDF/Excel exports are stored on the report (default storage: S3 or local media)
+together with the report revision they were generated from. The revision is
+bumped whenever an issue changes, so repeated downloads of an unchanged report
+are streamed from storage instead of being rendered again.
+"""
+import logging
+
+from django.core.files import File
+from django.http import FileResponse
+
+from .models import PIDAnalysisReport
+
+logger = logging.getLogger(__name__)
+
+# export format -> (file field, revision field, extension, content type)
+CACHED_FORMATS = {
+    'pdf': ('pdf_report', 'pdf_report_revision', 'pdf', 'application/pdf'),
+    'excel': (
+        'excel_report',
+        'excel_report_revision',
+        'xlsx',
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    ),
+}
+
+
+def _open_stored_artifact(report: PIDAnalysisReport, export_format: str):
+    """Open the stored artifact if it is current, else None"""
+    file_field, revision_field, _, _ = CACHED_FORMATS[export_format]
+    stored = getattr(report, file_field)
+    if not stored or getattr(report, revision_field) != report.revision:
+        return None
+    try:
+        return stored.storage.open(stored.name, 'rb')
+    except Exception as e:
+        # Missing or unreadable - regenerate
+        logger.warning(f"[PID ARTIFACT] Could not open stored {export_format} {stored.name}: {e}")
+        return None
+
+
+def _store_artifact(report: PIDAnalysisReport, export_format: str, content, revision: int):
+    """Save a generated artifact and record the revision it reflects"""
+    file_field, revision_field, extension, _ = CACHED_FORMATS[export_format]
+    field_file = getattr(report, file_field)
+    previous_name = field_file.name
+
+    field_file.save(f'report_{report.pk}_r{revision}.{extension}', File(content), save=False)
+    setattr(report, revision_field, revision)
+    # Only touch the artifact columns - counts may have changed meanwhile
+    PIDAnalysisReport.objects.filter(pk=report.pk).update(**{
+        file_field: field_file.name,
+        revision_field: revision,
+    })
+
+    if previous_name and previous_name != field_file.name:
+        try:
+            field_file.storage.delete(previous_name)
+        except Exception as e:
+            logger.warning(f"[PID ARTIFACT] Could not delete old artifact {previous_name}: {e}")
+
+
+def export_report_artifact(drawing, export_format: str, export_service):
+    """
+    Export response for a cacheable format ('pdf' or 'excel')
+
+    Args:
+        drawing: PIDDrawing with an analysis_report
+        export_format: Key of CACHED_FORMATS
+        export_service: PIDReportExportService used on a cache miss
+
+    Returns:
+        FileResponse streamed from storage, or the freshly generated export
+        (which is stored for the next request). Error responses from the
+        export service are returned unchanged and not cached.
+    """
+    report = drawing.analysis_report
+    _, _, extension, content_type = CACHED_FORMATS[export_format]
+
+    stored = _open_stored_artifact(report, export_format)
+    if stored is not None:
+        logger.info(f"[PID ARTIFACT] Serving stored {export_format} for report {report.pk} (revision {report.revision})")
+        return FileResponse(
+            stored,
+            as_attachment=True,
+            filename=export_service.export_filename(drawing, extension),
+            content_type=content_type
+        )
+
+    # Capture the revision first: if an issue changes while rendering, the
+    # stored file is recorded as stale and regenerated on the next request
+    revision = report.revision
+    response = getattr(export_service, f'export_{export_format}')(drawing)
+    if response.status_code != 200 or not isinstance(response, FileResponse):
+        return response
+
+    content = response.file_to_stream
+    try:
+        _store_artifact(report, export_format, content, revision)
+        logger.info(f"[PID ARTIFACT] Stored {export_format} for report {report.pk} (revision {revision})")
+    except Exception as e:
+        # Storage problems must not fail the download
+        logger.warning(f"[PID ARTIFACT] Could not store {export_format} for report {report.pk}: {e}")
+    content.seek(0)
+    return response
+
+
+def pregenerate_report_artifacts(drawing):
+    """Render and store every cacheable format for a drawing's report"""
+    from .export_service import PIDReportExportService
+
+    export_service = PIDReportExportService()
+    for export_format in CACHED_FORMATS:
+        response = export_report_artifact(drawing, export_format, export_service)
+        response.close()
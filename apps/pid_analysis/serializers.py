@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import PIDDrawing, PIDAnalysisReport, PIDIssue, ReferenceDocument
+from .models import PIDDrawing, PIDAnalysisReport, PIDIssue, ReferenceDocument, PIDAnalysisJob
 
 
 class PIDIssueSerializer(serializers.ModelSerializer):
@@ -250,6 +250,24 @@ class PIDDrawingSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class PIDAnalysisJobSerializer(serializers.ModelSerializer):
+    """Serializer for queued analysis jobs (status polling)"""
+    
+    total_passes = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = PIDAnalysisJob
+        fields = [
+            'id', 'pid_drawing', 'status', 'current_pass', 'total_passes',
+            'progress', 'events', 'error_message', 'celery_task_id',
+            'created_at', 'started_at', 'completed_at', 'updated_at'
+        ]
+        read_only_fields = fields
+    
+    def get_total_passes(self, obj):
+        return PIDAnalysisJob.TOTAL_PASSES
+
+
 class PIDDrawingUploadSerializer(serializers.Serializer):
     """Serializer for P&ID drawing upload"""
     
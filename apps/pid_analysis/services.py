@@ -7,272 +7,21 @@ import base64
 import io
 import json
 import re
-from typing import Dict, List, Any, Optional, Set, Tuple
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
 from openai import OpenAI
 import fitz  # PyMuPDF
 from PIL import Image
+from .page_renderer import render_pdf_pages, mime_type_for
+from .pass_orchestrator import PassOrchestrator
+from apps.core.llm_cache import LLMResultCache, hash_file, hash_text
 
 
-class PIDAnalysisService:
-    """AI-Powered P&ID Analysis Service with Multi-Pass Validation"""
-
-    def __init__(self):
-        """Initialize OpenAI client with timeout"""
-        api_key = (
-            os.getenv('OPENAI_API_KEY') or
-            getattr(settings, 'OPENAI_API_KEY', None)
-        )
-        
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not configured")
-        
-        # Initialize OpenAI client with default timeout
-        self.client = OpenAI(
-            api_key=api_key,
-            timeout=180.0,  # 3 minute default timeout for all API calls
-            max_retries=2   # Retry failed requests twice
-        )
-        self.extracted_text = ""
-        self.instrument_tags = set()
-        self.equipment_tags = set()
-        self.line_numbers = set()
-        self.notes_references = set()
-        print('[INFO] Multi-Pass PID Analysis Service initialized with 180s timeout')
-
-    def analyze_pid_drawing(self, pdf_file, drawing_number: Optional[str] = None) -> Dict[str, Any]:
-        """
-        Multi-Pass P&ID Analysis with OCR, Vision, and Cross-Validation
-        
-        PASS 1: OCR Text Extraction - Extract all text, tags, notes, line numbers
-        PASS 2: Vision Analysis - Comprehensive visual inspection with chain-of-thought
-        PASS 3: Cross-Validation - Verify consistency between text and visual findings
-        PASS 4: Second Review - Re-analyze to catch missed issues
-        
-        Args:
-            pdf_file: Django FieldFile or file path
-            drawing_number: Optional drawing number for reference
-            
-        Returns:
-            Dictionary with comprehensive analysis results
-        """
-        try:
-            print(f"[INFO] ========== MULTI-PASS ANALYSIS START ==========")
-            print(f"[INFO] Drawing: {drawing_number or 'Unknown'}")
-            
-            # PASS 1: OCR Text Extraction
-            print(f"[INFO] PASS 1: OCR Text Extraction")
-            images_base64 = self._pdf_to_base64_images(pdf_file)
-            self._extract_text_from_pdf(pdf_file)
-            self._parse_extracted_data()
-            
-            print(f"[INFO] Extracted {len(self.instrument_tags)} instrument tags")
-            print(f"[INFO] Extracted {len(self.equipment_tags)} equipment tags")
-            print(f"[INFO] Extracted {len(self.line_numbers)} line numbers")
-            print(f"[INFO] Extracted {len(self.notes_references)} note references")
-            
-            # PASS 2: Vision Analysis with Chain-of-Thought
-            print(f"[INFO] PASS 2: Vision Analysis (Chain-of-Thought)")
-            try:
-                vision_result = self._vision_analysis_pass(images_base64)
-            except Exception as e:
-                print(f"[ERROR] PASS 2 failed: {str(e)}")
-                vision_result = {'issues': [], 'total_issues': 0, 'confidence': 'Low'}
-            
-            # PASS 3: Cross-Validation
-            print(f"[INFO] PASS 3: Cross-Validation & Consistency Checks")
-            try:
-                consistency_issues = self._cross_validation_pass(vision_result)
-            except Exception as e:
-                print(f"[ERROR] PASS 3 failed: {str(e)}")
-                consistency_issues = []
-            
-            # PASS 4: Second Review Pass (if insufficient issues found)
-            second_pass_issues = []
-            issues_found = vision_result.get('total_issues', 0)
-            if issues_found < 20:  # Target minimum 20 issues
-                print(f"[INFO] PASS 4: Second Review Pass (Only {issues_found} issues found, need minimum 20)")
-                try:
-                    second_pass_issues = self._second_review_pass(images_base64, vision_result, consistency_issues)
-                except Exception as e:
-                    print(f"[WARNING] PASS 4 failed (non-critical): {str(e)}")
-                    second_pass_issues = []
-            else:
-                print(f"[INFO] PASS 4: Skipped ({issues_found} issues already found)")
-
-            
-            # Merge all findings
-            all_issues = self._merge_and_deduplicate(
-                vision_result.get('issues', []),
-                consistency_issues,
-                second_pass_issues
-            )
-            
-            # If NO issues found at all, create at least one from OCR data
-            if len(all_issues) == 0:
-                print("[WARNING] No issues found in any pass - creating summary observation")
-                all_issues = [{
-                    'serial_number': 1,
-                    'pid_reference': 'DRAWING ANALYSIS',
-                    'issue_observed': f'Automated analysis completed. Found {len(self.instrument_tags)} instruments, {len(self.equipment_tags)} equipment tags, {len(self.line_numbers)} line numbers. Manual review recommended.',
-                    'action_required': 'Perform detailed manual review of the P&ID drawing for completeness and compliance',
-                    'severity': 'observation',
-                    'category': 'documentation',
-                    'location_on_drawing': {
-                        'zone': 'Middle-Center',
-                        'drawing_section': 'Overall Drawing',
-                        'proximity_description': 'Entire drawing scope',
-                        'visual_cues': 'Complete drawing review'
-                    }
-                }]
-            
-            # Categorize by severity
-            categorized = self._categorize_by_severity(all_issues)
-            
-            final_result = {
-                'issues': all_issues,
-                'critical_issues': categorized['critical'],
-                'major_observations': categorized['major'],
-                'minor_observations': categorized['minor'],
-                'total_issues': len(all_issues),
-                'critical_count': len(categorized['critical']),
-                'major_count': len(categorized['major']),
-                'minor_count': len(categorized['minor']),
-                'confidence': 'High' if len(all_issues) >= 15 else 'Medium',
-                'analysis_metadata': {
-                    'extracted_text_length': len(self.extracted_text),
-                    'instrument_tags_found': len(self.instrument_tags),
-                    'equipment_tags_found': len(self.equipment_tags),
-                    'line_numbers_found': len(self.line_numbers),
-                    'analysis_passes': 4,
-                    'multi_pass_enabled': True
-                }
-            }
-            
-            print(f"[INFO] ========== ANALYSIS COMPLETE ==========")
-            print(f"[INFO] Total Issues: {len(all_issues)}")
-            print(f"[INFO] Critical: {len(categorized['critical'])}, Major: {len(categorized['major'])}, Minor: {len(categorized['minor'])}")
-            
-            return final_result
-            
-        except Exception as e:
-            print(f"[ERROR] Analysis failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            raise
+# Prompts of the LLM passes. Their text is part of the result cache key
+# (PIDAnalysisService._analysis_fingerprint), so editing one invalidates cached analyses.
 
-    def _extract_text_from_pdf(self, pdf_file):
-        """Extract all text from PDF using OCR"""
-        try:
-            # Soft-coded approach: Handle both file paths and file objects (S3/Django FileField)
-            if isinstance(pdf_file, str):
-                # Local file path
-                doc = fitz.open(pdf_file)
-            else:
-                # File object (from S3 or Django FileField) - read content into memory
-                pdf_file.seek(0)  # Ensure we're at the start
-                pdf_bytes = pdf_file.read()
-                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-            
-            text_parts = []
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                text_parts.append(text)
-            
-            doc.close()
-            self.extracted_text = "\n".join(text_parts)
-            
-        except Exception as e:
-            print(f"[WARNING] OCR extraction failed: {str(e)}")
-            self.extracted_text = ""
-    
-    def _parse_extracted_data(self):
-        """Parse extracted text to identify tags, line numbers, notes with smart filtering"""
-        if not self.extracted_text:
-            return
-        
-        # Valid instrument prefixes (ISA-5.1 standard)
-        valid_instrument_prefixes = {
-            'FI', 'FIC', 'FIT', 'FE', 'FT', 'FV', 'FY', 'FCV', 'FICV',
-            'LI', 'LIC', 'LIT', 'LE', 'LT', 'LV', 'LY', 'LCV', 'LSH', 'LSL', 'LSHH', 'LSLL', 'LAH', 'LAL',
-            'PI', 'PIC', 'PIT', 'PE', 'PT', 'PV', 'PY', 'PCV', 'PSH', 'PSL', 'PSHH', 'PSLL', 'PAH', 'PAL', 'PDI', 'PDIC', 'PDIT',
-            'TI', 'TIC', 'TIT', 'TE', 'TT', 'TV', 'TY', 'TCV', 'TSH', 'TSL', 'TSHH', 'TSLL', 'TAH', 'TAL',
-            'AI', 'AIC', 'AIT', 'AE', 'AT', 'AV', 'AY', 'ACV', 'ASH', 'ASL',
-            'PSV', 'PRV', 'PDSV', 'TSV', 'ESV', 'XV', 'SDV', 'BDV', 'MOV', 'SOV',
-            'ZS', 'ZSH', 'ZSL', 'ZI', 'ZIC', 'ZIT',
-            'HS', 'HV', 'HY', 'HL', 'HIC',
-            'SI', 'SC', 'SE', 'SS', 'SV',
-            'WI', 'WIC', 'WIT', 'WE', 'WT',
-            'VI', 'VIC', 'VIT', 'VT',
-            'EI', 'EIC', 'EY',
-            'UI', 'UIC', 'UY'
-        }
-        
-        # Line number prefixes to exclude from instrument tags (common piping service codes)
-        line_number_prefixes = {
-            'HD', 'HU', 'CD', 'CU', 'LF', 'FL', 'SY', 'NG', 'FG', 'FW', 'BW', 
-            'CW', 'SW', 'DW', 'PW', 'HP', 'MP', 'LP', 'IA', 'NA', 'PA',
-            'HC', 'HO', 'CO', 'ST', 'CS', 'DS', 'SS', 'RW', 'WW', 'GN',
-            'N2', 'O2', 'CO2', 'H2', 'AR', 'HE'
-        }
-        
-        # Extract potential instrument tags
-        instrument_pattern = r'\b([A-Z]{2,4}[ICSVT]?[-_][\d]{1,4}(?:[-_][\d]{1,2}[A-Z]?)?)\b'
-        potential_instruments = set(re.findall(instrument_pattern, self.extracted_text))
-        
-        # Filter instrument tags: keep only valid ISA prefixes and exclude line number prefixes
-        self.instrument_tags = set()
-        for tag in potential_instruments:
-            prefix = tag.split('-')[0].upper()
-            # Check if prefix matches valid instrument tag or starts with valid prefix
-            is_valid_instrument = any(
-                prefix == valid_prefix or prefix.startswith(valid_prefix) 
-                for valid_prefix in valid_instrument_prefixes
-            )
-            # Exclude if it's a line number prefix
-            is_line_number = prefix in line_number_prefixes
-            
-            if is_valid_instrument and not is_line_number:
-                self.instrument_tags.add(tag)
-        
-        # Equipment tag patterns: V-3610-01, E-101, K-102, etc. (exclude single letter + small numbers that are likely P&ID refs)
-        equipment_pattern = r'\b([VEKPCHMXDTRS][-_][\d]{3,4}(?:[-_][\d]{1,2}[A-Z]?)?)\b'
-        potential_equipment = set(re.findall(equipment_pattern, self.extracted_text))
-        
-        # Filter equipment tags: exclude P&ID reference patterns (e.g., D-101, D-161 with numbers < 200 often P&ID numbers)
-        self.equipment_tags = set()
-        for tag in potential_equipment:
-            parts = tag.split('-')
-            if len(parts) >= 2:
-                prefix = parts[0]
-                number = parts[1]
-                # Exclude D-XXX patterns where XXX < 200 (likely P&ID numbers, not equipment)
-                if prefix == 'D' and number.isdigit() and int(number) < 200:
-                    continue  # Skip likely P&ID reference
-                # Exclude P-XXX patterns where XXX < 400 (likely line numbers or P&ID refs)
-                if prefix == 'P' and number.isdigit() and int(number) < 400:
-                    continue  # Skip likely line/P&ID reference
-                self.equipment_tags.add(tag)
-        
-        # Line number patterns: 6"-N2-1001-C4N, 3"-HC-2003, etc.
-        line_pattern = r'\b([\d]+"?[-][A-Z]{1,4}[-][\d]{3,4}(?:[-][A-Z\d]+)?)\b'
-        self.line_numbers = set(re.findall(line_pattern, self.extracted_text))
-        
-        # Note references: NOTE 1, NOTE 2, HOLD 1, etc.
-        note_pattern = r'\b((?:NOTE|HOLD|REF)[\s]*[\d]+)\b'
-        self.notes_references = set(re.findall(note_pattern, self.extracted_text, re.IGNORECASE))
-    
-    def _vision_analysis_pass(self, images_base64: List[str]) -> Dict[str, Any]:
-        """PASS 2: Vision-based analysis with chain-of-thought"""
-    def _vision_analysis_pass(self, images_base64: List[str]) -> Dict[str, Any]:
-        """PASS 2: Vision-based analysis with chain-of-thought"""
-        try:
-            messages = [
-                {
-                    "role": "system",
-                    "content": """You are a Senior P&ID Verification Engineer performing HAZOP-level review.
+VISION_SYSTEM_PROMPT = """You are a Senior P&ID Verification Engineer performing HAZOP-level review.
 
 **CRITICAL INSTRUCTION - READ CAREFULLY:**
 🚨 DO NOT STOP AFTER FINDING ONE OR TWO ISSUES 🚨
@@ -462,13 +211,9 @@ Before listing issues, you MUST think through:
 - **CREATE SEPARATE ISSUES** for each missing HOLD/NOTE requirement
 - **FORMAT**: "HOLD-X NOT IMPLEMENTED: [specific missing element]" or "NOTE-Y NON-COMPLIANT: [specific violation]"
 """
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": f"""🚨 CRITICAL INSTRUCTION: EXHAUSTIVE P&ID VERIFICATION 🚨
+
+# Formatted with instrument_tags, equipment_tags and line_numbers
+VISION_USER_PROMPT = """🚨 CRITICAL INSTRUCTION: EXHAUSTIVE P&ID VERIFICATION 🚨
 
 YOU MUST FIND AT LEAST 20-30 ISSUES PER DRAWING. BE THOROUGH AND METICULOUS!
 
@@ -591,9 +336,9 @@ Create issues in THREE categories:
    - Create individual issues for EACH missing/violated requirement
 
 **EXTRACTED TEXT DATA (Use for cross-validation):**
-Instrument Tags Found: {', '.join(list(self.instrument_tags)[:20]) if self.instrument_tags else 'None'}
-Equipment Tags Found: {', '.join(list(self.equipment_tags)[:20]) if self.equipment_tags else 'None'}
-Line Numbers Found: {', '.join(list(self.line_numbers)[:20]) if self.line_numbers else 'None'}
+Instrument Tags Found: {instrument_tags}
+Equipment Tags Found: {equipment_tags}
+Line Numbers Found: {line_numbers}
 
 **YOUR MANDATORY TASKS:**
 1. Verify EVERY instrument has range, alarms, fail-safe
@@ -634,24 +379,427 @@ Line Numbers Found: {', '.join(list(self.line_numbers)[:20]) if self.line_number
 ✅ Do I have AT LEAST 15-20 issues total?
 
 Return ONLY valid JSON. NO other text."""
-                        }
-                    ] + [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{img}",
-                                "detail": "high"
-                            }
-                        }
-                        for img in images_base64
-                    ]
-                }
-            ]
-            
-            print("[INFO] Calling OpenAI Vision API (Pass 2: Chain-of-Thought)...")
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages,
+
+SECOND_REVIEW_SYSTEM_PROMPT = """You are performing a SECOND REVIEW pass on a P&ID drawing.
+
+🔍 **CRITICAL MISSION: Find what was MISSED in the first analysis** 🔍
+
+**WHAT TO LOOK FOR:**
+- Issues that were overlooked in first pass
+- Additional details on equipment not fully analyzed
+- Lines/valves that weren't examined
+- Safety devices not mentioned
+- Control loops not validated
+- Instruments without complete data
+- Any contradictions or conflicts
+
+**FOCUS AREAS:**
+1. Items mentioned in OCR but not in first pass
+2. Equipment visible but not fully analyzed
+3. Missing cross-references
+4. Incomplete data on previously identified items
+5. Any safety-critical elements
+
+**OUTPUT FORMAT - JSON ONLY:**
+{
+    "issues": [
+        {
+            "serial_number": 1,
+            "pid_reference": "Tag/Line/Equipment",
+            "issue_observed": "What was missed",
+            "action_required": "What to do",
+            "severity": "critical/major/minor/observation",
+            "category": "instrument/equipment/piping/valve/safety/documentation",
+            "location_on_drawing": {
+                "zone": "Zone",
+                "drawing_section": "Section",
+                "proximity_description": "Near X",
+                "visual_cues": "Visual location"
+            }
+        }
+    ],
+    "total_issues": 0
+}"""
+
+# Formatted with first_pass_issues and consistency_count
+SECOND_REVIEW_USER_PROMPT = """Perform SECOND REVIEW PASS to find MISSED issues.
+
+**FIRST PASS FOUND:**
+{first_pass_issues}
+
+**CONSISTENCY CHECK FOUND:**
+- {consistency_count} additional issues from text/visual cross-validation
+
+**YOUR MISSION:**
+Find issues that were MISSED. Look for:
+- Any instruments NOT mentioned in first pass
+- Any equipment NOT fully analyzed
+- Any lines/valves NOT examined
+- Any safety devices NOT validated
+- Any incomplete specifications
+
+Focus on catching what was overlooked. Target: 5-10 additional findings.
+Return ONLY JSON."""
+
+
+class PIDAnalysisService:
+    """AI-Powered P&ID Analysis Service with Multi-Pass Validation"""
+    
+    MODEL = "gpt-4o"
+    
+    # Part of the result cache key next to the prompt texts: bump whenever a
+    # result-shaping rule without a prompt changes (tag parsing, the pass 3
+    # cross-validation checks, merge/dedup, severity mapping)
+    RULES_VERSION = '2'
+    
+    result_cache = LLMResultCache('pid_analysis')
+
+    def __init__(self):
+        """Initialize OpenAI client with timeout"""
+        api_key = (
+            os.getenv('OPENAI_API_KEY') or
+            getattr(settings, 'OPENAI_API_KEY', None)
+        )
+        
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not configured")
+        
+        # Initialize OpenAI client with default timeout
+        self.client = OpenAI(
+            api_key=api_key,
+            timeout=180.0,  # 3 minute default timeout for all API calls
+            max_retries=2   # Retry failed requests twice
+        )
+        self.extracted_text = ""
+        self.instrument_tags = set()
+        self.equipment_tags = set()
+        self.line_numbers = set()
+        self.notes_references = set()
+        self.image_mime_type = 'image/png'
+        print('[INFO] Multi-Pass PID Analysis Service initialized with 180s timeout')
+
+    def analyze_pid_drawing(
+        self,
+        pdf_file,
+        drawing_number: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, str], None]] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Multi-Pass P&ID Analysis with OCR, Vision, and Cross-Validation
+        
+        PASS 1: OCR Text Extraction - Extract all text, tags, notes, line numbers
+        PASS 2: Vision Analysis - Comprehensive visual inspection with chain-of-thought
+        PASS 3: Cross-Validation - Verify consistency between text and visual findings
+        PASS 4: Second Review - Re-analyze to catch missed issues
+        
+        Args:
+            pdf_file: Django FieldFile or file path
+            drawing_number: Optional drawing number for reference
+            progress_callback: Optional callable(pass_number, message) invoked as each pass starts
+            use_cache: Serve/store results in the content-addressed result cache (False = bypass)
+            
+        Returns:
+            Dictionary with comprehensive analysis results
+        """
+        try:
+            print(f"[INFO] ========== MULTI-PASS ANALYSIS START ==========")
+            print(f"[INFO] Drawing: {drawing_number or 'Unknown'}")
+            
+            # Identical file + model + prompts => identical analysis; skip the GPT-4o passes
+            cache_key = self.result_cache.make_key(hash_file(pdf_file), self.MODEL, self._analysis_fingerprint())
+            if use_cache:
+                cached_result = self.result_cache.get(cache_key)
+                if cached_result is not None:
+                    print(f"[INFO] Serving analysis from result cache")
+                    self._report_progress(progress_callback, 4, 'Served from result cache')
+                    cached_result.setdefault('analysis_metadata', {})['cache_hit'] = True
+                    return cached_result
+            
+            # PASS 1: OCR Text Extraction
+            print(f"[INFO] PASS 1: OCR Text Extraction")
+            self._report_progress(progress_callback, 1, 'OCR text extraction')
+            images_base64 = self._pdf_to_base64_images(pdf_file)
+            self._extract_text_from_pdf(pdf_file)
+            self._parse_extracted_data()
+            
+            print(f"[INFO] Extracted {len(self.instrument_tags)} instrument tags")
+            print(f"[INFO] Extracted {len(self.equipment_tags)} equipment tags")
+            print(f"[INFO] Extracted {len(self.line_numbers)} line numbers")
+            print(f"[INFO] Extracted {len(self.notes_references)} note references")
+            
+            # PASS 2 runs on the orchestrator so a hung vision call times out instead
+            # of holding the analysis; PASS 4 builds on the findings of passes 2 and 3
+            empty_vision = {'issues': [], 'total_issues': 0, 'confidence': 'Low'}
+            timeouts = getattr(settings, 'PID_PASS_TIMEOUTS', {})
+            min_issues = getattr(settings, 'PID_SECOND_REVIEW_MIN_ISSUES', 20)  # Target minimum 20 issues
+            
+            with PassOrchestrator(max_workers=2) as orchestrator:
+                print(f"[INFO] PASS 2: Vision Analysis (Chain-of-Thought)")
+                self._report_progress(progress_callback, 2, 'Vision analysis')
+                orchestrator.submit(
+                    'vision', self._vision_analysis_pass, images_base64,
+                    timeout=timeouts.get('vision', 660)
+                )
+                vision_result = orchestrator.result('vision', default=empty_vision) or empty_vision
+                
+                # PASS 3: Cross-Validation
+                print(f"[INFO] PASS 3: Cross-Validation & Consistency Checks")
+                self._report_progress(progress_callback, 3, 'Cross-validation')
+                try:
+                    consistency_issues = self._cross_validation_pass(vision_result)
+                except SoftTimeLimitExceeded:
+                    raise
+                except Exception as e:
+                    print(f"[ERROR] PASS 3 failed: {str(e)}")
+                    consistency_issues = []
+                
+                # PASS 4: Second Review Pass (if insufficient issues found)
+                issues_found = vision_result.get('total_issues', 0)
+                if issues_found < min_issues:
+                    print(f"[INFO] PASS 4: Second Review Pass (Only {issues_found} issues found, need minimum {min_issues})")
+                    self._report_progress(progress_callback, 4, 'Second review')
+                    orchestrator.submit(
+                        'second_review', self._second_review_pass,
+                        images_base64, vision_result, consistency_issues,
+                        timeout=timeouts.get('second_review', 90)
+                    )
+                    second_pass_issues = orchestrator.result('second_review', default=[]) or []
+                else:
+                    second_pass_issues = []
+                    print(f"[INFO] PASS 4: Skipped ({issues_found} issues already found)")
+                    self._report_progress(progress_callback, 4, f'Second review skipped ({issues_found} issues found)')
+            
+            # Merge all findings
+            all_issues = self._merge_and_deduplicate(
+                vision_result.get('issues', []),
+                consistency_issues,
+                second_pass_issues
+            )
+            
+            # If NO issues found at all, create at least one from OCR data
+            if len(all_issues) == 0:
+                print("[WARNING] No issues found in any pass - creating summary observation")
+                all_issues = [{
+                    'serial_number': 1,
+                    'pid_reference': 'DRAWING ANALYSIS',
+                    'issue_observed': f'Automated analysis completed. Found {len(self.instrument_tags)} instruments, {len(self.equipment_tags)} equipment tags, {len(self.line_numbers)} line numbers. Manual review recommended.',
+                    'action_required': 'Perform detailed manual review of the P&ID drawing for completeness and compliance',
+                    'severity': 'observation',
+                    'category': 'documentation',
+                    'location_on_drawing': {
+                        'zone': 'Middle-Center',
+                        'drawing_section': 'Overall Drawing',
+                        'proximity_description': 'Entire drawing scope',
+                        'visual_cues': 'Complete drawing review'
+                    }
+                }]
+            
+            # Categorize by severity
+            categorized = self._categorize_by_severity(all_issues)
+            
+            final_result = {
+                'issues': all_issues,
+                'critical_issues': categorized['critical'],
+                'major_observations': categorized['major'],
+                'minor_observations': categorized['minor'],
+                'total_issues': len(all_issues),
+                'critical_count': len(categorized['critical']),
+                'major_count': len(categorized['major']),
+                'minor_count': len(categorized['minor']),
+                'confidence': 'High' if len(all_issues) >= 15 else 'Medium',
+                'analysis_metadata': {
+                    'extracted_text_length': len(self.extracted_text),
+                    'instrument_tags_found': len(self.instrument_tags),
+                    'equipment_tags_found': len(self.equipment_tags),
+                    'line_numbers_found': len(self.line_numbers),
+                    'analysis_passes': 4,
+                    'multi_pass_enabled': True,
+                    'cache_hit': False
+                }
+            }
+            
+            # Only cache complete runs - a failed/unparseable vision pass should be retried next time
+            if vision_result.get('tokens_used') and not vision_result.get('parsing_error'):
+                self.result_cache.set(cache_key, final_result)
+            
+            print(f"[INFO] ========== ANALYSIS COMPLETE ==========")
+            print(f"[INFO] Total Issues: {len(all_issues)}")
+            print(f"[INFO] Critical: {len(categorized['critical'])}, Major: {len(categorized['major'])}, Minor: {len(categorized['minor'])}")
+            
+            return final_result
+            
+        except Exception as e:
+            print(f"[ERROR] Analysis failed: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            raise
+
+    def _analysis_fingerprint(self) -> str:
+        """Hash of the prompts, the rules version and the settings that shape the result (rendering included)"""
+        return hash_text(
+            VISION_SYSTEM_PROMPT,
+            VISION_USER_PROMPT,
+            SECOND_REVIEW_SYSTEM_PROMPT,
+            SECOND_REVIEW_USER_PROMPT,
+            self.RULES_VERSION,
+            getattr(settings, 'PID_RENDER_FORMAT', 'png'),
+            getattr(settings, 'PID_RENDER_DPI', 300),
+            getattr(settings, 'PID_RENDER_QUALITY', 85),
+            getattr(settings, 'PID_RENDER_MAX_EDGE_PX', 6000),
+            getattr(settings, 'PID_SECOND_REVIEW_MIN_ISSUES', 20),
+        )
+
+    def _report_progress(self, progress_callback, pass_number: int, message: str):
+        """Notify the caller (e.g. a Celery job) that a pass has started - never fails the analysis"""
+        if not progress_callback:
+            return
+        try:
+            progress_callback(pass_number, message)
+        except Exception as e:
+            print(f"[WARNING] Progress callback failed: {str(e)}")
+
+    def _extract_text_from_pdf(self, pdf_file):
+        """Extract all text from PDF using OCR"""
+        try:
+            # Soft-coded approach: Handle both file paths and file objects (S3/Django FileField)
+            if isinstance(pdf_file, str):
+                # Local file path
+                doc = fitz.open(pdf_file)
+            else:
+                # File object (from S3 or Django FileField) - read content into memory
+                pdf_file.seek(0)  # Ensure we're at the start
+                pdf_bytes = pdf_file.read()
+                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+            
+            text_parts = []
+            
+            for page_num in range(len(doc)):
+                page = doc.load_page(page_num)
+                text = page.get_text()
+                text_parts.append(text)
+            
+            doc.close()
+            self.extracted_text = "\n".join(text_parts)
+            
+        except Exception as e:
+            print(f"[WARNING] OCR extraction failed: {str(e)}")
+            self.extracted_text = ""
+    
+    def _parse_extracted_data(self):
+        """Parse extracted text to identify tags, line numbers, notes with smart filtering"""
+        if not self.extracted_text:
+            return
+        
+        # Valid instrument prefixes (ISA-5.1 standard)
+        valid_instrument_prefixes = {
+            'FI', 'FIC', 'FIT', 'FE', 'FT', 'FV', 'FY', 'FCV', 'FICV',
+            'LI', 'LIC', 'LIT', 'LE', 'LT', 'LV', 'LY', 'LCV', 'LSH', 'LSL', 'LSHH', 'LSLL', 'LAH', 'LAL',
+            'PI', 'PIC', 'PIT', 'PE', 'PT', 'PV', 'PY', 'PCV', 'PSH', 'PSL', 'PSHH', 'PSLL', 'PAH', 'PAL', 'PDI', 'PDIC', 'PDIT',
+            'TI', 'TIC', 'TIT', 'TE', 'TT', 'TV', 'TY', 'TCV', 'TSH', 'TSL', 'TSHH', 'TSLL', 'TAH', 'TAL',
+            'AI', 'AIC', 'AIT', 'AE', 'AT', 'AV', 'AY', 'ACV', 'ASH', 'ASL',
+            'PSV', 'PRV', 'PDSV', 'TSV', 'ESV', 'XV', 'SDV', 'BDV', 'MOV', 'SOV',
+            'ZS', 'ZSH', 'ZSL', 'ZI', 'ZIC', 'ZIT',
+            'HS', 'HV', 'HY', 'HL', 'HIC',
+            'SI', 'SC', 'SE', 'SS', 'SV',
+            'WI', 'WIC', 'WIT', 'WE', 'WT',
+            'VI', 'VIC', 'VIT', 'VT',
+            'EI', 'EIC', 'EY',
+            'UI', 'UIC', 'UY'
+        }
+        
+        # Line number prefixes to exclude from instrument tags (common piping service codes)
+        line_number_prefixes = {
+            'HD', 'HU', 'CD', 'CU', 'LF', 'FL', 'SY', 'NG', 'FG', 'FW', 'BW', 
+            'CW', 'SW', 'DW', 'PW', 'HP', 'MP', 'LP', 'IA', 'NA', 'PA',
+            'HC', 'HO', 'CO', 'ST', 'CS', 'DS', 'SS', 'RW', 'WW', 'GN',
+            'N2', 'O2', 'CO2', 'H2', 'AR', 'HE'
+        }
+        
+        # Extract potential instrument tags
+        instrument_pattern = r'\b([A-Z]{2,4}[ICSVT]?[-_][\d]{1,4}(?:[-_][\d]{1,2}[A-Z]?)?)\b'
+        potential_instruments = set(re.findall(instrument_pattern, self.extracted_text))
+        
+        # Filter instrument tags: keep only valid ISA prefixes and exclude line number prefixes
+        self.instrument_tags = set()
+        for tag in potential_instruments:
+            prefix = tag.split('-')[0].upper()
+            # Check if prefix matches valid instrument tag or starts with valid prefix
+            is_valid_instrument = any(
+                prefix == valid_prefix or prefix.startswith(valid_prefix) 
+                for valid_prefix in valid_instrument_prefixes
+            )
+            # Exclude if it's a line number prefix
+            is_line_number = prefix in line_number_prefixes
+            
+            if is_valid_instrument and not is_line_number:
+                self.instrument_tags.add(tag)
+        
+        # Equipment tag patterns: V-3610-01, E-101, K-102, etc. (exclude single letter + small numbers that are likely P&ID refs)
+        equipment_pattern = r'\b([VEKPCHMXDTRS][-_][\d]{3,4}(?:[-_][\d]{1,2}[A-Z]?)?)\b'
+        potential_equipment = set(re.findall(equipment_pattern, self.extracted_text))
+        
+        # Filter equipment tags: exclude P&ID reference patterns (e.g., D-101, D-161 with numbers < 200 often P&ID numbers)
+        self.equipment_tags = set()
+        for tag in potential_equipment:
+            parts = tag.split('-')
+            if len(parts) >= 2:
+                prefix = parts[0]
+                number = parts[1]
+                # Exclude D-XXX patterns where XXX < 200 (likely P&ID numbers, not equipment)
+                if prefix == 'D' and number.isdigit() and int(number) < 200:
+                    continue  # Skip likely P&ID reference
+                # Exclude P-XXX patterns where XXX < 400 (likely line numbers or P&ID refs)
+                if prefix == 'P' and number.isdigit() and int(number) < 400:
+                    continue  # Skip likely line/P&ID reference
+                self.equipment_tags.add(tag)
+        
+        # Line number patterns: 6"-N2-1001-C4N, 3"-HC-2003, etc.
+        line_pattern = r'\b([\d]+"?[-][A-Z]{1,4}[-][\d]{3,4}(?:[-][A-Z\d]+)?)\b'
+        self.line_numbers = set(re.findall(line_pattern, self.extracted_text))
+        
+        # Note references: NOTE 1, NOTE 2, HOLD 1, etc.
+        note_pattern = r'\b((?:NOTE|HOLD|REF)[\s]*[\d]+)\b'
+        self.notes_references = set(re.findall(note_pattern, self.extracted_text, re.IGNORECASE))
+    
+    def _vision_analysis_pass(self, images_base64: List[str]) -> Dict[str, Any]:
+        """PASS 2: Vision-based analysis with chain-of-thought"""
+    def _vision_analysis_pass(self, images_base64: List[str]) -> Dict[str, Any]:
+        """PASS 2: Vision-based analysis with chain-of-thought"""
+        try:
+            messages = [
+                {
+                    "role": "system",
+                    "content": VISION_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": VISION_USER_PROMPT.format(
+                                instrument_tags=', '.join(list(self.instrument_tags)[:20]) if self.instrument_tags else 'None',
+                                equipment_tags=', '.join(list(self.equipment_tags)[:20]) if self.equipment_tags else 'None',
+                                line_numbers=', '.join(list(self.line_numbers)[:20]) if self.line_numbers else 'None',
+                            )
+                        }
+                    ] + [
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:{self.image_mime_type};base64,{img}",
+                                "detail": "high"
+                            }
+                        }
+                        for img in images_base64
+                    ]
+                }
+            ]
+            
+            print("[INFO] Calling OpenAI Vision API (Pass 2: Chain-of-Thought)...")
+            response = self.client.chat.completions.create(
+                model=self.MODEL,
+                messages=messages,
                 max_tokens=16384,  # Maximum for comprehensive 40+ issue reports
                 temperature=0.3,  # Lower for more consistent, thorough analysis
                 timeout=600  # 10 minute timeout for comprehensive analysis
@@ -779,76 +927,23 @@ Return ONLY valid JSON. NO other text."""
             messages = [
                 {
                     "role": "system",
-                    "content": """You are performing a SECOND REVIEW pass on a P&ID drawing.
-
-🔍 **CRITICAL MISSION: Find what was MISSED in the first analysis** 🔍
-
-**WHAT TO LOOK FOR:**
-- Issues that were overlooked in first pass
-- Additional details on equipment not fully analyzed
-- Lines/valves that weren't examined
-- Safety devices not mentioned
-- Control loops not validated
-- Instruments without complete data
-- Any contradictions or conflicts
-
-**FOCUS AREAS:**
-1. Items mentioned in OCR but not in first pass
-2. Equipment visible but not fully analyzed
-3. Missing cross-references
-4. Incomplete data on previously identified items
-5. Any safety-critical elements
-
-**OUTPUT FORMAT - JSON ONLY:**
-{
-    "issues": [
-        {
-            "serial_number": 1,
-            "pid_reference": "Tag/Line/Equipment",
-            "issue_observed": "What was missed",
-            "action_required": "What to do",
-            "severity": "critical/major/minor/observation",
-            "category": "instrument/equipment/piping/valve/safety/documentation",
-            "location_on_drawing": {
-                "zone": "Zone",
-                "drawing_section": "Section",
-                "proximity_description": "Near X",
-                "visual_cues": "Visual location"
-            }
-        }
-    ],
-    "total_issues": 0
-}"""
+                    "content": SECOND_REVIEW_SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
                     "content": [
                         {
                             "type": "text",
-                            "text": f"""Perform SECOND REVIEW PASS to find MISSED issues.
-
-**FIRST PASS FOUND:**
-{chr(10).join(first_pass_issues)}
-
-**CONSISTENCY CHECK FOUND:**
-- {len(consistency)} additional issues from text/visual cross-validation
-
-**YOUR MISSION:**
-Find issues that were MISSED. Look for:
-- Any instruments NOT mentioned in first pass
-- Any equipment NOT fully analyzed
-- Any lines/valves NOT examined
-- Any safety devices NOT validated
-- Any incomplete specifications
-
-Focus on catching what was overlooked. Target: 5-10 additional findings.
-Return ONLY JSON."""
+                            "text": SECOND_REVIEW_USER_PROMPT.format(
+                                first_pass_issues=chr(10).join(first_pass_issues),
+                                consistency_count=len(consistency),
+                            )
                         }
                     ] + [
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/png;base64,{img}",
+                                "url": f"data:{self.image_mime_type};base64,{img}",
                                 "detail": "high"
                             }
                         }
@@ -859,7 +954,7 @@ Return ONLY JSON."""
             
             print("[INFO] Calling OpenAI for second review pass...")
             response = self.client.chat.completions.create(
-                model="gpt-4o",
+                model=self.MODEL,
                 messages=messages,
                 max_tokens=8000,
                 temperature=0.5,  # Higher creativity to find missed items
@@ -974,115 +1069,50 @@ Return ONLY JSON."""
                 'parsing_error': True
             }
 
-    def _pdf_to_base64_images(self, pdf_file, dpi: int = 300) -> List[str]:
+    def _pdf_to_base64_images(
+        self,
+        pdf_file,
+        dpi: Optional[int] = None,
+        image_format: Optional[str] = None,
+        quality: Optional[int] = None,
+        max_workers: Optional[int] = None
+    ) -> List[str]:
         """
-        Convert PDF pages to base64-encoded PNG images
+        Convert PDF pages to base64-encoded images
+        
+        Pages are rendered and encoded concurrently in worker processes.
+        Large sheets get a lower DPI so the long edge stays within
+        PID_RENDER_MAX_EDGE_PX.
         
         Args:
             pdf_file: Django FieldFile or file path
-            dpi: Resolution for rendering (default: 300 for high detail)
+            dpi: Maximum resolution for rendering (default: PID_RENDER_DPI setting, 300)
+            image_format: png/jpeg/webp (default: PID_RENDER_FORMAT setting)
+            quality: JPEG/WebP quality (default: PID_RENDER_QUALITY setting)
+            max_workers: Render processes (default: PID_RENDER_WORKERS setting, 0 = CPU count)
             
         Returns:
             List of base64-encoded image strings
         """
-        images_base64 = []
+        dpi = dpi or getattr(settings, 'PID_RENDER_DPI', 300)
+        image_format = image_format or getattr(settings, 'PID_RENDER_FORMAT', 'png')
+        quality = quality or getattr(settings, 'PID_RENDER_QUALITY', 85)
+        if max_workers is None:
+            max_workers = getattr(settings, 'PID_RENDER_WORKERS', 0) or None
         
         try:
-            # Soft-coded approach: Handle both file paths and file objects (S3/Django FileField)
-            if isinstance(pdf_file, str):
-                # Local file path
-                doc = fitz.open(pdf_file)
-            else:
-                # File object (from S3 or Django FileField) - read content into memory
-                pdf_file.seek(0)  # Ensure we're at the start
-                pdf_bytes = pdf_file.read()
-                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-            
-            # Convert each page
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                
-                # Render to image
-                mat = fitz.Matrix(dpi/72, dpi/72)
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Convert to PIL Image
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                
-                # Convert to base64
-                buffer = io.BytesIO()
-                img.save(buffer, format="PNG", optimize=True)
-                img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                images_base64.append(img_base64)
-            
-            doc.close()
+            images_base64 = render_pdf_pages(
+                pdf_file,
+                dpi=dpi,
+                image_format=image_format,
+                quality=quality,
+                max_edge_px=getattr(settings, 'PID_RENDER_MAX_EDGE_PX', 6000),
+                max_workers=max_workers
+            )
+            # Data URLs sent to the vision model must match the encoding
+            self.image_mime_type = mime_type_for(image_format)
             return images_base64
             
         except Exception as e:
             print(f"[ERROR] PDF conversion failed: {str(e)}")
             raise
-
-    def generate_report_summary(self, issues: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """
-        Generate summary statistics from analysis issues
-        
-        Args:
-            issues: List of identified issues
-            
-        Returns:
-            Dictionary with summary statistics
-        """
-        if not issues:
-            return {
-                'total_issues': 0,
-                'critical_count': 0,
-                'major_count': 0,
-                'minor_count': 0,
-                'observation_count': 0,
-                'approved_count': 0,
-                'ignored_count': 0,
-                'pending_count': 0,
-                'categories': {}
-            }
-        
-        # Count by severity
-        severity_counts = {
-            'critical': 0,
-            'major': 0,
-            'minor': 0,
-            'observation': 0
-        }
-        
-        # Count by status
-        status_counts = {
-            'approved': 0,
-            'ignored': 0,
-            'pending': 0
-        }
-        
-        # Count by category
-        categories = {}
-        
-        for issue in issues:
-            severity = issue.get('severity', 'observation').lower()
-            if severity in severity_counts:
-                severity_counts[severity] += 1
-            
-            status = issue.get('status', 'pending').lower()
-            if status in status_counts:
-                status_counts[status] += 1
-            
-            category = issue.get('category', 'general')
-            categories[category] = categories.get(category, 0) + 1
-        
-        return {
-            'total_issues': len(issues),
-            'critical_count': severity_counts['critical'],
-            'major_count': severity_counts['major'],
-            'minor_count': severity_counts['minor'],
-            'observation_count': severity_counts['observation'],
-            'approved_count': status_counts['approved'],
-            'ignored_count': status_counts['ignored'],
-            'pending_count': status_counts['pending'],
-            'categories': categories
-        }
@@ -0,0 +1,84 @@
+"""
+P&ID Analysis Signals
+"""
+import logging
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from apps.users.history_stats import adjust_user_history_stats
+from .models import ReferenceDocument, PIDDrawing, PIDAnalysisReport
+from .embedding_index import embedding_index
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=ReferenceDocument)
+@receiver(post_delete, sender=ReferenceDocument)
+def invalidate_embedding_index(sender, instance, **kwargs):
+    """
+    Rebuild the RAG embedding index after a document is activated,
+    deactivated, reprocessed or deleted
+    """
+    embedding_index.invalidate()
+
+
+@receiver(post_delete, sender=PIDAnalysisReport)
+def delete_report_artifacts(sender, instance, **kwargs):
+    """
+    Remove stored PDF/Excel exports with their report (re-analysis replaces
+    the report, so they would otherwise accumulate in storage)
+    """
+    for field_file in (instance.pdf_report, instance.excel_report):
+        if not field_file:
+            continue
+        try:
+            field_file.storage.delete(field_file.name)
+        except Exception as e:
+            logger.warning(f"Could not delete report artifact {field_file.name}: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Per-user history statistics (apps.users.UserHistoryStats)
+# ---------------------------------------------------------------------------
+
+def _drawing_owner_id(drawing_id):
+    return PIDDrawing.objects.filter(pk=drawing_id).values_list('uploaded_by_id', flat=True).first()
+
+
+@receiver(post_save, sender=PIDDrawing)
+def count_drawing_upload(sender, instance, created, **kwargs):
+    if created:
+        adjust_user_history_stats(instance.uploaded_by_id, pid_uploads=1)
+
+
+@receiver(post_delete, sender=PIDDrawing)
+def uncount_drawing_upload(sender, instance, **kwargs):
+    adjust_user_history_stats(instance.uploaded_by_id, pid_uploads=-1)
+
+
+@receiver(post_init, sender=PIDAnalysisReport)
+def remember_report_issue_total(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not loaded
+    instance._counted_total_issues = instance.__dict__.get('total_issues')
+
+
+@receiver(post_save, sender=PIDAnalysisReport)
+def count_report(sender, instance, created, **kwargs):
+    previous = instance._counted_total_issues
+    instance._counted_total_issues = instance.total_issues
+    if created:
+        deltas = {'pid_analyses': 1, 'pid_issues_found': instance.total_issues}
+    elif previous is not None and previous != instance.total_issues:
+        deltas = {'pid_issues_found': instance.total_issues - previous}
+    else:
+        return
+    adjust_user_history_stats(_drawing_owner_id(instance.pid_drawing_id), **deltas)
+
+
+@receiver(post_delete, sender=PIDAnalysisReport)
+def uncount_report(sender, instance, **kwargs):
+    # Sent before the drawing row is deleted, even when the delete cascades from it
+    adjust_user_history_stats(
+        _drawing_owner_id(instance.pid_drawing_id),
+        pid_analyses=-1,
+        pid_issues_found=-instance.total_issues
+    )
@@ -0,0 +1,201 @@
+"""
+P&ID Analysis Celery Tasks
+Runs the multi-pass analysis on a worker so web requests return immediately
+"""
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PIDDrawing, PIDAnalysisJob
+from .persistence import save_analysis_result
+
+logger = logging.getLogger(__name__)
+
+
+def describe_analysis_error(error: Exception) -> str:
+    """Map analysis exceptions to a user-facing message"""
+    error_message = str(error)
+
+    if "OPENAI_API_KEY" in error_message or "API key" in error_message:
+        return "OpenAI API key is not configured or invalid. Please contact administrator."
+    if "quota" in error_message.lower():
+        return "OpenAI API quota exceeded. Please contact administrator."
+    if "rate_limit" in error_message.lower():
+        return "Too many requests. Please wait a moment and try again."
+    if "invalid JSON" in error_message:
+        return f"Analysis processing error: {error_message}"
+    return f"Analysis failed: {error_message}"
+
+
+def _mark_failed(job: PIDAnalysisJob, drawing: PIDDrawing, job_message: str, drawing_message: str):
+    """Record a failed job and release its drawing from 'processing'"""
+    drawing.status = 'failed'
+    drawing.error_message = drawing_message[:500]
+    drawing.save(update_fields=['status', 'error_message', 'updated_at'])
+
+    job.status = 'failed'
+    job.error_message = job_message
+    job.completed_at = timezone.now()
+    job.save(update_fields=['status', 'error_message', 'completed_at', 'updated_at'])
+
+
+def expire_stale_jobs(drawing: PIDDrawing) -> int:
+    """
+    Fail unfinished jobs of a drawing that are older than the task time limit
+
+    A worker killed by CELERY_TASK_TIME_LIMIT (or lost) never updates its job,
+    which would leave the drawing 'processing' and block any new analysis.
+
+    Returns:
+        Number of jobs marked failed
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'CELERY_TASK_TIME_LIMIT', 1800))
+    stale = drawing.analysis_jobs.filter(status__in=['queued', 'running']).filter(
+        Q(started_at__lt=cutoff) | Q(started_at__isnull=True, created_at__lt=cutoff)
+    )
+    expired = stale.update(
+        status='failed',
+        error_message='Analysis timed out. Please try again.',
+        completed_at=timezone.now(),
+        updated_at=timezone.now()
+    )
+    if expired:
+        logger.warning(f"[PID JOB] Expired {expired} stale job(s) for drawing {drawing.id}")
+
+    if drawing.status == 'processing' and not drawing.analysis_jobs.filter(status__in=['queued', 'running']).exists():
+        started = drawing.analysis_started_at
+        if expired or started is None or started < cutoff:
+            drawing.status = 'failed'
+            drawing.error_message = 'Analysis timed out'
+            drawing.save(update_fields=['status', 'error_message', 'updated_at'])
+    return expired
+
+
+def enqueue_pid_analysis(drawing: PIDDrawing, user=None, use_cache: bool = True) -> PIDAnalysisJob:
+    """
+    Create an analysis job for a drawing and hand it to the Celery queue
+
+    Set PID_ANALYSIS_ASYNC=False to run the job in-process (no worker required).
+    use_cache=False forces fresh GPT-4o passes instead of a cached result.
+    """
+    expire_stale_jobs(drawing)
+
+    job = PIDAnalysisJob.objects.create(
+        pid_drawing=drawing,
+        requested_by=user if user and user.is_authenticated else None,
+    )
+
+    drawing.status = 'processing'
+    drawing.analysis_started_at = timezone.now()
+    drawing.error_message = None
+    drawing.save(update_fields=['status', 'analysis_started_at', 'error_message', 'updated_at'])
+
+    if not getattr(settings, 'PID_ANALYSIS_ASYNC', True):
+        run_pid_analysis.apply(args=[str(job.id), use_cache])
+        job.refresh_from_db()
+        return job
+
+    try:
+        async_result = run_pid_analysis.delay(str(job.id), use_cache)
+    except Exception as e:
+        # Broker unreachable - fail fast so the drawing does not stay 'processing' forever
+        logger.error(f"[PID JOB] Failed to enqueue job {job.id}: {e}")
+        message = f'Could not queue analysis: {e}'[:500]
+        _mark_failed(job, drawing, message, message)
+        raise
+
+    job.celery_task_id = async_result.id or ''
+    job.save(update_fields=['celery_task_id', 'updated_at'])
+    logger.info(f"[PID JOB] Queued job {job.id} for drawing {drawing.id} (task {job.celery_task_id})")
+    return job
+
+
+@shared_task(bind=True, acks_late=True, ignore_result=True)
+def run_pid_analysis(self, job_id: str, use_cache: bool = True):
+    """
+    Execute a queued P&ID analysis job
+
+    Not retried automatically: every attempt repeats the GPT-4o passes.
+    CELERY_TASK_SOFT_TIME_LIMIT interrupts it before the hard limit kills the
+    worker, so the job and drawing are marked failed instead of staying
+    'running'/'processing'.
+    """
+    from .services import PIDAnalysisService
+
+    try:
+        job = PIDAnalysisJob.objects.select_related('pid_drawing').get(id=job_id)
+    except PIDAnalysisJob.DoesNotExist:
+        logger.error(f"[PID JOB] Job {job_id} not found")
+        return
+
+    if job.is_finished:
+        # Redelivered after completion (acks_late) - nothing to do
+        logger.info(f"[PID JOB] Job {job_id} already {job.status}, skipping")
+        return
+
+    drawing = job.pid_drawing
+    job.status = 'running'
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at', 'updated_at'])
+
+    try:
+        analysis_service = PIDAnalysisService()
+        analysis_result = analysis_service.analyze_pid_drawing(
+            drawing.file,
+            drawing_number=drawing.drawing_number,
+            progress_callback=job.add_event,
+            use_cache=use_cache
+        )
+
+        save_analysis_result(drawing, analysis_result)
+
+        job.status = 'completed'
+        job.progress = 100
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'progress', 'completed_at', 'updated_at'])
+        logger.info(f"[PID JOB] Job {job_id} completed with {len(analysis_result.get('issues', []))} issues")
+
+        if getattr(settings, 'PID_PREGENERATE_REPORT_ARTIFACTS', False):
+            schedule_report_artifacts(drawing)
+
+    except SoftTimeLimitExceeded:
+        logger.error(f"[PID JOB] Job {job_id} exceeded the soft time limit")
+        _mark_failed(job, drawing, 'Analysis timed out. Please try again.', 'Analysis timed out')
+
+    except Exception as e:
+        logger.exception(f"[PID JOB] Job {job_id} failed: {type(e).__name__}: {e}")
+        # Full error stored on the drawing for debugging
+        _mark_failed(job, drawing, describe_analysis_error(e), str(e))
+
+
+def schedule_report_artifacts(drawing: PIDDrawing):
+    """Queue PDF/Excel pre-generation for a freshly analysed drawing"""
+    if not getattr(settings, 'PID_ANALYSIS_ASYNC', True):
+        pregenerate_pid_report_artifacts.apply(args=[drawing.id])
+        return
+    try:
+        pregenerate_pid_report_artifacts.delay(drawing.id)
+    except Exception as e:
+        # Exports are generated on first download instead
+        logger.warning(f"[PID JOB] Could not queue report artifacts for drawing {drawing.id}: {e}")
+
+
+@shared_task(ignore_result=True)
+def pregenerate_pid_report_artifacts(drawing_id: int):
+    """Render and store the PDF/Excel exports so the first download is served from storage"""
+    from .report_artifacts import pregenerate_report_artifacts
+
+    drawing = PIDDrawing.objects.select_related('analysis_report').filter(id=drawing_id).first()
+    if drawing is None or not hasattr(drawing, 'analysis_report'):
+        logger.info(f"[PID JOB] No report to pre-generate for drawing {drawing_id}")
+        return
+
+    try:
+        pregenerate_report_artifacts(drawing)
+    except Exception as e:
+        logger.exception(f"[PID JOB] Report artifact pre-generation failed for drawing {drawing_id}: {e}")
@@ -4,6 +4,7 @@ from .views import (
     PIDDrawingViewSet, 
     PIDAnalysisReportViewSet, 
     PIDIssueViewSet,
+    PIDAnalysisJobViewSet,
     ReferenceDocumentViewSet,
 )
 from .history_views import (
@@ -138,6 +139,7 @@ router = DefaultRouter()
 router.register(r'drawings', PIDDrawingViewSet, basename='pid-drawing')
 router.register(r'reports', PIDAnalysisReportViewSet, basename='pid-report')
 router.register(r'issues', PIDIssueViewSet, basename='pid-issue')
+router.register(r'jobs', PIDAnalysisJobViewSet, basename='pid-analysis-job')
 router.register(r'reference-documents', ReferenceDocumentViewSet, basename='reference-document')
 
 urlpatterns = [
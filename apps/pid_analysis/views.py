@@ -4,12 +4,13 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from .models import PIDDrawing, PIDAnalysisReport, PIDIssue, ReferenceDocument
+from .models import PIDDrawing, PIDAnalysisReport, PIDIssue, ReferenceDocument, PIDAnalysisJob
 from .serializers import (
     PIDDrawingSerializer,
     PIDDrawingUploadSerializer,
     PIDAnalysisReportSerializer,
     PIDIssueSerializer,
+    PIDAnalysisJobSerializer,
     IssueUpdateSerializer,
     ReferenceDocumentSerializer,
     ReferenceDocumentUploadSerializer
@@ -17,6 +18,9 @@ from .serializers import (
 from .services import PIDAnalysisService
 from .rag_service import RAGService
 from .document_processor import DocumentProcessor
+from .tasks import enqueue_pid_analysis, expire_stale_jobs
+from .persistence import refresh_report_counts, bump_report_revision
+from .report_artifacts import export_report_artifact
 
 
 @api_view(['GET'])
@@ -54,9 +58,9 @@ def export_report(request, pk):
     try:
         print(f"[EXPORT] Generating {export_format}...")
         if export_format == 'pdf':
-            response = export_service.export_pdf(drawing)
+            response = export_report_artifact(drawing, 'pdf', export_service)
         elif export_format == 'excel':
-            response = export_service.export_excel(drawing)
+            response = export_report_artifact(drawing, 'excel', export_service)
         elif export_format == 'csv':
             response = export_service.export_csv(drawing)
         else:
@@ -83,6 +87,12 @@ class PIDDrawingViewSet(viewsets.ModelViewSet):
     serializer_class = PIDDrawingSerializer
     parser_classes = [MultiPartParser, FormParser]  # Enable multipart parsing
     
+    # Drawing fields printed on the PDF/Excel exports
+    REPORT_FIELDS = (
+        'drawing_number', 'drawing_title', 'revision', 'project_name',
+        'area', 'p_area', 'doc_code', 'serial_number', 'rev', 'sheet_number', 'total_sheets',
+    )
+    
     def get_queryset(self):
         """Return drawings for current user"""
         return PIDDrawing.objects.filter(uploaded_by=self.request.user)
@@ -91,6 +101,14 @@ class PIDDrawingViewSet(viewsets.ModelViewSet):
         """Create drawing with current user"""
         serializer.save(uploaded_by=self.request.user)
     
+    def perform_update(self, serializer):
+        """Save drawing metadata; invalidate stored exports if a field they print changed"""
+        before = {field: getattr(serializer.instance, field) for field in self.REPORT_FIELDS}
+        drawing = serializer.save()
+        changed = any(getattr(drawing, field) != value for field, value in before.items())
+        if changed and hasattr(drawing, 'analysis_report'):
+            bump_report_revision(drawing.analysis_report)
+    
     @action(detail=False, methods=['post', 'options'], permission_classes=[permissions.AllowAny])
     def upload(self, request):
         """
@@ -182,112 +200,30 @@ class PIDDrawingViewSet(viewsets.ModelViewSet):
             status='uploaded'
         )
         
-        # Auto-analyze if requested
+        # Auto-analyze if requested - queued on a Celery worker, poll the job for progress
+        job = None
         if serializer.validated_data.get('auto_analyze', True):
             try:
-                print(f"[DEBUG] Starting auto-analysis for drawing ID: {drawing.id}")
-                # Start analysis
-                drawing.status = 'processing'
-                drawing.analysis_started_at = timezone.now()
-                drawing.save()
-                
-                # Perform analysis
-                print(f"[DEBUG] Initializing PIDAnalysisService")
-                analysis_service = PIDAnalysisService()
-                print(f"[DEBUG] Calling analyze_pid_drawing with file: {drawing.file.name}")
-                # Pass the file object directly (works with both S3 and local storage)
-                # Also pass drawing number for RAG context retrieval
-                analysis_result = analysis_service.analyze_pid_drawing(
-                    drawing.file,
-                    drawing_number=drawing.drawing_number
-                )
-                print(f"[DEBUG] Analysis completed, result keys: {list(analysis_result.keys())}")
-                
-                # Create report
-                report = PIDAnalysisReport.objects.create(
-                    pid_drawing=drawing,
-                    report_data=analysis_result,
-                    total_issues=len(analysis_result.get('issues', [])),
-                )
-                
-                # Create issues
-                for issue_data in analysis_result.get('issues', []):
-                    PIDIssue.objects.create(
-                        report=report,
-                        serial_number=issue_data.get('serial_number', 0),
-                        pid_reference=issue_data.get('pid_reference', ''),
-                        issue_observed=issue_data.get('issue_observed', ''),
-                        action_required=issue_data.get('action_required', ''),
-                        severity=issue_data.get('severity', 'observation'),
-                        category=issue_data.get('category', ''),
-                        location_on_drawing=issue_data.get('location_on_drawing'),  # Include location data
-                        status=issue_data.get('status', 'pending'),
-                        approval=issue_data.get('approval', 'Pending'),
-                        remark=issue_data.get('remark', 'Pending'),
-                    )
-                
-                # Update report summary
-                summary = analysis_service.generate_report_summary(analysis_result.get('issues', []))
-                report.approved_count = summary['approved_count']
-                report.ignored_count = summary['ignored_count']
-                report.pending_count = summary['pending_count']
-                report.save()
-                
-                # Update drawing
-                drawing.status = 'completed'
-                drawing.analysis_completed_at = timezone.now()
-                
-                # Update drawing metadata from analysis if available
-                if 'drawing_info' in analysis_result:
-                    drawing_info = analysis_result['drawing_info']
-                    if not drawing.drawing_number and drawing_info.get('drawing_number'):
-                        drawing.drawing_number = drawing_info['drawing_number']
-                    if not drawing.drawing_title and drawing_info.get('drawing_title'):
-                        drawing.drawing_title = drawing_info['drawing_title']
-                    if not drawing.revision and drawing_info.get('revision'):
-                        drawing.revision = drawing_info['revision']
-                
-                drawing.save()
-                
+                print(f"[DEBUG] Queueing auto-analysis for drawing ID: {drawing.id}")
+                job = enqueue_pid_analysis(drawing, request.user)
+                drawing.refresh_from_db()
             except Exception as e:
-                print(f"[ERROR] Analysis failed: {type(e).__name__}: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                
-                drawing.status = 'failed'
-                drawing.error_message = str(e)[:500]  # Store error for debugging
-                drawing.save()
-                
-                # Provide detailed error response
-                error_message = str(e)
-                error_type = type(e).__name__
-                
-                # Check for specific error types and provide helpful messages
-                if "OPENAI_API_KEY" in error_message or "API key" in error_message:
-                    user_message = "OpenAI API key is not configured or invalid. Please contact administrator."
-                elif "quota" in error_message.lower():
-                    user_message = "OpenAI API quota exceeded. Please contact administrator."
-                elif "rate_limit" in error_message.lower():
-                    user_message = "Too many requests. Please wait a moment and try again."
-                elif "invalid JSON" in error_message:
-                    user_message = f"Analysis processing error: {error_message}"
-                else:
-                    user_message = f"Analysis failed: {error_message}"
-                
+                print(f"[ERROR] Could not queue analysis: {type(e).__name__}: {str(e)}")
                 return Response(
                     {
                         'success': False,
-                        'error': user_message,
-                        'error_type': error_type,
+                        'error': 'Analysis queue is unavailable. Please try again later.',
+                        'error_type': type(e).__name__,
                         'drawing_id': drawing.id,
-                        'details': error_message if request.user.is_staff else None  # Full details only for staff
+                        'details': str(e) if request.user.is_staff else None  # Full details only for staff
                     },
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
                 )
         
         # Return created drawing
         response_data = PIDDrawingSerializer(drawing).data
         response_data['success'] = True
+        response_data['analysis_job'] = PIDAnalysisJobSerializer(job).data if job else None
         print(f"[DEBUG] Upload successful, drawing ID: {drawing.id}, status: {drawing.status}")
         
         return Response(
@@ -298,80 +234,65 @@ class PIDDrawingViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def analyze(self, request, pk=None):
         """
-        Trigger analysis for a specific drawing
+        Queue analysis for a specific drawing
         
-        POST /api/v1/pid/drawings/{id}/analyze/
+        POST /api/v1/pid/drawings/{id}/analyze/[?refresh=true]
+        Returns 202 with the analysis job; poll /api/v1/pid/jobs/{job_id}/ for progress
         """
         drawing = self.get_object()
         
+        # A job killed by the worker time limit must not block re-analysis forever
+        expire_stale_jobs(drawing)
+        
         if drawing.status == 'processing':
+            latest_job = drawing.analysis_jobs.first()
             return Response(
-                {'error': 'Analysis already in progress'},
+                {
+                    'error': 'Analysis already in progress',
+                    'analysis_job': PIDAnalysisJobSerializer(latest_job).data if latest_job else None
+                },
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # ?refresh=true bypasses the result cache and re-runs every pass
+        use_cache = str(request.query_params.get('refresh', 'false')).lower() not in ('true', '1', 'yes')
+        
         try:
-            # Start analysis
-            drawing.status = 'processing'
-            drawing.analysis_started_at = timezone.now()
-            drawing.save()
-            
-            # Perform analysis
-            analysis_service = PIDAnalysisService()
-            # Pass the file object directly (works with both S3 and local storage)
-            analysis_result = analysis_service.analyze_pid_drawing(drawing.file)
-            
-            # Delete existing report if any
-            if hasattr(drawing, 'analysis_report'):
-                drawing.analysis_report.delete()
-            
-            # Create new report
-            report = PIDAnalysisReport.objects.create(
-                pid_drawing=drawing,
-                report_data=analysis_result,
-                total_issues=len(analysis_result.get('issues', [])),
-            )
-            
-            # Create issues
-            for issue_data in analysis_result.get('issues', []):
-                PIDIssue.objects.create(
-                    report=report,
-                    serial_number=issue_data.get('serial_number', 0),
-                    pid_reference=issue_data.get('pid_reference', ''),
-                    issue_observed=issue_data.get('issue_observed', ''),
-                    action_required=issue_data.get('action_required', ''),
-                    severity=issue_data.get('severity', 'observation'),
-                    category=issue_data.get('category', ''),
-                    location_on_drawing=issue_data.get('location_on_drawing'),  # Include location data
-                    status=issue_data.get('status', 'pending'),
-                    approval=issue_data.get('approval', 'Pending'),
-                    remark=issue_data.get('remark', 'Pending'),
-                )
-            
-            # Update report summary
-            summary = analysis_service.generate_report_summary(analysis_result.get('issues', []))
-            report.approved_count = summary['approved_count']
-            report.ignored_count = summary['ignored_count']
-            report.pending_count = summary['pending_count']
-            report.save()
-            
-            # Update drawing status
-            drawing.status = 'completed'
-            drawing.analysis_completed_at = timezone.now()
-            drawing.save()
-            
+            job = enqueue_pid_analysis(drawing, request.user, use_cache=use_cache)
+        except Exception as e:
             return Response(
-                PIDDrawingSerializer(drawing).data,
-                status=status.HTTP_200_OK
+                {'error': f'Could not queue analysis: {str(e)}'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
-            
-        except Exception as e:
-            drawing.status = 'failed'
-            drawing.save()
+        
+        drawing.refresh_from_db()
+        response_data = PIDDrawingSerializer(drawing).data
+        response_data['analysis_job'] = PIDAnalysisJobSerializer(job).data
+        return Response(
+            response_data,
+            status=status.HTTP_202_ACCEPTED
+        )
+    
+    @action(detail=True, methods=['get'], url_path='analysis-status')
+    def analysis_status(self, request, pk=None):
+        """
+        Get the latest analysis job for a drawing
+        
+        GET /api/v1/pid/drawings/{id}/analysis-status/
+        """
+        drawing = self.get_object()
+        job = drawing.analysis_jobs.first()
+        
+        if not job:
             return Response(
-                {'error': f'Analysis failed: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'No analysis job for this drawing'},
+                status=status.HTTP_404_NOT_FOUND
             )
+        
+        return Response(
+            PIDAnalysisJobSerializer(job).data,
+            status=status.HTTP_200_OK
+        )
     
     @action(detail=True, methods=['get'])
     def report(self, request, pk=None):
@@ -463,9 +384,9 @@ class PIDDrawingViewSet(viewsets.ModelViewSet):
         try:
             print(f"[EXPORT] Starting export as {export_format}...")
             if export_format == 'pdf':
-                response = export_service.export_pdf(drawing)
+                response = export_report_artifact(drawing, 'pdf', export_service)
             elif export_format == 'excel':
-                response = export_service.export_excel(drawing)
+                response = export_report_artifact(drawing, 'excel', export_service)
             elif export_format == 'csv':
                 response = export_service.export_csv(drawing)
             else:
@@ -499,6 +420,23 @@ class PIDAnalysisReportViewSet(viewsets.ReadOnlyModelViewSet):
         )
 
 
+class PIDAnalysisJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for polling queued P&ID analysis jobs (read-only)"""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = PIDAnalysisJobSerializer
+    
+    def get_queryset(self):
+        """Return jobs for current user's drawings"""
+        queryset = PIDAnalysisJob.objects.filter(
+            pid_drawing__uploaded_by=self.request.user
+        )
+        drawing_id = self.request.query_params.get('drawing')
+        if drawing_id:
+            queryset = queryset.filter(pid_drawing_id=drawing_id)
+        return queryset
+
+
 class PIDIssueViewSet(viewsets.ModelViewSet):
     """ViewSet for P&ID issues"""
     
@@ -586,13 +524,21 @@ class PIDIssueViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
     
+    def perform_create(self, serializer):
+        """Create issue and refresh its report"""
+        issue = serializer.save()
+        self._update_report_counts(issue.report)
+    
+    def perform_destroy(self, instance):
+        """Delete issue and refresh its report"""
+        report = instance.report
+        instance.delete()
+        self._update_report_counts(report)
+    
     def _update_report_counts(self, report):
-        """Update report summary counts"""
-        issues = report.issues.all()
-        report.approved_count = issues.filter(status='approved').count()
-        report.ignored_count = issues.filter(status='ignored').count()
-        report.pending_count = issues.filter(status='pending').count()
-        report.save()
+        """Update report summary counts and invalidate stored exports"""
+        refresh_report_counts(report)
+        bump_report_revision(report)
 
 
 class ReferenceDocumentViewSet(viewsets.ModelViewSet):
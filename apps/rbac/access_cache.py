@@ -0,0 +1,146 @@
+"""
+RBAC Effective Access Cache
+Per-user module and permission codes, cached and versioned so authorization
+checks are set lookups instead of role/module queries on every request.
+
+Invalidation (see signals.py):
+- user-level changes (profile, role assignment) bump that user's version
+- role/module/permission changes bump the global version
+Old entries are never deleted, they simply stop being addressed and expire.
+
+Versions live in the shared 'rbac_access' cache (Redis or the database), so
+a bump reaches every worker process; entries may stay in the per-process
+default cache because they are only reachable through the current versions.
+"""
+import logging
+import uuid
+from dataclasses import dataclass, field
+from typing import FrozenSet
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_ALIAS = 'rbac_access'
+GLOBAL_VERSION_KEY = 'rbac:access:version'
+USER_VERSION_KEY = 'rbac:access:user:{user_id}:version'
+ENTRY_KEY = 'rbac:access:{global_version}:{user_id}:{user_version}'
+
+
+@dataclass(frozen=True)
+class EffectiveAccess:
+    """Module and permission codes granted to a user through active roles"""
+    modules: FrozenSet[str] = field(default_factory=frozenset)
+    permissions: FrozenSet[str] = field(default_factory=frozenset)
+
+    def has_modules(self, module_codes) -> bool:
+        return self.modules.issuperset(module_codes)
+
+    def has_permission(self, permission_code) -> bool:
+        return permission_code in self.permissions
+
+
+def _timeout() -> int:
+    return getattr(settings, 'RBAC_ACCESS_CACHE_TTL', 300)
+
+
+def _version_cache():
+    return caches[VERSION_CACHE_ALIAS]
+
+
+def _new_version() -> str:
+    # Unique rather than incremented: concurrent bumps never share a version
+    return uuid.uuid4().hex
+
+
+def _bump(key: str):
+    _version_cache().set(key, _new_version(), timeout=None)
+
+
+def _get_versions(keys) -> dict:
+    """Current versions; a missing (evicted) version gets a fresh one, never an old entry's"""
+    version_cache = _version_cache()
+    versions = version_cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        version_cache.add(key, _new_version(), timeout=None)
+    if missing:
+        versions.update(version_cache.get_many(missing))
+    return versions
+
+
+def _load_access(user_id) -> EffectiveAccess:
+    """Two queries: module codes and permission codes over the user's active roles"""
+    from .models import Module, Permission
+
+    modules = Module.objects.filter(
+        is_active=True,
+        rolemodule__role__is_active=True,
+        rolemodule__role__userrole__user_profile__user_id=user_id,
+        rolemodule__role__userrole__user_profile__is_deleted=False,
+    ).values_list('code', flat=True).distinct()
+
+    permissions = Permission.objects.filter(
+        is_active=True,
+        rolepermission__role__is_active=True,
+        rolepermission__role__userrole__user_profile__user_id=user_id,
+        rolepermission__role__userrole__user_profile__is_deleted=False,
+    ).values_list('code', flat=True).distinct()
+
+    return EffectiveAccess(modules=frozenset(modules), permissions=frozenset(permissions))
+
+
+def get_effective_access(user) -> EffectiveAccess:
+    """
+    Cached effective access for a user
+
+    Args:
+        user: Django user (anonymous users get an empty access set)
+
+    Returns:
+        EffectiveAccess with module and permission code sets
+    """
+    if not user or not user.is_authenticated:
+        return EffectiveAccess()
+
+    user_version_key = USER_VERSION_KEY.format(user_id=user.pk)
+    try:
+        versions = _get_versions([GLOBAL_VERSION_KEY, user_version_key])
+        entry_key = ENTRY_KEY.format(
+            global_version=versions[GLOBAL_VERSION_KEY],
+            user_id=user.pk,
+            user_version=versions[user_version_key],
+        )
+        access = cache.get(entry_key)
+    except Exception as e:
+        logger.warning(f"RBAC access cache read failed: {e}")
+        return _load_access(user.pk)
+
+    if access is None:
+        access = _load_access(user.pk)
+        try:
+            cache.set(entry_key, access, timeout=_timeout())
+        except Exception as e:
+            logger.warning(f"RBAC access cache write failed: {e}")
+    return access
+
+
+def invalidate_user_access(user_id):
+    """Drop the cached access of one user (role assignment or profile change)"""
+    transaction.on_commit(lambda: _invalidate(USER_VERSION_KEY.format(user_id=user_id)))
+
+
+def invalidate_all_access():
+    """Drop every user's cached access (role, module or permission definitions changed)"""
+    transaction.on_commit(lambda: _invalidate(GLOBAL_VERSION_KEY))
+
+
+def _invalidate(version_key: str):
+    # Bumped after commit: a reader between the bump and the commit would
+    # otherwise cache the old grants under the new version
+    try:
+        _bump(version_key)
+    except Exception as e:
+        logger.warning(f"RBAC access cache invalidation failed for {version_key}: {e}")
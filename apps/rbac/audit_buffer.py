@@ -0,0 +1,146 @@
+"""
+Buffered Audit Logging
+Audit records are queued in-process and written with bulk_create by a
+background thread, so request handling does not wait on the insert.
+
+- flushes every AUDIT_LOG_FLUSH_INTERVAL seconds or AUDIT_LOG_BATCH_SIZE records
+- backpressure: when the queue is full the caller waits briefly, then writes
+  synchronously rather than dropping the record
+- a batch the database rejects is retried row by row, so one bad record
+  does not drop the others
+- pending records are flushed at interpreter shutdown (atexit)
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogBuffer:
+    """
+    Process-wide queue of pending AuditLog rows
+
+    Records carry the timestamp of the request that queued them, so the
+    flush delay does not show in the log.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    @property
+    def batch_size(self) -> int:
+        return getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 200)
+
+    @property
+    def flush_interval(self) -> float:
+        return getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 2.0)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._queue is None or self._pid != os.getpid():
+                # Fresh queue after fork: the parent's records are the parent's to flush
+                self._queue = queue.Queue(maxsize=getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', 10000))
+                self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, record: Dict[str, Any]):
+        """Queue one AuditLog field dict; writes inline if the queue stays full"""
+        record = self._fit(record)
+        self._ensure_started()
+        try:
+            self._queue.put(record, timeout=getattr(settings, 'AUDIT_LOG_ENQUEUE_TIMEOUT', 0.05))
+        except queue.Full:
+            logger.warning("Audit log queue full, writing record synchronously")
+            self._write([record])
+
+    @staticmethod
+    def _fit(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Truncate text values to their column length (e.g. a resource type taken from a URL)"""
+        from .models import AuditLog
+        fitted = dict(record)
+        for name, value in record.items():
+            if not isinstance(value, str):
+                continue
+            max_length = AuditLog._meta.get_field(name).max_length
+            if max_length and len(value) > max_length:
+                fitted[name] = value[:max_length]
+        return fitted
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        records = []
+        while len(records) < limit:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return records
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Give the batch a moment to fill before writing
+            self._stopping.wait(min(self.flush_interval, 0.5))
+            self.flush(initial=[first])
+
+    def flush(self, initial: List[Dict[str, Any]] = None):
+        """Write everything currently queued in batches"""
+        with self._flush_lock:
+            records = list(initial or [])
+            while True:
+                if self._queue is not None:
+                    records.extend(self._drain(self.batch_size - len(records)))
+                if not records:
+                    break
+                self._write(records)
+                records = []
+
+    def _write(self, records: List[Dict[str, Any]]):
+        from .models import AuditLog
+        try:
+            AuditLog.objects.bulk_create([AuditLog(**record) for record in records])
+        except Exception as e:
+            if len(records) == 1:
+                logger.error(f"Failed to write audit log record: {e}")
+            else:
+                # One bad row fails the whole insert - keep the others
+                logger.warning(f"Batch insert of {len(records)} audit log records failed ({e}), writing them one by one")
+                for record in records:
+                    try:
+                        AuditLog.objects.create(**record)
+                    except Exception as row_error:
+                        logger.error(f"Failed to write audit log record {record.get('action')} {record.get('resource_type')}: {row_error}")
+        finally:
+            if threading.current_thread() is self._thread:
+                close_old_connections()
+
+    def shutdown(self):
+        """Stop the writer and flush what is left (registered with atexit)"""
+        self._stopping.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+
+audit_buffer = AuditLogBuffer()
+atexit.register(audit_buffer.shutdown)
@@ -5,7 +5,8 @@ from apps.rbac.models import UserProfile, AuditLog
 from apps.users.models import User
 from django.db.models import Count, Q
 from datetime import datetime, timedelta
-import boto3
+from apps.core import storage_usage
+from apps.core.boto3_helper import Boto3Helper
 from django.conf import settings
 from botocore.exceptions import ClientError
 
@@ -44,35 +45,15 @@ def user_dashboard_stats(request):
             timestamp__gte=month_ago
         ).count()
         
-        # Get S3 user files count
+        # Storage usage from the ledger (no S3 listing)
         s3_files_count = 0
         s3_total_size = 0
         try:
-            # Check if S3 is configured
-            if not hasattr(settings, 'AWS_STORAGE_BUCKET_NAME') or not settings.AWS_STORAGE_BUCKET_NAME:
-                # S3 not configured, skip
-                pass
-            else:
-                s3_client = boto3.client(
-                    's3',
-                    aws_access_key_id=getattr(settings, 'AWS_ACCESS_KEY_ID', None),
-                    aws_secret_access_key=getattr(settings, 'AWS_SECRET_ACCESS_KEY', None),
-                    region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1')
-                )
-                
-                # User folder path
-                user_folder = f"users/{user.email}/"
-                
-                response = s3_client.list_objects_v2(
-                    Bucket=settings.AWS_STORAGE_BUCKET_NAME,
-                    Prefix=user_folder
-                )
-                
-                if 'Contents' in response:
-                    s3_files_count = len(response['Contents'])
-                    s3_total_size = sum(obj['Size'] for obj in response['Contents'])
+            usage = storage_usage.user_usage(user.pk)
+            s3_files_count = usage['total_count']
+            s3_total_size = usage['total_size_bytes']
         except Exception as e:
-            print(f"Error fetching S3 files: {e}")
+            print(f"Error fetching storage usage: {e}")
         
         # Module-specific stats (can be extended based on modules)
         module_stats = {}
@@ -166,12 +147,7 @@ def user_files_list(request):
                 'message': 'S3 storage not configured'
             })
         
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=getattr(settings, 'AWS_ACCESS_KEY_ID', None),
-            aws_secret_access_key=getattr(settings, 'AWS_SECRET_ACCESS_KEY', None),
-            region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1')
-        )
+        s3_client = Boto3Helper.get_s3_client(region=getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1'))
         
         # User folder path
         user_folder = f"users/{user.email}/"
@@ -3,7 +3,7 @@ Feature Access Middleware
 Automatically checks if user has access to requested features based on assigned modules
 """
 from django.http import JsonResponse
-from apps.rbac.models import UserProfile
+from apps.rbac.access_cache import get_effective_access
 
 class FeatureAccessMiddleware:
     """
@@ -62,19 +62,5 @@ class FeatureAccessMiddleware:
         return any(path.startswith(skip_path) for skip_path in skip_paths)
     
     def _has_module_access(self, user, required_modules):
-        """Check if user has access to required modules"""
-        try:
-            profile = UserProfile.objects.get(user=user, is_deleted=False)
-            
-            # Get user's modules through roles
-            user_module_codes = set()
-            for role in profile.roles.filter(is_active=True):
-                user_module_codes.update(
-                    role.modules.filter(is_active=True).values_list('code', flat=True)
-                )
-            
-            # Check if user has all required modules
-            return all(module in user_module_codes for module in required_modules)
-            
-        except UserProfile.DoesNotExist:
-            return False
+        """Check if user has access to required modules (cached access set)"""
+        return get_effective_access(user).has_modules(required_modules)
@@ -2,9 +2,10 @@
 RBAC Middleware - Enforce permissions at request level
 """
 from django.http import JsonResponse
+from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
 from .models import UserProfile, AuditLog
-from .utils import create_audit_log
+from .utils import queue_audit_log
 
 
 class RBACMiddleware(MiddlewareMixin):
@@ -70,7 +71,7 @@ class RBACMiddleware(MiddlewareMixin):
                     path_parts = request.path.strip('/').split('/')
                     resource_type = path_parts[-2] if len(path_parts) >= 2 else 'unknown'
                     
-                    create_audit_log(
+                    queue_audit_log(
                         user=request.user,
                         action=action_map.get(request.method, 'unknown'),
                         resource_type=resource_type,
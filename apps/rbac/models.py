@@ -6,6 +6,7 @@ import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from apps.core.models import TimeStampedModel
 
 User = get_user_model()
@@ -444,7 +445,7 @@ class AuditLog(TimeStampedModel):
     resource_repr = models.CharField(max_length=255, blank=True)  # String representation
     
     # When & Where
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)  # Set explicitly by buffered writes
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     
@@ -2,7 +2,6 @@
 AWS S3 integration service for secure file storage and access.
 Provides pre-signed URLs for secure uploads/downloads with user tracking.
 """
-import boto3
 import hashlib
 import mimetypes
 from datetime import datetime, timedelta
@@ -10,6 +9,7 @@ from django.conf import settings
 from botocore.exceptions import ClientError
 from apps.rbac.models import UserStorage
 from apps.rbac.utils import create_audit_log
+from apps.core.boto3_helper import Boto3Helper
 
 
 class S3Service:
@@ -29,12 +29,8 @@ class S3Service:
         self.bucket = getattr(organization, 's3_bucket_name', None) or settings.AWS_STORAGE_BUCKET_NAME
         self.region = getattr(organization, 's3_region', None) or settings.AWS_S3_REGION_NAME
         
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=self.region
-        )
+        # Shared pooled client per region
+        self.s3_client = Boto3Helper.get_s3_client(region=self.region)
     
     def generate_upload_url(self, user, file_name, file_size, content_type=None, 
                           expires_in=3600, tags=None, category='general'):
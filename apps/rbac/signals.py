@@ -1,11 +1,15 @@
 """
 RBAC Signals
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import UserProfile, Organization
+from .models import (
+    UserProfile, Organization, Role, Module, Permission,
+    RoleModule, RolePermission, UserRole
+)
 from .utils import create_audit_log
+from .access_cache import invalidate_user_access, invalidate_all_access
 
 User = get_user_model()
 
@@ -23,3 +27,56 @@ def log_user_login(sender, instance, created, **kwargs):
             profile.save(update_fields=['last_login_at', 'failed_login_attempts'])
         except UserProfile.DoesNotExist:
             pass
+
+
+# ---------------------------------------------------------------------------
+# Effective access cache invalidation
+# ---------------------------------------------------------------------------
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_profile_access(sender, instance, **kwargs):
+    """Profile deleted/restored changes the user's access"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and 'is_deleted' not in update_fields:
+        return  # e.g. login bookkeeping
+    invalidate_user_access(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserRole)
+def invalidate_user_role_access(sender, instance, **kwargs):
+    """Role assigned to or removed from a user"""
+    try:
+        user_id = UserProfile.objects.values_list('user_id', flat=True).get(pk=instance.user_profile_id)
+    except UserProfile.DoesNotExist:
+        return
+    invalidate_user_access(user_id)
+
+
+@receiver(m2m_changed, sender=UserProfile.roles.through)
+def invalidate_profile_roles_access(sender, instance, action, reverse, pk_set, **kwargs):
+    """profile.roles.add/remove/clear() and role.user_profiles.add/remove/clear()"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_user_access(instance.user_id)
+    else:
+        # Reverse clear has no pk_set - fall back to a global bump
+        invalidate_all_access()
+
+
+@receiver([post_save, post_delete], sender=Role)
+@receiver([post_save, post_delete], sender=Module)
+@receiver([post_save, post_delete], sender=Permission)
+@receiver([post_save, post_delete], sender=RoleModule)
+@receiver([post_save, post_delete], sender=RolePermission)
+def invalidate_access_definitions(sender, **kwargs):
+    """Role, module or permission definitions changed - affects many users"""
+    invalidate_all_access()
+
+
+@receiver(m2m_changed, sender=Role.modules.through)
+@receiver(m2m_changed, sender=Role.permissions.through)
+def invalidate_role_grants_access(sender, action, **kwargs):
+    """role.modules/permissions.add/remove/clear() bypass the through model's post_save"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_all_access()
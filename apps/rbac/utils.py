@@ -1,7 +1,12 @@
 """
 RBAC Utility Functions
 """
+from django.conf import settings
+from django.utils import timezone
+
 from .models import AuditLog
+from .audit_buffer import audit_buffer
+from .access_cache import get_effective_access
 
 
 def create_audit_log(user, action, resource_type, resource_id=None, resource_repr='',
@@ -26,15 +31,44 @@ def create_audit_log(user, action, resource_type, resource_id=None, resource_rep
     )
 
 
+def queue_audit_log(user, action, resource_type, resource_id=None, resource_repr='',
+                    changes=None, metadata=None, ip_address=None, user_agent='',
+                    success=True, error_message=''):
+    """
+    Queue an audit log entry for a batched background insert
+    Falls back to create_audit_log when AUDIT_LOG_ASYNC is disabled
+    """
+    if not getattr(settings, 'AUDIT_LOG_ASYNC', True):
+        return create_audit_log(
+            user, action, resource_type, resource_id=resource_id, resource_repr=resource_repr,
+            changes=changes, metadata=metadata, ip_address=ip_address, user_agent=user_agent,
+            success=success, error_message=error_message
+        )
+
+    audit_buffer.enqueue({
+        'user_id': user.pk if user else None,
+        'user_email': user.email if user else 'system',
+        'action': action,
+        'resource_type': resource_type,
+        'resource_id': resource_id,
+        'resource_repr': resource_repr,
+        'changes': changes or {},
+        'metadata': metadata or {},
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'success': success,
+        'error_message': error_message,
+        'timestamp': timezone.now(),
+    })
+
+
 def get_user_permissions(user):
     """
     Get all permissions for a user
     Returns list of permission codes
     """
     try:
-        profile = user.rbac_profile
-        permissions = profile.get_all_permissions()
-        return [p.code for p in permissions]
+        return sorted(get_effective_access(user).permissions)
     except:
         return []
 
@@ -45,9 +79,7 @@ def get_user_modules(user):
     Returns list of module codes
     """
     try:
-        profile = user.rbac_profile
-        modules = profile.get_all_modules()
-        return [m.code for m in modules]
+        return sorted(get_effective_access(user).modules)
     except:
         return []
 
@@ -0,0 +1,78 @@
+"""
+Per-user history statistics
+Counter updates for UserHistoryStats are applied as single UPDATE ... SET
+col = col + delta statements inside the transaction that changed the source
+row. A user without a stats row is materialized on first read, which also
+backfills users that existed before the table.
+"""
+import logging
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import UserHistoryStats
+
+logger = logging.getLogger(__name__)
+
+
+def compute_user_history_stats(user_id) -> dict:
+    """Counter values for a user, aggregated from the source tables"""
+    from apps.pid_analysis.models import PIDDrawing, PIDAnalysisReport
+    from apps.pfd_converter.models import PFDDocument, PIDConversion
+
+    reports = PIDAnalysisReport.objects.filter(pid_drawing__uploaded_by_id=user_id).aggregate(
+        pid_analyses=Count('id'),
+        pid_issues_found=Sum('total_issues'),
+    )
+    completed = Q(status='completed')
+    conversions = PIDConversion.objects.filter(pfd_document__uploaded_by_id=user_id).aggregate(
+        pfd_conversions=Count('id'),
+        pfd_completed_conversions=Count('id', filter=completed),
+        pfd_confidence_count=Count('confidence_score', filter=completed),
+        pfd_confidence_total=Sum('confidence_score', filter=completed),
+    )
+    return {
+        'pid_uploads': PIDDrawing.objects.filter(uploaded_by_id=user_id).count(),
+        'pid_analyses': reports['pid_analyses'],
+        'pid_issues_found': reports['pid_issues_found'] or 0,
+        'pfd_uploads': PFDDocument.objects.filter(uploaded_by_id=user_id).count(),
+        'pfd_conversions': conversions['pfd_conversions'],
+        'pfd_completed_conversions': conversions['pfd_completed_conversions'],
+        'pfd_confidence_count': conversions['pfd_confidence_count'],
+        'pfd_confidence_total': conversions['pfd_confidence_total'] or 0,
+    }
+
+
+def rebuild_user_history_stats(user_id) -> UserHistoryStats:
+    """Recompute a user's stats row from scratch"""
+    stats, _ = UserHistoryStats.objects.update_or_create(
+        user_id=user_id,
+        defaults=compute_user_history_stats(user_id)
+    )
+    return stats
+
+
+def get_user_history_stats(user) -> UserHistoryStats:
+    """Single-row read of a user's stats, materializing the row if needed"""
+    stats = UserHistoryStats.objects.filter(user_id=user.pk).first()
+    if stats is None:
+        logger.info(f"Materializing history stats for user {user.pk}")
+        stats = rebuild_user_history_stats(user.pk)
+    return stats
+
+
+def adjust_user_history_stats(user_id, **deltas):
+    """
+    Apply counter deltas with one UPDATE
+
+    Users without a row are skipped - the row is computed in full on first
+    read. (Creating it here could also resurrect the row of a user whose
+    deletion is cascading through these signals.)
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not user_id or not deltas:
+        return
+    UserHistoryStats.objects.filter(user_id=user_id).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
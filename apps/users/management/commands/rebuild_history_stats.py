@@ -0,0 +1,28 @@
+"""
+Django management command to recompute materialized user history statistics
+"""
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from apps.users.history_stats import rebuild_user_history_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recompute UserHistoryStats from the P&ID and PFD tables (after bulk imports or manual SQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', type=str, help='Only rebuild this user')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options.get('email'):
+            users = users.filter(email=options['email'])
+
+        count = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            rebuild_user_history_stats(user_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt history stats for {count} user(s)'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.0 on 2026-10-16 19:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_is_first_login_user_last_password_change_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserHistoryStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='history_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('pid_uploads', models.IntegerField(default=0)),
+                ('pid_analyses', models.IntegerField(default=0)),
+                ('pid_issues_found', models.IntegerField(default=0, help_text='Sum of total_issues over all reports')),
+                ('pfd_uploads', models.IntegerField(default=0)),
+                ('pfd_conversions', models.IntegerField(default=0)),
+                ('pfd_completed_conversions', models.IntegerField(default=0)),
+                ('pfd_confidence_count', models.IntegerField(default=0, help_text='Completed conversions with a confidence score')),
+                ('pfd_confidence_total', models.FloatField(default=0, help_text='Sum of those confidence scores')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'User History Stats',
+                'verbose_name_plural': 'User History Stats',
+                'db_table': 'user_history_stats',
+            },
+        ),
+    ]
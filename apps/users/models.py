@@ -53,3 +53,42 @@ class UserProfile(TimeStampedModel):
 
     def __str__(self):
         return f"Profile of {self.user.email}"
+
+
+class UserHistoryStats(models.Model):
+    """
+    Materialized per-user counters behind the P&ID and PFD history overviews.
+    Kept current by signals in those apps (see apps.users.history_stats);
+    rebuilt from the source tables when missing.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='history_stats')
+
+    # P&ID analysis
+    pid_uploads = models.IntegerField(default=0)
+    pid_analyses = models.IntegerField(default=0)
+    pid_issues_found = models.IntegerField(default=0, help_text='Sum of total_issues over all reports')
+
+    # PFD conversion
+    pfd_uploads = models.IntegerField(default=0)
+    pfd_conversions = models.IntegerField(default=0)
+    pfd_completed_conversions = models.IntegerField(default=0)
+    pfd_confidence_count = models.IntegerField(default=0, help_text='Completed conversions with a confidence score')
+    pfd_confidence_total = models.FloatField(default=0, help_text='Sum of those confidence scores')
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_history_stats'
+        verbose_name = 'User History Stats'
+        verbose_name_plural = 'User History Stats'
+
+    def __str__(self):
+        return f"History stats of user {self.user_id}"
+
+    @property
+    def avg_issues_per_drawing(self):
+        return self.pid_issues_found / self.pid_analyses if self.pid_analyses else 0
+
+    @property
+    def avg_confidence_score(self):
+        return self.pfd_confidence_total / self.pfd_confidence_count if self.pfd_confidence_count else 0
@@ -403,6 +403,127 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_TRACK_STARTED = True
+# Long-running analysis tasks: one task per worker process at a time, ack after completion
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_TIME_LIMIT = safe_cast_int(config('CELERY_TASK_TIME_LIMIT', default='1800'), 1800)
+# Soft limit raises SoftTimeLimitExceeded inside the task so it can mark its job failed
+# before the hard limit kills the worker process (kept at least 60s below the hard limit)
+CELERY_TASK_SOFT_TIME_LIMIT = min(
+    safe_cast_int(config('CELERY_TASK_SOFT_TIME_LIMIT', default='1740'), 1740),
+    max(CELERY_TASK_TIME_LIMIT - 60, 1)
+)
+
+# P&ID analysis runs on Celery workers (set False to run in-request without a worker)
+PID_ANALYSIS_ASYNC = safe_cast_bool(config('PID_ANALYSIS_ASYNC', default='True'), True)
+
+# P&ID page rendering for vision analysis
+PID_RENDER_FORMAT = config('PID_RENDER_FORMAT', default='png')  # png, jpeg or webp
+PID_RENDER_DPI = safe_cast_int(config('PID_RENDER_DPI', default='300'), 300)  # maximum, see max edge
+PID_RENDER_QUALITY = safe_cast_int(config('PID_RENDER_QUALITY', default='85'), 85)  # jpeg/webp only
+PID_RENDER_MAX_EDGE_PX = safe_cast_int(config('PID_RENDER_MAX_EDGE_PX', default='6000'), 6000)  # adaptive DPI cap
+PID_RENDER_WORKERS = safe_cast_int(config('PID_RENDER_WORKERS', default='0'), 0)  # 0 = one per CPU
+
+# P&ID analysis pass orchestration
+PID_PASS_TIMEOUTS = {
+    'vision': safe_cast_int(config('PID_VISION_PASS_TIMEOUT', default='660'), 660),  # seconds
+    'second_review': safe_cast_int(config('PID_SECOND_REVIEW_TIMEOUT', default='90'), 90),
+}
+PID_SECOND_REVIEW_MIN_ISSUES = safe_cast_int(config('PID_SECOND_REVIEW_MIN_ISSUES', default='20'), 20)
+# Render and store PDF/Excel exports right after analysis (otherwise on first download)
+PID_PREGENERATE_REPORT_ARTIFACTS = safe_cast_bool(config('PID_PREGENERATE_REPORT_ARTIFACTS', default='False'), False)
+
+# CRS PDF extraction - documents of CRS_PARALLEL_MIN_PAGES+ pages are scanned by a process pool
+CRS_EXTRACTION_WORKERS = safe_cast_int(config('CRS_EXTRACTION_WORKERS', default='0'), 0)  # 0 = CPU count
+CRS_PARALLEL_MIN_PAGES = safe_cast_int(config('CRS_PARALLEL_MIN_PAGES', default='50'), 50)
+CRS_PAGE_TIMEOUT = safe_cast_int(config('CRS_PAGE_TIMEOUT', default='30'), 30)  # seconds per page, 0 = no limit
+# CRS template is cached per process; S3/URL copies are re-checked by ETag this often (seconds)
+CRS_TEMPLATE_REVALIDATE_SECONDS = safe_cast_int(config('CRS_TEMPLATE_REVALIDATE_SECONDS', default='300'), 300)
+
+# ==============================================================================
+# CACHE CONFIGURATION
+# ==============================================================================
+# Redis when REDIS_CACHE_URL is set (use maxmemory-policy allkeys-lru for LRU eviction);
+# otherwise LLM results, cleaned comments and RBAC access versions live in database cache
+# tables (run: manage.py createcachetable)
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+
+# LLM analysis result cache (content-addressed: file hash + model + prompt hash)
+LLM_RESULT_CACHE_ENABLED = safe_cast_bool(config('LLM_RESULT_CACHE_ENABLED', default='True'), True)
+LLM_RESULT_CACHE_TTL = safe_cast_int(config('LLM_RESULT_CACHE_TTL', default='2592000'), 2592000)  # 30 days
+LLM_RESULT_CACHE_MAX_ENTRIES = safe_cast_int(config('LLM_RESULT_CACHE_MAX_ENTRIES', default='5000'), 5000)
+
+# CRS comment cleaning memo cache (per-process LRU in front of the 'comment_cleaning' cache,
+# kept apart from 'llm_results' so cleaned comments do not cull cached P&ID analyses)
+COMMENT_CLEANING_CACHE_ENABLED = safe_cast_bool(config('COMMENT_CLEANING_CACHE_ENABLED', default='True'), True)
+COMMENT_CLEANING_CACHE_LRU_SIZE = safe_cast_int(config('COMMENT_CLEANING_CACHE_LRU_SIZE', default='5000'), 5000)
+COMMENT_CLEANING_CACHE_TTL = safe_cast_int(config('COMMENT_CLEANING_CACHE_TTL', default='2592000'), 2592000)  # 30 days
+COMMENT_CLEANING_CACHE_MAX_ENTRIES = safe_cast_int(config('COMMENT_CLEANING_CACHE_MAX_ENTRIES', default='50000'), 50000)
+
+# Per-user RBAC effective access (modules/permissions), invalidated by apps/rbac/signals.py.
+# Invalidation versions are kept in the shared 'rbac_access' cache so every worker sees them.
+RBAC_ACCESS_CACHE_TTL = safe_cast_int(config('RBAC_ACCESS_CACHE_TTL', default='300'), 300)
+
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'KEY_PREFIX': 'radai',
+        },
+        'llm_results': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'KEY_PREFIX': 'radai-llm',
+            'TIMEOUT': LLM_RESULT_CACHE_TTL,
+        },
+        'comment_cleaning': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'KEY_PREFIX': 'radai-cleaning',
+            'TIMEOUT': COMMENT_CLEANING_CACHE_TTL,
+        },
+        'rbac_access': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'KEY_PREFIX': 'radai-rbac',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'radai-default',
+        },
+        'llm_results': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'llm_result_cache',
+            'TIMEOUT': LLM_RESULT_CACHE_TTL,
+            'OPTIONS': {'MAX_ENTRIES': LLM_RESULT_CACHE_MAX_ENTRIES},  # culled when exceeded
+        },
+        'comment_cleaning': {
+            'BACKEND': 'apps.core.cache_backends.BulkDatabaseCache',  # set_many in one transaction
+            'LOCATION': 'comment_cleaning_cache',
+            'TIMEOUT': COMMENT_CLEANING_CACHE_TTL,
+            'OPTIONS': {'MAX_ENTRIES': COMMENT_CLEANING_CACHE_MAX_ENTRIES},
+        },
+        'rbac_access': {
+            # Shared across worker processes, unlike the local-memory default cache
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'rbac_access_cache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},  # one version per user plus the global one
+        },
+    }
+
+# ==============================================================================
+# AUDIT LOGGING
+# ==============================================================================
+# Request audit records are buffered in-process and bulk-inserted by a background thread
+AUDIT_LOG_ASYNC = safe_cast_bool(config('AUDIT_LOG_ASYNC', default='True'), True)
+AUDIT_LOG_BATCH_SIZE = safe_cast_int(config('AUDIT_LOG_BATCH_SIZE', default='200'), 200)
+AUDIT_LOG_FLUSH_INTERVAL = safe_cast_int(config('AUDIT_LOG_FLUSH_INTERVAL', default='2'), 2)  # seconds
+AUDIT_LOG_QUEUE_SIZE = safe_cast_int(config('AUDIT_LOG_QUEUE_SIZE', default='10000'), 10000)
 
 # API Documentation
 SPECTACULAR_SETTINGS = {
@@ -19,6 +19,7 @@ echo "✅ PostgreSQL is up!"
 # Run database migrations
 echo "🔄 Running database migrations..."
 python manage.py migrate --noinput
+python manage.py createcachetable
 
 # Collect static files
 echo "📦 Collecting static files..."
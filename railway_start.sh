@@ -32,6 +32,11 @@ python manage.py migrate --noinput 2>&1 || {
     exit 1
 }
 
+# Cache table for LLM analysis results (no-op when it already exists)
+python manage.py createcachetable 2>&1 || {
+    echo "⚠️  Cache table creation failed, continuing without result cache..."
+}
+
 echo "================================"
 echo "✅ Pre-flight checks passed"
 echo "🚀 Starting Gunicorn server..."
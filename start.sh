@@ -4,6 +4,7 @@ export PORT=${PORT:-8000}
 export DJANGO_SETTINGS_MODULE=config.settings
 
 python manage.py migrate --noinput 
+python manage.py createcachetable
 python manage.py collectstatic --noinput
 
 gunicorn config.wsgi:application \